@@ -0,0 +1,304 @@
+import re
+import time
+from array import array
+
+from job_profile import CompiledJob, compile_job
+from resume_cache import hash_text
+from sections import EVIDENCE_KINDS, ParsedResume, page_starts, split_sections
+from skills import get_matcher
+
+# Bump when scoring changes so cached analyses from older versions are not reused
+ANALYSIS_VERSION = 6
+
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12,
+}
+_MONTH = r'(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\.?'
+_OPEN_END = r'present|current|now|to\s+date|today|ongoing'
+
+
+def _date_pattern(prefix):
+    """
+    "Mar 2019", "March 2019", "03/2019" or "2019", with named groups for month and year.
+    """
+    return (rf'(?:(?P<{prefix}month>{_MONTH})\s+|(?P<{prefix}num>\d{{1,2}})\s*[/.-]\s*)?'
+            rf'(?P<{prefix}year>(?:19|20)\d{{2}})')
+
+
+# "Jan 2018 - Present", "03/2016 – 06/2019", "2015 to 2019"
+DATE_RANGE_RE = re.compile(
+    r'\b' + _date_pattern('s') +
+    r'\s*(?:-|–|—|to|until|till)\s*' +
+    r'(?:(?P<open>' + _OPEN_END + r')|' + _date_pattern('e') + r')\b',
+    re.IGNORECASE
+)
+# "5+ years of experience"
+STATED_YEARS_RE = re.compile(r'\b(\d{1,2})\+?\s*(?:years?|yrs?)\s+(?:of\s+)?(?:professional\s+|work\s+|industry\s+)?experience', re.IGNORECASE)
+
+# Highest level first; the first level with any match wins
+EDUCATION_LEVELS = [
+    ('Doctorate', re.compile(r'\b(?:ph\.?\s?d|doctorate|doctor\s+of)\b', re.IGNORECASE)),
+    ("Master's", re.compile(r"\b(?:master'?s?|m\.?\s?sc|m\.?\s?tech|m\.?\s?eng|mba|m\.s\.|m\.a\.)(?!\w)", re.IGNORECASE)),
+    ("Bachelor's", re.compile(r"\b(?:bachelor'?s?|b\.?\s?sc|b\.?\s?tech|b\.?\s?eng|b\.e\.|b\.s\.|b\.a\.|bca|bba)(?!\w)", re.IGNORECASE)),
+    ('Associate', re.compile(r"\bassociate'?s?\s+(?:degree|of)\b", re.IGNORECASE)),
+    ('Diploma', re.compile(r'\b(?:diploma|high\s+school|secondary\s+school)\b', re.IGNORECASE)),
+]
+# Columns of an evidence table (see evidence_table), and the characters of context shown around a match
+EVIDENCE_COLUMNS = ('label', 'start', 'end', 'page', 'section', 'before', 'match', 'after')
+EVIDENCE_CONTEXT = 60
+# Date ranges on lines like these belong to education, not work experience
+_EDUCATION_LINE_RE = re.compile(r'\b(?:university|college|school|institute|degree|bachelor|master|ph\.?d|b\.?\s?tech|m\.?\s?tech|gpa|cgpa)\b', re.IGNORECASE)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def job_cache_key(job_desc):
+    """
+    Cache key for analyses of a job description (a string or CompiledJob) under the
+    current scoring version.
+    """
+    if isinstance(job_desc, CompiledJob):
+        if job_desc.analysis_key is None:
+            job_desc.analysis_key = hash_text(f"v{ANALYSIS_VERSION}\n{job_desc.text}")
+        return job_desc.analysis_key
+    return hash_text(f"v{ANALYSIS_VERSION}\n{(job_desc or '').strip()}")
+
+
+def _month_index(month_name, month_number, year):
+    month = 1
+    if month_name:
+        month = _MONTHS.get(month_name[:3].lower(), 1)
+    elif month_number and 1 <= int(month_number) <= 12:
+        month = int(month_number)
+    return int(year) * 12 + month - 1
+
+
+def _line_at(text, position):
+    start = text.rfind('\n', 0, position) + 1
+    end = text.find('\n', position)
+    return text[start:end if end != -1 else len(text)]
+
+
+def find_date_ranges(text, now=None):
+    """
+    Return (start_month, end_month, match_start, match_end) for every employment date range.
+    Months are counted as year * 12 + month - 1; open ranges end at the current month.
+    """
+    now = now or time.localtime()
+    current = now.tm_year * 12 + now.tm_mon - 1
+    ranges = []
+    for match in DATE_RANGE_RE.finditer(text or ''):
+        if _EDUCATION_LINE_RE.search(_line_at(text, match.start())):
+            continue
+        start = _month_index(match.group('smonth'), match.group('snum'), match.group('syear'))
+        if match.group('open'):
+            end = current
+        else:
+            end = _month_index(match.group('emonth'), match.group('enum'), match.group('eyear'))
+        if start <= end <= current:
+            ranges.append((start, end, match.start(), match.end()))
+    return ranges
+
+
+def _union_months(intervals):
+    """
+    Months covered by (start, end) month intervals; overlapping jobs are counted once.
+    """
+    months = 0
+    current_start = current_end = None
+    for start, end in sorted(intervals):
+        if current_end is None or start > current_end:
+            if current_end is not None:
+                months += current_end - current_start
+            current_start, current_end = start, end
+        else:
+            current_end = max(current_end, end)
+    if current_end is not None:
+        months += current_end - current_start
+    return months
+
+
+def _stated_years(text):
+    return [int(m.group(1)) for m in STATED_YEARS_RE.finditer(text or '')]
+
+
+def estimate_experience_years(text, now=None):
+    """
+    Years of experience: the union of all employment date ranges (overlapping jobs
+    are counted once), or an explicit "N years of experience" if that is larger.
+    """
+    months = _union_months((start, end) for start, end, _, _ in find_date_ranges(text, now))
+    return max([months // 12] + _stated_years(text))
+
+
+def detect_education_level(text):
+    """
+    Highest education level mentioned in the text, or None.
+    """
+    for level, pattern in EDUCATION_LEVELS:
+        if pattern.search(text or ''):
+            return level
+    return None
+
+
+def _education_mentions(text, spans):
+    """
+    (EDUCATION_LEVELS index, start, end) of every education level mention within spans of text.
+    """
+    mentions = []
+    for level, (_, pattern) in enumerate(EDUCATION_LEVELS):
+        for start, end in spans:
+            mentions.extend((level, match.start(), match.end()) for match in pattern.finditer(text, start, end))
+    return mentions
+
+
+def parse_resume(text, now=None):
+    """
+    Parse resume text into a ParsedResume in one pass over its sections.
+
+    Employment dates are taken from the experience sections and the degree from the
+    education sections, so project dates or a "Scrum Master" job title don't count;
+    resumes without recognisable headings fall back to the whole text. Where each
+    skill, date range and degree was found is kept as the record's evidence.
+    """
+    text = text or ''
+    kinds, bounds = split_sections(text)
+    parsed = ParsedResume(len(text), kinds, bounds, pages=page_starts(text))
+
+    matcher = get_matcher()
+    skill_index = {skill: i for i, skill in enumerate(matcher.skills)}
+    found = set()
+    for skill, start, end in matcher.find(text):
+        found.add(skill_index[skill])
+        parsed.add_evidence('skill', skill_index[skill], start, end)
+    parsed.skill_ids = array('H', sorted(found))
+
+    experience = parsed.spans('experience') or [(0, len(text))]
+    for offset, end in experience:
+        for month_start, month_end, start, stop in find_date_ranges(text[offset:end], now):
+            parsed.date_months.extend((month_start, month_end))
+            parsed.add_evidence('experience', len(parsed.date_months) // 2 - 1, offset + start, offset + stop)
+    months = _union_months(zip(parsed.date_months[::2], parsed.date_months[1::2]))
+    parsed.experience_years = max([months // 12] + _stated_years(text))
+
+    mentions = parsed.spans('education') and _education_mentions(text, parsed.spans('education'))
+    mentions = mentions or _education_mentions(text, [(0, len(text))])
+    for level, start, end in mentions:
+        parsed.add_evidence('education', level, start, end)
+    parsed.education = EDUCATION_LEVELS[min(level for level, _, _ in mentions)][0] if mentions else None
+    return parsed
+
+
+def parse_resume_cached(cache, file_hash, text):
+    """
+    parse_resume through a ResumeCache, so each resume is parsed once per analysis version.
+    """
+    kind = f"sections-v{ANALYSIS_VERSION}"
+    if cache is not None and file_hash:
+        cached = cache.get(file_hash, kind)
+        if cached is not None:
+            return ParsedResume.from_list(cached)
+    parsed = parse_resume(text)
+    if cache is not None and file_hash:
+        cache.put(file_hash, kind, parsed.to_list())
+    return parsed
+
+
+def _snippet(text):
+    return _WHITESPACE_RE.sub(' ', text)
+
+
+def evidence_table(parsed, text, kind='skill', name=None, context=EVIDENCE_CONTEXT):
+    """
+    Where a resume shows one skill or education level (name), or everything of a kind,
+    as {'kind', 'columns', 'rows'} with one row per match, in text order, in EVIDENCE_COLUMNS order.
+    parsed is the ParsedResume of text; its evidence is read, the text is not scanned again.
+    """
+    if kind not in EVIDENCE_KINDS:
+        raise ValueError(f"Unknown evidence kind {kind!r}; expected one of {', '.join(EVIDENCE_KINDS)}")
+    if kind == 'skill':
+        labels = get_matcher().skills
+    elif kind == 'education':
+        labels = [level for level, _ in EDUCATION_LEVELS]
+    else:
+        labels = None
+    ref = None
+    if name and labels is not None:
+        ref = next((i for i, label in enumerate(labels) if label.lower() == name.strip().lower()), -1)
+    rows = []
+    for row_ref, start, end, page in parsed.evidence_for(kind, ref):
+        if kind == 'experience':
+            label = f"{parsed.date_months[2 * row_ref] // 12}-{parsed.date_months[2 * row_ref + 1] // 12}"
+        else:
+            label = labels[row_ref]
+        rows.append([label, start, end, page, parsed.section_at(start),
+                     _snippet(text[max(0, start - context):start]), text[start:end],
+                     _snippet(text[end:end + context])])
+    rows.sort(key=lambda row: row[1])
+    return {'kind': kind, 'columns': list(EVIDENCE_COLUMNS), 'rows': rows}
+
+
+def entity_fields(entities):
+    """
+    Result fields for the spaCy entities of a resume (see nlp.extract_entities).
+    """
+    return {'organizations': entities.get('ORG', [])[:10], 'locations': entities.get('GPE', [])[:5]}
+
+
+def perform_analysis(file_info, job_desc, resume_text="", entities=None, parsed=None):
+    """
+    Score a resume against a job description. Does not depend on the desktop app,
+    so it can run in batch worker processes. job_desc is the job description text or
+    its CompiledJob (see job_profile.compile_job). resume_text is the extracted text of
+    the resume; the score is fully determined by the two texts. entities are the
+    optional spaCy entities of the resume (see nlp.extract_entities). parsed is the
+    resume's ParsedResume, if already known; resume_text is not needed then.
+    """
+    job = compile_job(job_desc)
+    if parsed is None:
+        parsed = parse_resume(resume_text)
+
+    # Skills the job asks for that the resume mentions, and the weighted share of them
+    matched_skills, missing_skills, score = job.score(set(parsed.skill_ids))
+    required_skills = job.required_skills
+    if score is None:
+        score = 75
+
+    experience_years = parsed.experience_years
+    education_level = parsed.education
+
+    # Generate recommendations
+    recommendations = []
+    if score >= 80:
+        recommendations.append("Strong candidate with excellent skill match")
+        recommendations.append("Suitable for senior-level positions")
+    elif score >= 60:
+        recommendations.append("Good candidate with solid foundation")
+        recommendations.append("Consider for mid-level positions")
+    else:
+        recommendations.append("Candidate needs additional training")
+        recommendations.append("Consider for junior positions with mentoring")
+
+    if missing_skills:
+        recommendations.append(f"Training needed in: {', '.join(missing_skills)}")
+
+    result = {
+        'fileName': file_info['name'],
+        'fileSize': file_info['size'],
+        'fileType': file_info['type'],
+        'overallScore': score,
+        'matchedSkills': matched_skills,
+        'missingSkills': missing_skills,
+        'requiredSkills': required_skills,
+        'resumeSkills': parsed.skills,
+        'experience': f"{experience_years} years" if experience_years else 'Not specified',
+        'experienceYears': experience_years,
+        'education': education_level or 'Not specified',
+        'sections': parsed.section_names(),
+        'recommendations': recommendations,
+        'jobDescriptionLength': len(job.text),
+        'analysisTimestamp': time.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    if entities:
+        result.update(entity_fields(entities))
+    return result
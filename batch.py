@@ -0,0 +1,318 @@
+"""
+Batch analysis: score a folder (or list) of resumes against one job description.
+
+    python batch.py resumes/ --job-file posting.txt --top 20
+    python batch.py a.pdf b.docx --job "Python developer with Docker and AWS" --jsonl
+
+Extraction and scoring run in a process pool; results are printed as each file
+finishes, followed by the ranked list and the throughput in resumes per second.
+The whole run is then recorded in the results store (results.db) in one transaction.
+"""
+import argparse
+import json
+import os
+import signal
+import sqlite3
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analyzer import entity_fields, job_cache_key, parse_resume_cached, perform_analysis
+from ingestion import EXTENSIONS, read_header, require_format
+from dedupe import DuplicateIndex, minhash
+from job_profile import compile_job
+from resume_cache import ResumeCache, hash_file
+from results_store import DEFAULT_DB_PATH, ResultsStore
+from nlp import extract_entities, warm_up
+from similarity import SimilarityIndex, term_frequencies
+
+RESUME_EXTENSIONS = EXTENSIONS
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+
+# Cache instance of the current worker process, created by _init_worker
+_worker_cache = None
+
+
+def find_resumes(paths):
+    """
+    Expand a list of files and directories into the resume files they contain.
+    """
+    resumes = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(RESUME_EXTENSIONS):
+                        resumes.append(os.path.join(root, name))
+        elif os.path.isfile(path):
+            resumes.append(path)
+    return resumes
+
+
+def _init_worker(cache_dir):
+    global _worker_cache
+    # A forked worker inherits its parent's signal handling; under an asyncio server that
+    # is a no-op handler writing to the loop's wakeup fd, so a signal to the worker (or
+    # its death) would reach the server instead
+    signal.set_wakeup_fd(-1)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    import extractor
+    import ocr
+    # Every worker already has a CPU to itself; don't fan out again per page
+    extractor.PARALLEL_MIN_PAGES = sys.maxsize
+    ocr.OCR_WORKERS = 1
+    _worker_cache = ResumeCache(cache_dir) if cache_dir else None
+
+
+def analyze_file(file_path, job_description, cache=None, with_terms=False, with_text=False, with_signature=False):
+    """
+    Extract and score a single resume. Cached text and results are reused when a cache is given.
+    with_terms adds the resume's term counts under 'terms', for building a similarity index;
+    with_text adds the extracted text under 'text', for the NLP stage; with_signature adds
+    its MinHash signature (or None) under 'signature', for a DuplicateIndex.
+    """
+    cache = cache or _worker_cache
+    # Anything that isn't a supported resume fails here, before it is hashed or extracted
+    fmt = require_format(read_header(file_path), file_path, os.path.basename(file_path))
+    file_info = {
+        'name': os.path.basename(file_path),
+        'size': os.path.getsize(file_path),
+        'type': fmt.mime
+    }
+
+    # Compiled once per worker process, then an LRU hit for every other resume
+    job = compile_job(job_description)
+    file_hash = hash_file(file_path)
+    job_hash = job_cache_key(job)
+    if cache:
+        cached = cache.get_analysis(file_hash, job_hash)
+        if cached:
+            cached.update({'fileName': file_info['name'], 'filePath': file_path, 'fileHash': file_hash, 'cached': True})
+            # Flagged by whichever run cached it, against the resumes that run had seen
+            cached.pop('duplicateOf', None)
+            if with_terms or with_text or with_signature:
+                resume_text = cache.get_or_extract_text(file_hash, file_path)
+                if with_terms:
+                    cached['terms'] = term_frequencies(resume_text)
+                if with_text:
+                    cached['text'] = resume_text
+                if with_signature:
+                    cached['signature'] = minhash(resume_text)
+            return cached
+        resume_text, complete = cache.get_or_extract(file_hash, file_path)
+    else:
+        from extractor import extract_resume_text
+        resume_text, complete = extract_resume_text(file_path)
+    if not complete:
+        # A scanned page's OCR didn't finish: score what was read, but cache nothing derived
+        # from it, so the next analysis of the file tries that page again
+        cache = None
+
+    parsed = parse_resume_cached(cache, file_hash, resume_text)
+    result = perform_analysis(file_info, job, resume_text, parsed=parsed)
+    if cache:
+        cache.put_analysis(file_hash, job_hash, result)
+    result.update({'filePath': file_path, 'fileHash': file_hash})
+    if with_terms:
+        result['terms'] = term_frequencies(resume_text)
+    if with_text:
+        result['text'] = resume_text
+    if with_signature:
+        # A signature of partial text would stay in the duplicate index for good
+        result['signature'] = minhash(resume_text) if complete else None
+    return result
+
+
+def analyze_batch(paths, job_description, max_workers=None, cache_dir=DEFAULT_CACHE_DIR, with_terms=False,
+                  with_text=False, with_signature=False):
+    """
+    Analyze many resumes in a process pool, yielding each result as soon as it finishes.
+    Failures are yielded as {'status': 'error', ...} entries instead of stopping the batch.
+    """
+    resumes = find_resumes(paths)
+    if not resumes:
+        return
+
+    workers = min(max_workers or os.cpu_count() or 1, len(resumes))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_dir,)) as pool:
+        futures = {
+            pool.submit(analyze_file, path, job_description, None, with_terms, with_text, with_signature): path
+            for path in resumes
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                result = future.result()
+                result['status'] = 'success'
+            except Exception as e:
+                result = {'status': 'error', 'filePath': path, 'message': str(e)}
+            yield result
+
+
+def rank_results(results):
+    """
+    Successful results sorted best first; ties keep the file name order stable.
+    """
+    scored = [r for r in results if r.get('status') == 'success']
+    return sorted(scored, key=lambda r: (-r['overallScore'], r['fileName']))
+
+
+def rank_by_similarity(results, terms, job_description):
+    """
+    Rank successful results by combinedScore: TF-IDF similarity to the job description
+    blended with the skill-match overallScore.
+    """
+    index = SimilarityIndex()
+    for result in results:
+        if result.get('status') == 'success':
+            index.add(result['filePath'], terms=terms.get(result['filePath'], {}), meta=result)
+    return index.top_k(compile_job(job_description), k=len(index))
+
+
+def add_entities(results, texts):
+    """
+    Run the shared spaCy pipeline over all texts in one nlp.pipe pass and attach
+    the entities to the matching results.
+    """
+    scored = [r for r in results if r['filePath'] in texts]
+    entities = extract_entities([texts[r['filePath']] for r in scored])
+    if entities is None:
+        return
+    for result, found in zip(scored, entities):
+        result.update(entity_fields(found))
+
+
+def run_batch(paths, job_description, max_workers=None, cache_dir=DEFAULT_CACHE_DIR, on_result=None,
+              rank_by='score', with_entities=False, duplicates=None):
+    """
+    Run a whole batch and return the ranked results together with throughput numbers.
+    on_result, if given, is called with every result as it arrives. rank_by is 'score'
+    (skill match) or 'similarity' (TF-IDF similarity blended with the skill match).
+    with_entities adds spaCy entities; the model is loaded once, in this process,
+    while the workers extract, instead of once per worker. With a DuplicateIndex,
+    each resume is checked against it (and the resumes before it in the run) and
+    near-duplicates are flagged with duplicateOf.
+    """
+    with_terms = rank_by == 'similarity'
+    if with_entities:
+        warm_up()
+    start = time.perf_counter()
+    results = []
+    terms = {}
+    texts = {}
+    for result in analyze_batch(paths, job_description, max_workers, cache_dir, with_terms, with_entities,
+                                duplicates is not None):
+        if 'terms' in result:
+            terms[result['filePath']] = result.pop('terms')
+        if 'text' in result:
+            texts[result['filePath']] = result.pop('text')
+        signature = result.pop('signature', None)
+        if signature is not None:
+            duplicate = duplicates.check(result['fileHash'], signature, result['fileName'])
+            if duplicate:
+                result['duplicateOf'] = duplicate
+        results.append(result)
+        if on_result:
+            on_result(result)
+
+    if with_entities:
+        add_entities(results, texts)
+
+    if with_terms:
+        ranked = rank_by_similarity(results, terms, job_description)
+    else:
+        ranked = rank_results(results)
+    elapsed = time.perf_counter() - start
+
+    return {
+        'ranked': ranked,
+        'errors': [r for r in results if r.get('status') == 'error'],
+        'count': len(results),
+        'elapsedSeconds': round(elapsed, 3),
+        'resumesPerSecond': round(len(results) / elapsed, 2) if elapsed > 0 else 0.0
+    }
+
+
+def record_results(store, summary, job_description):
+    """
+    Add the successful results of a run_batch summary to a ResultsStore in one bulk insert.
+    Returns the number recorded.
+    """
+    job = compile_job(job_description)
+    return store.add_many((result['fileHash'], job, result) for result in summary['ranked'] if 'fileHash' in result)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a batch of resumes against one job description.")
+    parser.add_argument('paths', nargs='+', help="resume files and/or directories containing resumes")
+    job = parser.add_mutually_exclusive_group(required=True)
+    job.add_argument('--job', help="job description text")
+    job.add_argument('--job-file', help="file containing the job description")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument('--top', type=int, default=10, help="number of ranked results to print")
+    parser.add_argument('--rank-by', choices=('score', 'similarity'), default='score',
+                        help="rank by skill match, or by TF-IDF similarity blended with it")
+    parser.add_argument('--nlp', action='store_true', help="add spaCy entities (organizations, locations)")
+    parser.add_argument('--no-cache', action='store_true', help="do not read or write the result cache")
+    parser.add_argument('--no-record', action='store_true', help="do not add the results to the results store")
+    parser.add_argument('--jsonl', action='store_true', help="print results as JSON lines")
+    args = parser.parse_args(argv)
+
+    if args.job_file:
+        with open(args.job_file, 'r', encoding='utf-8') as f:
+            job_description = f.read()
+    else:
+        job_description = args.job
+
+    def print_result(result):
+        if args.jsonl:
+            print(json.dumps(result), flush=True)
+        elif result['status'] == 'success':
+            duplicate = result.get('duplicateOf')
+            note = f"  (near-duplicate of {duplicate['fileName'] or duplicate['fileHash']})" if duplicate else ''
+            print(f"  {result['overallScore']:>3}%  {result['filePath']}{note}", flush=True)
+        else:
+            print(f"  ERR   {result['filePath']}: {result['message']}", flush=True)
+
+    # Resumes seen before come from the results store; without it, only this run's are compared
+    store = None if args.no_record else ResultsStore(DEFAULT_DB_PATH)
+    duplicates = DuplicateIndex(loader=store.signatures, saver=store.add_signature) if store else DuplicateIndex()
+    try:
+        summary = run_batch(
+            args.paths, job_description, args.workers,
+            cache_dir=None if args.no_cache else DEFAULT_CACHE_DIR,
+            on_result=print_result,
+            rank_by=args.rank_by,
+            with_entities=args.nlp,
+            duplicates=duplicates
+        )
+        if store:
+            try:
+                record_results(store, summary, job_description)
+            except sqlite3.Error as e:
+                print(f"Could not record the results: {e}", file=sys.stderr)
+    finally:
+        if store:
+            store.close()
+
+    if args.jsonl:
+        print(json.dumps({
+            'ranked': [r['filePath'] for r in summary['ranked']],
+            'count': summary['count'],
+            'elapsedSeconds': summary['elapsedSeconds'],
+            'resumesPerSecond': summary['resumesPerSecond']
+        }))
+    else:
+        print(f"\nTop {min(args.top, len(summary['ranked']))} of {summary['count']} resumes:")
+        for rank, result in enumerate(summary['ranked'][:args.top], 1):
+            similarity = f"  (similarity {result['similarity']:.2f})" if 'similarity' in result else ''
+            print(f"  {rank:>3}. {result['overallScore']:>3}%  {result['fileName']}{similarity}")
+        print(f"\n{summary['count']} resumes in {summary['elapsedSeconds']}s "
+              f"({summary['resumesPerSecond']} resumes/s), {len(summary['errors'])} errors")
+
+    return 1 if summary['errors'] and not summary['ranked'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
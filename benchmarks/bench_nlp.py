@@ -0,0 +1,101 @@
+"""
+Cold start and per-resume latency of the shared spaCy pipeline.
+
+    python -m benchmarks.bench_nlp --resumes 200 --output bench_nlp.json
+
+Cold start is measured in a fresh interpreter (import + model load). Per-resume
+latency compares one nlp() call per resume with batched nlp.pipe().
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.corpus import synthetic_corpus
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COLD_START_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import nlp
+model = nlp.get_nlp()
+print(json.dumps({'ok': model is not None, 'seconds': time.perf_counter() - start,
+                  'components': model.pipe_names if model else []}))
+"""
+
+
+def measure_cold_start(runs):
+    samples = []
+    components = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_START_SNIPPET],
+            cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        result = json.loads(output)
+        if not result['ok']:
+            return None
+        samples.append(result['seconds'])
+        components = result['components']
+    return {'runs': runs, 'medianSeconds': statistics.median(samples), 'minSeconds': min(samples),
+            'components': components}
+
+
+def measure_per_resume(texts, batch_size):
+    import nlp
+    model = nlp.get_nlp()
+    if model is None:
+        return None
+    model(texts[0])  # first call allocates buffers; keep it out of the numbers
+
+    single = []
+    for text in texts:
+        start = time.perf_counter()
+        model(text)
+        single.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    nlp.extract_entities(texts, batch_size=batch_size)
+    piped = time.perf_counter() - start
+
+    return {
+        'resumes': len(texts),
+        'singleMedianMs': round(statistics.median(single) * 1000, 3),
+        'singleTotalSeconds': round(sum(single), 3),
+        'pipeTotalSeconds': round(piped, 3),
+        'pipePerResumeMs': round(piped / len(texts) * 1000, 3),
+        'batchSize': batch_size,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the spaCy NLP stage.")
+    parser.add_argument('--resumes', type=int, default=100)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--cold-runs', type=int, default=3)
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    cold = measure_cold_start(args.cold_runs)
+    if cold is None:
+        print("spaCy model not available - install spacy and the model to run this benchmark")
+        return 1
+    print(f"cold start: {cold['medianSeconds']:.2f}s median over {cold['runs']} runs, components {cold['components']}")
+
+    per_resume = measure_per_resume(synthetic_corpus(args.resumes), args.batch_size)
+    print(f"per resume: {per_resume['singleMedianMs']} ms single, {per_resume['pipePerResumeMs']} ms with nlp.pipe "
+          f"(batch {per_resume['batchSize']}, {per_resume['resumes']} resumes)")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'coldStart': cold, 'perResume': per_resume,
+                       'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,285 @@
+"""
+Upload -> extract -> score benchmark, driving PyResumeAPI directly (no GUI).
+
+    python -m benchmarks.bench_pipeline --save-baseline
+    python -m benchmarks.bench_pipeline                      # exits 1 on regression
+    python -m benchmarks.bench_pipeline --scenario pages --pages 1 50 500
+
+Scenarios:
+    samples   resume-sample.pdf and resume-sample.docx, --iterations times each
+    pages     generated PDFs of each --pages size, extracted in full (no page limits)
+    corpus    each --resumes count of synthetic resumes, scored from text
+
+Every scenario runs in a fresh interpreter, so its peak RSS is its own. Stages are
+save (PyResumeAPI.save_uploaded_file), extract (extractor.extract_text) and score
+(PyResumeAPI._perform_analysis). Each run is written to benchmarks/results/; the
+p50 of every stage is compared with the saved baseline.
+"""
+import argparse
+import base64
+import json
+import mimetypes
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.corpus import JOB_DESCRIPTION, synthetic_corpus, synthetic_pdf
+from benchmarks.load_test import percentile
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+BASELINE_FILE = os.path.join(RESULTS_DIR, 'pipeline_baseline.json')
+SAMPLE_FILES = [os.path.join(REPO_DIR, 'resume-sample.pdf'), os.path.join(REPO_DIR, 'resume-sample.docx')]
+SCENARIOS = ('samples', 'pages', 'corpus')
+REGRESSION_RATIO = 1.25
+# Stage timings below this are too noisy to call a regression
+MIN_REGRESSION_MS = 1.0
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def summarize(seconds):
+    values = sorted(seconds)
+    return {
+        'n': len(values),
+        'meanMs': round(sum(values) / len(values) * 1000, 3),
+        'p50Ms': round(percentile(values, 0.50) * 1000, 3),
+        'p95Ms': round(percentile(values, 0.95) * 1000, 3),
+        'p99Ms': round(percentile(values, 0.99) * 1000, 3),
+        'maxMs': round(values[-1] * 1000, 3),
+    }
+
+
+class Pipeline:
+    """
+    A PyResumeAPI whose uploads, cache and results store live in a scratch directory
+    instead of the repo's uploads/, cache/ and results.db.
+    """
+    def __init__(self, work_dir):
+        import pyresume_app
+        from upload_store import UploadStore
+        self._store_class = UploadStore
+        self.work_dir = work_dir
+        self.api = pyresume_app.PyResumeAPI(data_dir=work_dir)
+        self.api.store.close()
+
+    def run(self, path, job_description, timings, extract=None):
+        """
+        Push one file through save, extract and score, appending each stage's duration to timings.
+        extract replaces extractor.extract_text for the extract stage.
+        """
+        from extractor import extract_text
+        extract = extract or extract_text
+        with open(path, 'rb') as f:
+            data = f.read()
+        file_data = {
+            'name': os.path.basename(path),
+            'size': len(data),
+            'type': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            'content': base64.b64encode(data).decode('ascii'),
+        }
+        # An empty store every time, so save measures a real write rather than a dedupe hit
+        store_dir = tempfile.mkdtemp(dir=self.work_dir)
+        self.api.store = self._store_class(store_dir)
+
+        start = time.perf_counter()
+        saved = self.api.save_uploaded_file(file_data)
+        saved_at = time.perf_counter()
+        if saved['status'] != 'success':
+            raise RuntimeError(saved['message'])
+        text = extract(saved['path'])
+        extracted_at = time.perf_counter()
+        file_info = {key: file_data[key] for key in ('name', 'size', 'type')}
+        self.api._perform_analysis(file_info, job_description, text)
+        scored_at = time.perf_counter()
+
+        timings.setdefault('save', []).append(saved_at - start)
+        timings.setdefault('extract', []).append(extracted_at - saved_at)
+        timings.setdefault('score', []).append(scored_at - extracted_at)
+        timings.setdefault('total', []).append(scored_at - start)
+        shutil.rmtree(store_dir, ignore_errors=True)
+        return text
+
+
+def run_samples(pipeline, args):
+    timings = {}
+    start = time.perf_counter()
+    for _ in range(args.iterations):
+        for path in SAMPLE_FILES:
+            pipeline.run(path, JOB_DESCRIPTION, timings)
+    elapsed = time.perf_counter() - start
+    files = args.iterations * len(SAMPLE_FILES)
+    return {'files': files, 'filesPerSecond': round(files / elapsed, 2),
+            'stages': {stage: summarize(values) for stage, values in timings.items()}}
+
+
+def extract_all_pages(path):
+    """
+    Text of every page, without the page, size, time and early-stop limits, so page
+    throughput is measured over the whole document.
+    """
+    from extractor import extract_text_from_pdf
+    return extract_text_from_pdf(path, max_pages=None, max_bytes=None, max_seconds=None)
+
+
+def run_pages(pipeline, args):
+    from extractor import PAGE_BREAK
+    cases = {}
+    for pages in args.pages:
+        path = synthetic_pdf(os.path.join(pipeline.work_dir, f'synthetic-{pages}p.pdf'), pages)
+        timings = {}
+        for _ in range(args.page_iterations):
+            text = pipeline.run(path, JOB_DESCRIPTION, timings, extract_all_pages)
+        # Pages actually extracted, in case a limit still cut the document short
+        pages_read = text.count(PAGE_BREAK) + 1
+        extract_p50 = percentile(sorted(timings['extract']), 0.50)
+        cases[f'{pages}p'] = {
+            'pages': pages,
+            'pagesRead': pages_read,
+            'bytes': os.path.getsize(path),
+            'pagesPerSecond': round(pages_read / extract_p50, 1) if extract_p50 else None,
+            'stages': {stage: summarize(values) for stage, values in timings.items()},
+        }
+    return {'cases': cases}
+
+
+def run_corpus(pipeline, args):
+    cases = {}
+    for count in args.resumes:
+        texts = synthetic_corpus(count)
+        file_info = {'name': 'synthetic.txt', 'size': 0, 'type': 'text/plain'}
+        scores = []
+        start = time.perf_counter()
+        for text in texts:
+            began = time.perf_counter()
+            pipeline.api._perform_analysis(file_info, JOB_DESCRIPTION, text)
+            scores.append(time.perf_counter() - began)
+        elapsed = time.perf_counter() - start
+        cases[str(count)] = {
+            'resumes': count,
+            'resumesPerSecond': round(count / elapsed, 1),
+            'stages': {'score': summarize(scores)},
+        }
+    return {'cases': cases}
+
+
+RUNNERS = {'samples': run_samples, 'pages': run_pages, 'corpus': run_corpus}
+
+
+def run_child(args):
+    work_dir = tempfile.mkdtemp(prefix='pyresume-bench-')
+    try:
+        result = RUNNERS[args.child](Pipeline(work_dir), args)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    result['peakRssMb'] = peak_rss_mb()
+    print(json.dumps(result))
+    return 0
+
+
+def run_isolated(scenario, argv):
+    process = subprocess.run([sys.executable, '-m', 'benchmarks.bench_pipeline', '--child', scenario] + argv,
+                             cwd=REPO_DIR, capture_output=True, text=True)
+    if process.returncode != 0:
+        return {'error': (process.stderr.strip().splitlines() or ['failed'])[-1]}
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def stage_medians(results):
+    """
+    Flatten results into {'scenario/case/stage': p50 ms} for comparison.
+    """
+    medians = {}
+    for scenario, result in results.items():
+        cases = result.get('cases', {'all': result}) if 'error' not in result else {}
+        for case, data in cases.items():
+            for stage, stats in data.get('stages', {}).items():
+                medians[f'{scenario}/{case}/{stage}'] = stats['p50Ms']
+    return medians
+
+
+def compare(results, baseline):
+    regressions = []
+    current = stage_medians(results)
+    for key, before in stage_medians(baseline['scenarios']).items():
+        after = current.get(key)
+        if after is None or before <= 0:
+            continue
+        ratio = after / before
+        if ratio > REGRESSION_RATIO and after - before > MIN_REGRESSION_MS:
+            regressions.append((key, before, after, ratio))
+    return regressions
+
+
+def print_results(results):
+    for scenario, result in results.items():
+        if 'error' in result:
+            print(f"{scenario}: failed - {result['error']}")
+            continue
+        print(f"{scenario} (peak RSS {result['peakRssMb']} MB)")
+        for case, data in result.get('cases', {'all': result}).items():
+            stages = ', '.join(f"{stage} p50 {stats['p50Ms']} / p99 {stats['p99Ms']} ms"
+                               for stage, stats in data['stages'].items())
+            rate = next((f"{data[k]} {k[:-len('PerSecond')]}/s" for k in data if k.endswith('PerSecond')), '')
+            print(f"  {case:<6} {stages}  [{rate}]")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the upload/extract/score pipeline.")
+    parser.add_argument('--scenario', choices=SCENARIOS, nargs='+', default=list(SCENARIOS))
+    parser.add_argument('--iterations', type=int, default=20, help="runs of each bundled sample")
+    parser.add_argument('--pages', type=int, nargs='+', default=[1, 10, 100, 500])
+    parser.add_argument('--page-iterations', type=int, default=3)
+    parser.add_argument('--resumes', type=int, nargs='+', default=[1, 100, 1000, 10000])
+    parser.add_argument('--output', help="also write the results as JSON to this file")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    parser.add_argument('--child', choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(args)
+
+    child_argv = ['--iterations', str(args.iterations), '--page-iterations', str(args.page_iterations),
+                  '--pages', *map(str, args.pages), '--resumes', *map(str, args.resumes)]
+    results = {scenario: run_isolated(scenario, child_argv) for scenario in args.scenario}
+    print_results(results)
+
+    run = {'scenarios': results, 'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'), 'python': sys.version.split()[0]}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    with open(os.path.join(RESULTS_DIR, f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json"), 'w', encoding='utf-8') as f:
+        json.dump(run, f, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+
+    if args.save_baseline:
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(run, f, indent=2)
+        print(f"baseline saved to {BASELINE_FILE}")
+        return 0
+
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline)
+        print(f"vs baseline ({baseline['timestamp']}): {len(regressions)} regression(s)")
+        for key, before, after, ratio in regressions:
+            print(f"REGRESSION: {key} p50 {before} -> {after} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""
+Headless startup benchmark: importing pyresume_app and constructing PyResumeAPI,
+each in a fresh interpreter. The GUI part of startup (time to first paint) is
+recorded by the app itself in startup_times.jsonl.
+
+    python -m benchmarks.bench_startup --runs 10 --save-baseline
+    python -m benchmarks.bench_startup --runs 10      # exits 1 on regression
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+BASELINE_FILE = os.path.join(RESULTS_DIR, 'startup_baseline.json')
+REGRESSION_RATIO = 1.25
+
+SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+import pyresume_app
+imported = time.perf_counter()
+pyresume_app.PyResumeAPI()
+ready = time.perf_counter()
+print(json.dumps({'importSeconds': imported - start, 'readySeconds': ready - start,
+                  'heavyModules': sorted(m for m in ('webview', 'pygame', 'spacy', 'pymupdf', 'docx') if m in sys.modules)}))
+"""
+
+
+def measure(runs):
+    imports, readies = [], []
+    heavy = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', SNIPPET], cwd=REPO_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        imports.append(sample['importSeconds'])
+        readies.append(sample['readySeconds'])
+        heavy = sample['heavyModules']
+    return {
+        'runs': runs,
+        'importMedianSeconds': round(statistics.median(imports), 4),
+        'readyMedianSeconds': round(statistics.median(readies), 4),
+        'heavyModulesAtStartup': heavy,
+        'timestamp': time.strftime('%Y-%m-%d %H:%M:%S'),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark headless startup of the PyResume app.")
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the new baseline")
+    args = parser.parse_args(argv)
+
+    result = measure(args.runs)
+    print(f"import pyresume_app: {result['importMedianSeconds'] * 1000:.1f} ms, "
+          f"ready: {result['readyMedianSeconds'] * 1000:.1f} ms (median of {result['runs']})")
+    if result['heavyModulesAtStartup']:
+        print(f"heavy modules imported at startup: {', '.join(result['heavyModulesAtStartup'])}")
+
+    if args.save_baseline:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(BASELINE_FILE, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f"baseline saved to {BASELINE_FILE}")
+        return 0
+
+    if os.path.exists(BASELINE_FILE):
+        with open(BASELINE_FILE, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        ratio = result['readyMedianSeconds'] / baseline['readyMedianSeconds']
+        print(f"vs baseline ({baseline['timestamp']}): {ratio:.2f}x")
+        if ratio > REGRESSION_RATIO:
+            print(f"REGRESSION: startup is more than {REGRESSION_RATIO}x the baseline")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
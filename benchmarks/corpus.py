@@ -0,0 +1,68 @@
+"""
+Synthetic resume texts for benchmarks. Deterministic for a given index, so runs are comparable.
+"""
+import random
+
+FIRST_NAMES = ['Asha', 'Ravi', 'Maria', 'John', 'Wei', 'Fatima', 'Lucas', 'Priya', 'Omar', 'Elena']
+LAST_NAMES = ['Patel', 'Smith', 'Garcia', 'Chen', 'Khan', 'Rossi', 'Kumar', 'Novak', 'Silva', 'Brown']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Stark Industries', 'Wayne Tech', 'Hooli']
+CITIES = ['Mumbai', 'Berlin', 'Toronto', 'Austin', 'Singapore', 'London', 'Pune']
+SKILLS = ['Python', 'Django', 'Flask', 'JavaScript', 'React', 'Node.js', 'Java', 'Spring', 'C++', 'SQL',
+          'PostgreSQL', 'Docker', 'AWS', 'EC2', 'S3', 'Lambda', 'Git', 'GitHub', 'TensorFlow', 'PyTorch',
+          'REST APIs', 'Kubernetes', 'Terraform', 'Go', 'Rust', 'Kafka', 'Redis', 'Excel', 'Figma']
+DEGREES = ['B.Tech in Computer Science', 'BSc in Mathematics', 'Master of Science in Data Science',
+           'MBA', 'PhD in Physics', 'Diploma in Electronics']
+MONTHS = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec']
+
+JOB_DESCRIPTION = (
+    "We are hiring a backend engineer with strong Python and Django experience, "
+    "SQL/PostgreSQL, Docker and AWS (EC2, S3, Lambda). Experience building REST APIs "
+    "and using Git is required; machine learning with TensorFlow is a plus."
+)
+
+
+def synthetic_resume(index, jobs=3, bullets=4):
+    """
+    A plain-text resume of roughly (jobs * bullets) lines.
+    """
+    rng = random.Random(index)
+    lines = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"{rng.choice(CITIES)} | candidate{index}@example.com", ""]
+    lines += ["SUMMARY", f"Engineer with {rng.randint(1, 15)}+ years of experience across {', '.join(rng.sample(SKILLS, 4))}.", ""]
+    lines.append("EXPERIENCE")
+    year = 2024
+    for _ in range(jobs):
+        start = year - rng.randint(1, 4)
+        lines.append(f"Software Engineer, {rng.choice(COMPANIES)}  {rng.choice(MONTHS)} {start} - {rng.choice(MONTHS)} {year}")
+        for _ in range(bullets):
+            lines.append(f"- Built services with {rng.choice(SKILLS)} and {rng.choice(SKILLS)} serving {rng.randint(1, 900)}k users")
+        year = start
+    lines += ["", "EDUCATION", f"{rng.choice(DEGREES)}, State University {year - 4} - {year}", ""]
+    lines += ["SKILLS", ', '.join(rng.sample(SKILLS, 10))]
+    return '\n'.join(lines) + '\n'
+
+
+def synthetic_corpus(count, **kwargs):
+    return [synthetic_resume(i, **kwargs) for i in range(count)]
+
+
+def synthetic_pdf(path, pages, index=0):
+    """
+    Write a PDF of `pages` pages, each holding one synthetic resume's worth of text.
+    """
+    import pymupdf
+    doc = pymupdf.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        page.insert_textbox(page.rect + (50, 50, -50, -50), synthetic_resume(index * 1000 + page_number), fontsize=8)
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def synthetic_docx(path, index=0, jobs=3, bullets=4):
+    from docx import Document
+    doc = Document()
+    for line in synthetic_resume(index, jobs, bullets).splitlines():
+        doc.add_paragraph(line)
+    doc.save(path)
+    return path
@@ -0,0 +1,116 @@
+"""
+Local stand-in for an LLM endpoint, for suggestion tests and benchmarks without network.
+
+    python -m benchmarks.llm_stub --port 8765 --latency 0.5 &
+    PYRESUME_LLM_BACKEND=http PYRESUME_LLM_URL=http://127.0.0.1:8765/generate python pyresume_app.py
+
+    python -m benchmarks.llm_stub --bench --results 200
+
+Answers POST /generate {"prompts": [...]} with {"responses": [...]} after --latency
+seconds per request, however many prompts it carries. --bench starts the stub in
+process and compares suggestion throughput unbatched, batched and from the cache.
+"""
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmarks.corpus import JOB_DESCRIPTION, synthetic_corpus
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        try:
+            prompts = json.loads(body)['prompts']
+        except (ValueError, KeyError):
+            self.send_error(400, 'expected {"prompts": [...]}')
+            return
+        time.sleep(self.server.latency)
+        self.server.requests += 1
+        self.server.prompts += len(prompts)
+        payload = json.dumps({'responses': [f"stub suggestion {len(prompt)}" for prompt in prompts]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub(port=0, latency=0.2):
+    """
+    Run the stub on a daemon thread; returns the server, whose url attribute is the endpoint.
+    """
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.requests = server.prompts = 0
+    server.url = f'http://127.0.0.1:{server.server_address[1]}/generate'
+    threading.Thread(target=server.serve_forever, name='llm-stub', daemon=True).start()
+    return server
+
+
+def run_bench(count, latency, concurrency, rate):
+    from analyzer import perform_analysis
+    from suggestions import HttpBackend, SuggestionService
+
+    file_info = {'name': 'synthetic.txt', 'size': 0, 'type': 'text/plain'}
+    results = [dict(perform_analysis(file_info, JOB_DESCRIPTION, text), fileName=f'resume-{i}.txt')
+               for i, text in enumerate(synthetic_corpus(count))]
+    stub = start_stub(latency=latency)
+    report = {}
+    try:
+        for label, batch_size in (('unbatched', 1), ('batched', 8)):
+            service = SuggestionService(HttpBackend(stub.url), max_concurrency=concurrency,
+                                        requests_per_minute=rate, batch_size=batch_size)
+            start = time.perf_counter()
+            service.suggest_batch(results, timeout=None)
+            cold = time.perf_counter() - start
+            start = time.perf_counter()
+            service.suggest_batch(results, timeout=None)
+            warm = time.perf_counter() - start
+            report[label] = {'seconds': round(cold, 3), 'requests': service.requests,
+                             'resumesPerSecond': round(count / cold, 1),
+                             'cachedSeconds': round(warm, 4)}
+            service.close()
+    finally:
+        stub.shutdown()
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a local stub LLM endpoint, or benchmark suggestions against it.")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds per request")
+    parser.add_argument('--bench', action='store_true', help="benchmark the suggestion service against the stub")
+    parser.add_argument('--results', type=int, default=100, help="analysis results to get suggestions for")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--rate', type=int, default=600, help="requests per minute")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        report = run_bench(args.results, args.latency, args.concurrency, args.rate)
+        for label, stats in report.items():
+            print(f"{label:<10} {stats['requests']:>4} requests in {stats['seconds']}s "
+                  f"({stats['resumesPerSecond']} resumes/s), cached rerun {stats['cachedSeconds']}s")
+        return 0
+
+    server = start_stub(args.port, args.latency)
+    print(f"LLM stub listening on {server.url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
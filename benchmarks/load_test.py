@@ -0,0 +1,237 @@
+"""
+Load test for the headless HTTP service (server.py).
+
+    python server.py --port 8080 --workers 4 &
+    python -m benchmarks.load_test --url http://127.0.0.1:8080 --users 16 --requests 20
+
+    python -m benchmarks.load_test --spawn --workers 4 --users 32 --output load.json
+
+Every simulated user opens its own session over one keep-alive connection, uploads a
+resume and then sends --requests analyses. Reports requests per second and p50/p95/p99
+latency per endpoint. --unique makes every user's upload distinct, so analyses miss the
+shared cache and measure extraction and scoring instead of cache hits. A --spawn'ed
+server keeps its uploads, cache and results.db in a scratch directory, removed after
+the run.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from urllib.parse import urlsplit
+
+from benchmarks.corpus import JOB_DESCRIPTION
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_RESUME = os.path.join(REPO_DIR, 'resume-sample.pdf')
+SPAWN_TIMEOUT = 15
+
+
+class Client:
+    """
+    Minimal HTTP/1.1 keep-alive client; remembers the session id the server hands out.
+    """
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.session_id = None
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=b'', content_type=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        headers = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', f'Content-Length: {len(body)}']
+        if content_type:
+            headers.append(f'Content-Type: {content_type}')
+        if self.session_id:
+            headers.append(f'X-Session-Id: {self.session_id}')
+
+        start = time.perf_counter()
+        self.writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+        payload = await self.reader.readexactly(int(response_headers.get('content-length', 0)))
+        elapsed = time.perf_counter() - start
+
+        self.session_id = response_headers.get('x-session-id', self.session_id)
+        if response_headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, json.loads(payload) if payload else None, elapsed
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+def encode_multipart(fields, files):
+    """
+    files: list of (field name, file name, content type, bytes).
+    """
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, file_name, file_type, data in files:
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{file_name}"\r\n'
+                     f'Content-Type: {file_type}\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    # Nearest rank: the smallest value with at least fraction of the samples at or below it
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    endpoints = {}
+    for endpoint, results in samples.items():
+        latencies = sorted(seconds for _, seconds in results)
+        endpoints[endpoint] = {
+            'requests': len(results),
+            'errors': sum(1 for status, _ in results if status != 200 and status != 503),
+            'rejected': sum(1 for status, _ in results if status == 503),
+            'p50Ms': round(percentile(latencies, 0.50) * 1000, 2) if latencies else None,
+            'p95Ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+            'p99Ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+            'requestsPerSecond': round(len(results) / elapsed, 2) if elapsed else None,
+        }
+    total = sum(len(results) for results in samples.values())
+    return {
+        'elapsedSeconds': round(elapsed, 3),
+        'requests': total,
+        'requestsPerSecond': round(total / elapsed, 2) if elapsed else None,
+        'endpoints': endpoints,
+    }
+
+
+async def run_user(index, host, port, resume, requests, unique, samples):
+    file_name, file_type, data = resume
+    if unique:
+        # Trailing bytes after %%EOF are ignored by PDF readers but change the hash
+        data = data + f'\n% load-test user {index} {uuid.uuid4().hex}\n'.encode()
+    body, content_type = encode_multipart({'job_description': JOB_DESCRIPTION}, [('file', file_name, file_type, data)])
+
+    client = Client(host, port)
+    endpoint = 'upload'
+    try:
+        status, payload, seconds = await client.request('POST', '/upload', body, content_type)
+        samples['upload'].append((status, seconds))
+        if status != 200:
+            return
+        endpoint = 'analyze'
+        analyze_body = json.dumps({'file_id': payload['data']['files'][0]['id']}).encode()
+        for _ in range(requests):
+            status, _, seconds = await client.request('POST', '/analyze', analyze_body, 'application/json')
+            samples['analyze'].append((status, seconds))
+        endpoint = 'cleanup'
+        status, _, seconds = await client.request('POST', '/cleanup')
+        samples['cleanup'].append((status, seconds))
+    except (ConnectionError, asyncio.IncompleteReadError) as e:
+        samples[endpoint].append((0, 0.0))
+        print(f"user {index}: {endpoint} failed: {e}", file=sys.stderr)
+    finally:
+        client.close()
+
+
+async def run_load(host, port, users, requests, resume, unique):
+    samples = {'upload': [], 'analyze': [], 'cleanup': []}
+    start = time.perf_counter()
+    await asyncio.gather(*(run_user(i, host, port, resume, requests, unique, samples) for i in range(users)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(workers, data_dir):
+    port = _free_port()
+    command = [sys.executable, 'server.py', '--port', str(port), '--data-dir', data_dir]
+    if workers:
+        command += ['--workers', str(workers)]
+    process = subprocess.Popen(command, cwd=REPO_DIR)
+    deadline = time.time() + SPAWN_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"server exited with code {process.returncode}")
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return process, port
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("server did not start listening in time")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the PyResume HTTP service.")
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--spawn', action='store_true', help="start server.py on a free port for the run")
+    parser.add_argument('--workers', type=int, help="worker processes for a spawned server")
+    parser.add_argument('--users', type=int, default=16, help="concurrent sessions")
+    parser.add_argument('--requests', type=int, default=10, help="analyses per user")
+    parser.add_argument('--resume', default=DEFAULT_RESUME)
+    parser.add_argument('--unique', action='store_true', help="give every user a distinct file")
+    parser.add_argument('--output', help="write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    with open(args.resume, 'rb') as f:
+        data = f.read()
+    name = os.path.basename(args.resume)
+    file_type = 'application/pdf' if name.lower().endswith('.pdf') else 'application/octet-stream'
+
+    process = None
+    # The spawned server's data stays out of the repo's uploads/, cache/ and results.db
+    data_dir = tempfile.mkdtemp(prefix='pyresume-load-') if args.spawn else None
+    try:
+        if args.spawn:
+            process, port = spawn_server(args.workers, data_dir)
+            host = '127.0.0.1'
+        else:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        result = asyncio.run(run_load(host, port, args.users, args.requests, (name, file_type, data), args.unique))
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"{result['requests']} requests in {result['elapsedSeconds']}s: {result['requestsPerSecond']} req/s")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"  {endpoint:<8} {stats['requests']:>5} req  p50 {stats['p50Ms']} ms  p95 {stats['p95Ms']} ms  "
+              f"p99 {stats['p99Ms']} ms  errors {stats['errors']}  rejected {stats['rejected']}")
+
+    if args.output:
+        result.update({'users': args.users, 'requestsPerUser': args.requests, 'unique': args.unique,
+                       'timestamp': time.strftime('%Y-%m-%d %H:%M:%S')})
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
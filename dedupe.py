@@ -0,0 +1,201 @@
+"""
+Near-duplicate resumes: the same CV with small edits, or sent in through another channel.
+
+A resume's text is reduced to a MinHash signature of its five-word shingles; two
+signatures agree in about as many positions as the shingle sets overlap (their
+Jaccard similarity). The signature uses one permutation hashing: each shingle hash
+lands in one of 128 bins by its low bits and each bin keeps its smallest value, so
+a signature costs one pass over the shingles rather than 128. Signatures are
+bucketed by LSH banding, so checking a new resume against the whole pool only
+compares it with the few resumes that share a band, instead of with every one of
+them:
+
+    index = DuplicateIndex()
+    signature = minhash(text)
+    match = index.query(signature)          # (file hash, similarity, file name) or None
+    index.add(file_hash, signature, 'cv.pdf')
+    index.check(file_hash, signature, 'cv.pdf')   # both: {fileHash, fileName, similarity} or None
+
+With 16 bands of 8 rows, pairs above ~0.85 similarity almost always share a band,
+and pairs below ~0.5 rarely do; the threshold then decides on the estimate. From the stricter REUSE_THRESHOLD a
+duplicate may reuse the earlier resume's analysis instead of getting its own.
+"""
+import hashlib
+import os
+import re
+import threading
+from array import array
+
+from pyresume_log import get_logger
+
+logger = get_logger('dedupe')
+
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERMUTATIONS // BANDS
+# Estimated Jaccard similarity of shingle sets from which a resume counts as a duplicate
+DUPLICATE_THRESHOLD = 0.9
+# Similarity from which a duplicate may reuse the earlier resume's analysis (PYRESUME_REUSE_THRESHOLD)
+REUSE_THRESHOLD = float(os.environ.get('PYRESUME_REUSE_THRESHOLD', '0.97'))
+_BIN_BITS = NUM_PERMUTATIONS.bit_length() - 1
+_BIN_MASK = NUM_PERMUTATIONS - 1
+# Added per bin skipped when an empty bin borrows a neighbour's value, above any real value
+_BORROW_OFFSET = 1 << (64 - _BIN_BITS)
+_EMPTY = (1 << 64) - 1
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _shingle_hashes(text):
+    words = _WORD_RE.findall((text or '').lower())
+    if not words:
+        return set()
+    k = min(SHINGLE_WORDS, len(words))
+    return {int.from_bytes(hashlib.blake2b(' '.join(words[i:i + k]).encode('utf-8'), digest_size=8).digest(), 'little')
+            for i in range(len(words) - k + 1)}
+
+
+def minhash(text):
+    """
+    MinHash signature of a text (array of NUM_PERMUTATIONS 64-bit values), or None if it has no words.
+    """
+    hashes = _shingle_hashes(text)
+    if not hashes:
+        return None
+    bins = [_EMPTY] * NUM_PERMUTATIONS
+    for h in hashes:
+        b, value = h & _BIN_MASK, h >> _BIN_BITS
+        if value < bins[b]:
+            bins[b] = value
+    # Short texts leave bins empty; each takes the value of the next filled bin (wrapping
+    # around), offset by the distance so borrowed values only match the same borrowing
+    signature = array('Q', bins)
+    for b in range(NUM_PERMUTATIONS):
+        if bins[b] == _EMPTY:
+            distance = 1
+            while bins[(b + distance) & _BIN_MASK] == _EMPTY:
+                distance += 1
+            signature[b] = bins[(b + distance) & _BIN_MASK] + distance * _BORROW_OFFSET
+    return signature
+
+
+def similarity(a, b):
+    """
+    Estimated Jaccard similarity of the shingle sets behind two signatures.
+    """
+    return sum(x == y for x, y in zip(a, b)) / NUM_PERMUTATIONS
+
+
+def _band_keys(signature):
+    return [signature[i:i + ROWS_PER_BAND].tobytes() for i in range(0, NUM_PERMUTATIONS, ROWS_PER_BAND)]
+
+
+class DuplicateIndex:
+    """
+    LSH index of resume signatures, keyed by file hash.
+
+    loader, if given, is called on first use and yields (file hash, file name, signature
+    bytes) rows to start from, e.g. ResultsStore.signatures; saver, if given, is called
+    with (file hash, file name, signature) for every resume added after that, e.g.
+    ResultsStore.add_signature.
+    """
+    def __init__(self, threshold=DUPLICATE_THRESHOLD, loader=None, saver=None):
+        self.threshold = threshold
+        self.file_hashes = []   # row -> file hash
+        self.file_names = []    # row -> file name
+        self.signatures = []    # row -> signature
+        self.rows = {}          # file hash -> row
+        self.buckets = [{} for _ in range(BANDS)]  # band -> band key -> rows
+        self._loader = loader
+        self._saver = saver
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        self._load()
+        return len(self.file_hashes)
+
+    def __contains__(self, file_hash):
+        self._load()
+        return file_hash in self.rows
+
+    def _load(self):
+        if self._loader is None:
+            return
+        with self._lock:
+            loader, self._loader = self._loader, None
+            if loader is None:
+                return
+            for file_hash, file_name, data in loader():
+                signature = array('Q')
+                signature.frombytes(data)
+                if len(signature) == NUM_PERMUTATIONS:
+                    self._add(file_hash, signature, file_name)
+            logger.debug("Loaded %d resume signatures", len(self.file_hashes))
+
+    def _add(self, file_hash, signature, file_name):
+        if file_hash in self.rows:
+            return False
+        row = len(self.file_hashes)
+        self.rows[file_hash] = row
+        self.file_hashes.append(file_hash)
+        self.file_names.append(file_name)
+        self.signatures.append(signature)
+        for buckets, key in zip(self.buckets, _band_keys(signature)):
+            buckets.setdefault(key, []).append(row)
+        return True
+
+    def add(self, file_hash, signature, file_name=None):
+        """
+        Add a resume's signature. Returns False if the file hash is already indexed.
+        """
+        self._load()
+        with self._lock:
+            added = self._add(file_hash, signature, file_name)
+        if added and self._saver is not None:
+            try:
+                self._saver(file_hash, file_name, signature)
+            except Exception as e:
+                logger.warning("Could not save the signature of %s: %s", file_name or file_hash, e)
+        return added
+
+    def query(self, signature, exclude=None, threshold=None):
+        """
+        Most similar indexed resume other than the file hash exclude, as (file hash,
+        similarity, file name), if its similarity is at least threshold; else None.
+        """
+        self._load()
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates = set()
+            for buckets, key in zip(self.buckets, _band_keys(signature)):
+                candidates.update(buckets.get(key, ()))
+            best, best_score = None, threshold
+            for row in candidates:
+                if self.file_hashes[row] == exclude:
+                    continue
+                score = similarity(signature, self.signatures[row])
+                if score >= best_score:
+                    best, best_score = row, score
+            if best is None:
+                return None
+            return self.file_hashes[best], best_score, self.file_names[best]
+
+    def check(self, file_hash, signature, file_name=None):
+        """
+        The indexed resume a new one is a near-duplicate of, as {fileHash, fileName,
+        similarity}, or None. The new resume is added to the index either way.
+        """
+        match = self.query(signature, exclude=file_hash)
+        self.add(file_hash, signature, file_name)
+        if match is None:
+            return None
+        earlier_hash, score, earlier_name = match
+        return {'fileHash': earlier_hash, 'fileName': earlier_name, 'similarity': round(score, 3)}
+
+    def stats(self):
+        self._load()
+        with self._lock:
+            return {'resumes': len(self.file_hashes), 'threshold': self.threshold,
+                    'reuseThreshold': REUSE_THRESHOLD,
+                    'buckets': sum(len(buckets) for buckets in self.buckets)}
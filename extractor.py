@@ -1,29 +1,536 @@
+import codecs
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+
 import pymupdf
 from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE as RT
+
+from pyresume_log import get_logger
+
+logger = get_logger('extractor')
+
+# PDFs with at least this many pages are split across worker processes
+PARALLEL_MIN_PAGES = 24
+# Smallest number of pages handed to a single worker
+PAGES_PER_WORKER = 8
+# Limits on PDF extraction: a resume's signal is in its first pages, and a scanned
+# 300-page appendix should not be read (or held in memory) in full. None disables a limit.
+MAX_PDF_PAGES = 50
+MAX_TEXT_BYTES = 1024 * 1024
+MAX_EXTRACT_SECONDS = 20.0
+# Joins the pages of extracted PDF text, so offsets into it can be mapped back to pages
+# (see sections.page_starts); the newline keeps each page starting on a new line
+PAGE_BREAK = '\f\n'
+# Headings whose presence means the core of a resume has been read
+SIGNAL_HEADINGS = ('experience', 'education', 'skills')
+# Long PDFs stop being read after this many pages once every signal heading has been seen;
+# the pages after that are appendices, publication lists or scans, not resume
+SIGNAL_MIN_PAGES = 10
+
+_W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_NS = '{http://schemas.openxmlformats.org/markup-compatibility/2006}'
+_W_P = _W_NS + 'p'
+_W_T = _W_NS + 't'
+_W_TAB = _W_NS + 'tab'
+_W_BR = _W_NS + 'br'
+_W_CR = _W_NS + 'cr'
+_W_TBL = _W_NS + 'tbl'
+_W_TR = _W_NS + 'tr'
+_W_TC = _W_NS + 'tc'
+_W_TXBX_CONTENT = _W_NS + 'txbxContent'
+# Text boxes are stored twice (DrawingML + VML fallback); only the first copy is read
+_MC_FALLBACK = _MC_NS + 'Fallback'
+
+# External converters for legacy .doc files, tried in order; each prints the text on stdout
+DOC_CONVERTERS = (
+    ('antiword', ('-w', '0')),
+    ('catdoc', ('-w',)),
+    ('soffice', ('--headless', '--cat')),
+)
+
+# RTF tokens: control word with optional numeric argument, \'hh escape, control symbol, brace, line break, text
+_RTF_TOKEN_RE = re.compile(r"\\([a-z]{1,32})(-?\d{1,10})?[ ]?|\\'([0-9a-f]{2})|\\([^a-z])|([{}])|[\r\n]+|(.)",
+                           re.IGNORECASE | re.DOTALL)
+# Groups that hold no document text
+_RTF_DESTINATIONS = frozenset((
+    'fonttbl', 'colortbl', 'stylesheet', 'info', 'pict', 'object', 'objdata', 'themedata', 'colorschememapping',
+    'latentstyles', 'datastore', 'xmlnstbl', 'listtable', 'listoverridetable', 'rsidtbl', 'generator',
+    'fldinst', 'filetbl', 'revtbl', 'pgdsctbl', 'mmathPr', 'nonshppict', 'header', 'footer',
+))
+_RTF_SPECIALS = {
+    'par': '\n', 'line': '\n', 'row': '\n', 'sect': '\n\n', 'page': '\n\n', 'tab': '\t', 'cell': ' | ',
+    'emdash': '\u2014', 'endash': '\u2013', 'bullet': '\u2022', 'emspace': ' ', 'enspace': ' ',
+    'lquote': '\u2018', 'rquote': '\u2019', 'ldblquote': '\u201c', 'rdblquote': '\u201d',
+}
+
+# HTML elements whose content is not text, and elements that start a new line
+_HTML_SKIP_TAGS = frozenset(('script', 'style', 'template', 'noscript', 'svg'))
+_HTML_BLOCK_TAGS = frozenset((
+    'address', 'article', 'aside', 'blockquote', 'br', 'dd', 'div', 'dl', 'dt', 'footer', 'h1', 'h2', 'h3',
+    'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main', 'ol', 'p', 'pre', 'section', 'table', 'title', 'tr', 'ul',
+))
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """
+    Extract the text of pages [start, stop) - runs inside a worker process.
+    """
+    with pymupdf.open(pdf_path) as document:
+        return [document[number].get_text() for number in range(start, stop)]
+
+
+def extract_pdf_pages(pdf_path, parallel=True, max_workers=None, max_pages=None, stop_when=None):
+    """
+    Return the text of every page of a PDF (or of its first max_pages) as a list of strings.
+    Large documents are split into page ranges and extracted across worker processes.
+    stop_when(page_number, text), as for PdfPageStream, ends the list at the first page
+    it returns True for; page ranges no worker has started by then are cancelled.
+    """
+    pages = []
+    with pymupdf.open(pdf_path) as document:
+        page_count = document.page_count if max_pages is None else min(document.page_count, max_pages)
+        workers = min(max_workers or os.cpu_count() or 1, page_count // PAGES_PER_WORKER)
+        if not parallel or page_count < PARALLEL_MIN_PAGES or workers < 2:
+            for number in range(page_count):
+                pages.append(document[number].get_text())
+                if stop_when is not None and stop_when(number, pages[-1]):
+                    break
+            return pages
+
+    step = -(-page_count // workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_extract_page_range, pdf_path, start, min(start + step, page_count))
+                   for start in range(0, page_count, step)]
+        # Ranges are checked in page order, so the result matches reading the pages one by one
+        for future in futures:
+            for text in future.result():
+                pages.append(text)
+                if stop_when is not None and stop_when(len(pages) - 1, text):
+                    for pending in futures:
+                        pending.cancel()
+                    logger.info("Stopped reading %s after %d of %d pages (signal)", pdf_path, len(pages), page_count)
+                    return pages
+    return pages
+
+
+class PdfPageStream:
+    """
+    Iterate over the text of a PDF one page at a time, within page, byte and time limits.
+
+        stream = PdfPageStream(path, max_pages=10)
+        for text in stream:
+            ...
+        stream.stopped   # None, or why the document was not read to the end
+
+    Only the current page is loaded. stop_when(page_number, text) is called after each
+    page and ends the stream early when it returns True (see stop_when_sections_found).
+    """
+    def __init__(self, pdf_path, max_pages=MAX_PDF_PAGES, max_bytes=MAX_TEXT_BYTES,
+                 max_seconds=MAX_EXTRACT_SECONDS, stop_when=None):
+        self.pdf_path = pdf_path
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.max_seconds = max_seconds
+        self.stop_when = stop_when
+        self.page_count = None
+        self.pages_read = 0
+        self.bytes_read = 0
+        self.stopped = None
+
+    def __iter__(self):
+        deadline = time.monotonic() + self.max_seconds if self.max_seconds is not None else None
+        with pymupdf.open(self.pdf_path) as document:
+            self.page_count = document.page_count
+            for number in range(self.page_count):
+                if self.max_pages is not None and number >= self.max_pages:
+                    self.stopped = 'max_pages'
+                    break
+                if number and deadline is not None and time.monotonic() > deadline:
+                    self.stopped = 'timeout'
+                    break
+
+                text = document.load_page(number).get_text()
+                size = len(text.encode('utf-8'))
+                if self.max_bytes is not None and self.bytes_read + size > self.max_bytes:
+                    text = text.encode('utf-8')[:self.max_bytes - self.bytes_read].decode('utf-8', 'ignore')
+                    size = self.max_bytes - self.bytes_read
+                    self.stopped = 'max_bytes'
+                self.pages_read += 1
+                self.bytes_read += size
+                yield text
+
+                if self.stopped:
+                    break
+                if self.stop_when is not None and self.stop_when(number, text):
+                    self.stopped = 'signal'
+                    break
 
-def extract_text_from_pdf(pdf_path):
-    extracted_text = ""
+        if self.stopped:
+            logger.info("Stopped reading %s after %d of %d pages (%s)",
+                        self.pdf_path, self.pages_read, self.page_count, self.stopped)
+
+
+def stop_when_sections_found(headings=SIGNAL_HEADINGS, min_pages=SIGNAL_MIN_PAGES):
+    """
+    A stop_when callback that ends extraction once every heading has been seen on some page
+    and at least min_pages pages have been read.
+    """
+    patterns = {heading: re.compile(rf'^\W*{re.escape(heading)}\b', re.IGNORECASE | re.MULTILINE)
+                for heading in headings}
+    missing = set(headings)
+
+    def stop(page_number, text):
+        for heading in list(missing):
+            if patterns[heading].search(text):
+                missing.discard(heading)
+        return not missing and page_number + 1 >= min_pages
+
+    return stop
+
+
+def _truncate(text, max_bytes):
+    if max_bytes is not None:
+        encoded = text.encode('utf-8')
+        if len(encoded) > max_bytes:
+            return encoded[:max_bytes].decode('utf-8', 'ignore')
+    return text
+
+
+def _ocr_missing_pages(pdf_path, pages, cache):
+    """
+    Replace the pages that have no text layer with their OCR text, in place. Returns how
+    many of them didn't finish (timed out, or lost their worker) and may read on a retry.
+    """
+    import ocr
+    missing = [number for number, text in enumerate(pages) if ocr.needs_ocr(text)]
+    if not missing:
+        return 0
+    if not ocr.available():
+        logger.warning("%d page(s) of %s have no text layer and OCR is unavailable", len(missing), pdf_path)
+        return 0
+    read = ocr.ocr_pages(pdf_path, missing, cache=cache)
+    for number, text in read.items():
+        if text.strip():
+            pages[number] = text
+    return len(missing) - len(read)
+
+
+def _extract_pdf(pdf_path, parallel=True, max_pages=MAX_PDF_PAGES, max_bytes=MAX_TEXT_BYTES,
+                 max_seconds=MAX_EXTRACT_SECONDS, stop_when=None, ocr=True, cache=None):
+    """
+    extract_text_from_pdf, as (text, complete): complete is False when the OCR of some
+    page didn't finish, so the text shouldn't be cached as the file's final text.
+    """
     try:
-        with pymupdf.open(pdf_path) as file:
-            for page in file:
-                extracted_text += page.get_text()
+        with pymupdf.open(pdf_path) as document:
+            page_count = document.page_count if max_pages is None else min(document.page_count, max_pages)
+        if parallel and page_count >= PARALLEL_MIN_PAGES:
+            pages = extract_pdf_pages(pdf_path, parallel=True, max_pages=max_pages, stop_when=stop_when)
+        else:
+            pages = list(PdfPageStream(pdf_path, max_pages, max_bytes, max_seconds, stop_when))
+        unfinished = _ocr_missing_pages(pdf_path, pages, cache) if ocr else 0
+        return _truncate(PAGE_BREAK.join(pages), max_bytes), not unfinished
     except Exception as e:
-        print(f"Error extracting PDF: {e}")
-    return extracted_text
+        logger.warning("Error extracting PDF %s: %s", pdf_path, e)
+        return "", True
+
+
+def extract_text_from_pdf(pdf_path, parallel=True, max_pages=MAX_PDF_PAGES, max_bytes=MAX_TEXT_BYTES,
+                          max_seconds=MAX_EXTRACT_SECONDS, stop_when=None, ocr=True, cache=None):
+    """
+    Text of a PDF within the given limits, streamed page by page. Documents with at least
+    PARALLEL_MIN_PAGES pages (counting up to max_pages) are instead split across worker
+    processes when parallel is set, still ending at the page stop_when returns True for;
+    the time limit does not apply to that path. Pages without a text layer are OCR'd when
+    ocr is set; cache (a ResumeCache) keeps their OCR text. Pages are separated by PAGE_BREAK.
+    """
+    return _extract_pdf(pdf_path, parallel, max_pages, max_bytes, max_seconds, stop_when, ocr, cache)[0]
+
+
+def _paragraph_parts(element, parts, nested):
+    """
+    Collect the runs of one paragraph into parts; paragraphs found in text boxes go to nested.
+    """
+    for child in element:
+        tag = child.tag
+        if tag == _W_T:
+            parts.append(child.text or '')
+        elif tag == _W_TAB:
+            parts.append('\t')
+        elif tag in (_W_BR, _W_CR):
+            parts.append('\n')
+        elif tag == _MC_FALLBACK:
+            continue
+        elif tag == _W_TXBX_CONTENT:
+            _collect_lines(child, nested)
+        else:
+            _paragraph_parts(child, parts, nested)
+
+
+def _table_lines(table, lines):
+    for row in table.iterchildren(_W_TR):
+        cells = []
+        for cell in row.iterchildren(_W_TC):
+            cell_lines = []
+            _collect_lines(cell, cell_lines)
+            cells.append(' '.join(line for line in cell_lines if line))
+        if any(cells):
+            lines.append(' | '.join(cells))
+
+
+def _collect_lines(element, lines):
+    """
+    Append the text of every paragraph and table row under element, in document order.
+    """
+    for child in element:
+        tag = child.tag
+        if tag == _MC_FALLBACK:
+            continue
+        if tag == _W_P:
+            parts = []
+            nested = []
+            _paragraph_parts(child, parts, nested)
+            lines.append(''.join(parts))
+            lines.extend(nested)
+        elif tag == _W_TBL:
+            _table_lines(child, lines)
+        else:
+            _collect_lines(child, lines)
+
+
+def extract_docx_lines(docx_path):
+    """
+    Return the lines of a DOCX: body paragraphs, table rows and text boxes in
+    document order, followed by the distinct headers and footers.
+    """
+    document = Document(docx_path)
+    lines = []
+    _collect_lines(document.element.body, lines)
+
+    seen_parts = set()
+    for rel in document.part.rels.values():
+        if rel.is_external or rel.reltype not in (RT.HEADER, RT.FOOTER):
+            continue
+        part = rel.target_part
+        if part.partname in seen_parts:
+            continue
+        seen_parts.add(part.partname)
+        _collect_lines(part.element, lines)
+
+    return lines
+
 
 def extract_text_from_docx(docx_path):
-    extracted_text = ""
     try:
-        document = Document(docx_path)
-        for paragraph in document.paragraphs:
-            extracted_text += paragraph.text + "\n"
+        return '\n'.join(extract_docx_lines(docx_path)) + '\n'
+    except Exception as e:
+        logger.warning("Error extracting DOCX %s: %s", docx_path, e)
+        return ""
+
+
+def extract_text_from_doc(doc_path, max_bytes=MAX_TEXT_BYTES, timeout=MAX_EXTRACT_SECONDS):
+    """
+    Text of a Word 97-2003 file, from the first of DOC_CONVERTERS that is installed.
+    """
+    for name, args in DOC_CONVERTERS:
+        executable = shutil.which(name)
+        if executable is None:
+            continue
+        try:
+            completed = subprocess.run([executable, *args, doc_path], capture_output=True, timeout=timeout,
+                                       check=True)
+            return _truncate(decode_text(completed.stdout), max_bytes)
+        except (OSError, subprocess.SubprocessError) as e:
+            logger.warning("%s could not read %s: %s", name, doc_path, e)
+    logger.warning("Cannot extract %s: install antiword, catdoc or LibreOffice to read .doc files", doc_path)
+    return ""
+
+
+def decode_text(data):
+    """
+    Text of a plain text file's bytes: by byte order mark, else UTF-8, else Windows-1252.
+    """
+    for bom, encoding in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'),
+                          (codecs.BOM_UTF16_BE, 'utf-16')):
+        if data.startswith(bom):
+            return data.decode(encoding, 'replace')
+    try:
+        return data.decode('utf-8')
+    except UnicodeDecodeError:
+        return data.decode('cp1252', 'replace')
+
+
+def _read_bytes(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def extract_text_from_txt(txt_path, max_bytes=MAX_TEXT_BYTES):
+    try:
+        return _truncate(decode_text(_read_bytes(txt_path)), max_bytes)
+    except Exception as e:
+        logger.warning("Error extracting text file %s: %s", txt_path, e)
+        return ""
+
+
+def rtf_to_text(rtf):
+    """
+    Document text of an RTF string: control words, font and style tables, pictures
+    and field instructions are dropped; \\uN and \\'hh characters are decoded.
+    """
+    stack = []
+    ignorable = False
+    uc_skip = 1  # Fallback characters that follow each \\uN
+    skip = 0
+    out = []
+    for match in _RTF_TOKEN_RE.finditer(rtf):
+        word, arg, hex_code, symbol, brace, char = match.groups()
+        if brace:
+            skip = 0
+            if brace == '{':
+                stack.append((uc_skip, ignorable))
+            elif stack:
+                uc_skip, ignorable = stack.pop()
+        elif symbol:
+            skip = 0
+            if symbol == '*':
+                ignorable = True
+            elif not ignorable:
+                if symbol == '~':
+                    out.append('\xa0')
+                elif symbol in '{}\\':
+                    out.append(symbol)
+                elif symbol in '\r\n':
+                    out.append('\n')
+        elif word:
+            skip = 0
+            if word in _RTF_DESTINATIONS:
+                ignorable = True
+            elif ignorable:
+                continue
+            elif word in _RTF_SPECIALS:
+                out.append(_RTF_SPECIALS[word])
+            elif word == 'uc':
+                uc_skip = int(arg or 1)
+            elif word == 'u' and arg:
+                code = int(arg)
+                out.append(chr(code + 0x10000 if code < 0 else code))
+                skip = uc_skip
+        elif hex_code:
+            if skip:
+                skip -= 1
+            elif not ignorable:
+                out.append(bytes((int(hex_code, 16),)).decode('cp1252', 'replace'))
+        elif char:
+            if skip:
+                skip -= 1
+            elif not ignorable:
+                out.append(char)
+    return ''.join(out)
+
+
+def extract_text_from_rtf(rtf_path, max_bytes=MAX_TEXT_BYTES):
+    try:
+        # RTF itself is 7-bit; anything else is escaped
+        return _truncate(rtf_to_text(_read_bytes(rtf_path).decode('latin-1')), max_bytes)
     except Exception as e:
-        print(f"Error extracting DOCX: {e}")
-    return extracted_text
+        logger.warning("Error extracting RTF %s: %s", rtf_path, e)
+        return ""
+
+
+class _HtmlText(HTMLParser):
+    """
+    Collects the visible text of an HTML document, one line per block element.
+    """
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self.skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in _HTML_SKIP_TAGS:
+            self.skipping += 1
+        elif tag in _HTML_BLOCK_TAGS:
+            self.parts.append('\n')
+        elif tag in ('td', 'th'):
+            self.parts.append(' | ')
+
+    def handle_endtag(self, tag):
+        if tag in _HTML_SKIP_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag in _HTML_BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        if not self.skipping:
+            self.parts.append(' '.join(data.split()) if not data.isspace() else ' ')
+
+    def text(self):
+        lines = (line.strip(' |') for line in ''.join(self.parts).splitlines())
+        return '\n'.join(line for line in lines if line) + '\n'
+
+
+def html_to_text(html):
+    parser = _HtmlText()
+    parser.feed(html)
+    parser.close()
+    return parser.text()
+
+
+def extract_text_from_html(html_path, max_bytes=MAX_TEXT_BYTES):
+    try:
+        return _truncate(html_to_text(decode_text(_read_bytes(html_path))), max_bytes)
+    except Exception as e:
+        logger.warning("Error extracting HTML %s: %s", html_path, e)
+        return ""
+
+
+EXTRACTORS = {
+    '.pdf': extract_text_from_pdf,
+    '.docx': extract_text_from_docx,
+    '.doc': extract_text_from_doc,
+    '.rtf': extract_text_from_rtf,
+    '.txt': extract_text_from_txt,
+    '.html': extract_text_from_html,
+    '.htm': extract_text_from_html,
+}
+
+
+def extract_text(file_path, cache=None):
+    """
+    Extract the text of a resume, choosing the extractor from the file extension, or
+    from the file's content when the extension is not one of EXTRACTORS.
+    cache (a ResumeCache) keeps the OCR text of scanned PDF pages. PDFs stop being read
+    once they have shown a resume's core sections (see stop_when_sections_found).
+    """
+    return extract_resume_text(file_path, cache)[0]
+
 
+def extract_resume_text(file_path, cache=None):
+    """
+    extract_text, as (text, complete): complete is False when the OCR of a scanned page
+    timed out or lost its worker, so the text is missing a page another try may read.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    extractor = EXTRACTORS.get(ext)
+    if extractor is None:
+        from ingestion import detect_file
+        fmt = detect_file(file_path)
+        extractor = EXTRACTORS.get(fmt.extension) if fmt else None
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {ext or file_path}")
+    if extractor is extract_text_from_pdf:
+        return _extract_pdf(file_path, stop_when=stop_when_sections_found(), cache=cache)
+    return extractor(file_path), True
 
-pdf_text = extract_text_from_pdf("resume-sample.pdf")
-docx_text = extract_text_from_docx("resume-sample.docx")
 
-print(pdf_text)
-print(docx_text)
+if __name__ == '__main__':
+    for path in sys.argv[1:] or ["resume-sample.pdf", "resume-sample.docx"]:
+        print(extract_text(path))
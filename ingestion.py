@@ -0,0 +1,212 @@
+"""
+Resume ingestion: recognise a file by its first bytes and bring it into the upload store.
+
+    fmt = detect_format(header)              # Format, or None for anything unsupported
+    stored, created, fmt = ingest_path(store, '/home/me/cv.rtf')
+    stored, created, fmt = ingest_bytes(store, data, 'cv.pdf')
+
+The format is sniffed from magic bytes, never trusted from the file name, so an
+unsupported or mislabelled file is rejected before it is decoded, hashed, copied
+or extracted. Stored objects get the extension of their sniffed format, which is
+what extractor.extract_text dispatches on.
+
+ingest_path takes a file the user picked in the native file dialog: it is hashed
+and copied into the store straight from disk, so its bytes never go through
+base64 or the JS bridge.
+"""
+import codecs
+import io
+import os
+import shutil
+import zipfile
+
+from pyresume_log import get_logger
+from resume_cache import hash_bytes, hash_file
+
+logger = get_logger('ingestion')
+
+# Bytes read from the start of a file to decide its format
+SNIFF_BYTES = 2048
+# Text files with a larger share of control characters than this are treated as binary
+MAX_CONTROL_RATIO = 0.05
+
+_OLE_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+_ZIP_MAGIC = b'PK\x03\x04'
+_HTML_STARTS = (b'<!doctype html', b'<html', b'<head', b'<body')
+_CONTROL_BYTES = bytes(set(range(32)) - {9, 10, 12, 13})
+
+
+class UnsupportedFormat(ValueError):
+    pass
+
+
+class Format:
+    __slots__ = ('name', 'extensions', 'mime', 'label')
+
+    def __init__(self, name, extensions, mime, label):
+        self.name = name
+        self.extensions = extensions
+        self.mime = mime
+        self.label = label
+
+    @property
+    def extension(self):
+        """
+        Extension stored files of this format get, and extractor.EXTRACTORS is keyed by.
+        """
+        return self.extensions[0]
+
+    def __repr__(self):
+        return f"Format({self.name!r})"
+
+
+FORMATS = {fmt.name: fmt for fmt in (
+    Format('pdf', ('.pdf',), 'application/pdf', 'PDF'),
+    Format('docx', ('.docx',), 'application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'Word'),
+    Format('doc', ('.doc',), 'application/msword', 'Word 97-2003'),
+    Format('rtf', ('.rtf',), 'application/rtf', 'Rich Text'),
+    Format('html', ('.html', '.htm'), 'text/html', 'HTML'),
+    Format('txt', ('.txt',), 'text/plain', 'Plain text'),
+)}
+
+# Every extension a supported resume can have, for file dialogs and folder scans
+EXTENSIONS = tuple(ext for fmt in FORMATS.values() for ext in fmt.extensions)
+
+
+def _is_docx(source):
+    """
+    Whether source (a path, bytes or a binary file) is a zip holding a Word document.
+    Only the zip's central directory at the end of the file is read.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    try:
+        with zipfile.ZipFile(source) as archive:
+            return 'word/document.xml' in archive.namelist()
+    except (zipfile.BadZipFile, OSError):
+        return False
+
+
+def _looks_like_text(header):
+    if b'\x00' in header:
+        return False
+    try:
+        # Not final: the header may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder('utf-8')().decode(header, final=False)
+        return True
+    except UnicodeDecodeError:
+        pass
+    # Probably a legacy single-byte encoding; binary data is full of control bytes
+    controls = len(header) - len(header.translate(None, _CONTROL_BYTES))
+    return controls <= len(header) * MAX_CONTROL_RATIO
+
+
+def detect_format(header, source=None):
+    """
+    Format of a file from its first bytes (at least SNIFF_BYTES of them where the file is
+    that long), or None if it is not a supported resume format.
+
+    A zip only counts as DOCX once its directory lists word/document.xml; that needs the
+    whole file as source (a path, bytes or a binary file). Without a source, a zip is
+    accepted provisionally and should be checked again once the file is complete.
+    """
+    header = bytes(header[:SNIFF_BYTES])
+    if not header:
+        return None
+    # Some generators put junk before the PDF signature; readers allow it in the first KB
+    if b'%PDF-' in header[:1024]:
+        return FORMATS['pdf']
+    if header.startswith(_ZIP_MAGIC):
+        if source is None:
+            return FORMATS['docx'] if b'xl/' not in header and b'ppt/' not in header else None
+        return FORMATS['docx'] if _is_docx(source) else None
+    if header.startswith(_OLE_MAGIC):
+        return FORMATS['doc']
+    if header.startswith(b'{\\rtf'):
+        return FORMATS['rtf']
+
+    if header.startswith(codecs.BOM_UTF16_LE) or header.startswith(codecs.BOM_UTF16_BE):
+        text = header.decode('utf-16', 'ignore').encode('utf-8')
+    elif _looks_like_text(header):
+        text = header[len(codecs.BOM_UTF8):] if header.startswith(codecs.BOM_UTF8) else header
+    else:
+        return None
+    start = text.lstrip().lower()
+    if start.startswith(_HTML_STARTS) or (start.startswith((b'<!', b'<?xml')) and b'<html' in start):
+        return FORMATS['html']
+    return FORMATS['txt']
+
+
+def read_header(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read(SNIFF_BYTES)
+
+
+def detect_file(file_path):
+    """
+    Format of a file on disk, or None if it is not a supported resume format.
+    """
+    return detect_format(read_header(file_path), file_path)
+
+
+def require_format(header, source=None, file_name=None):
+    """
+    detect_format, raising UnsupportedFormat instead of returning None.
+    """
+    fmt = detect_format(header, source)
+    if fmt is None:
+        supported = ', '.join(known.label for known in FORMATS.values())
+        raise UnsupportedFormat(f"{file_name or 'The file'} is not a supported resume format ({supported})")
+    return fmt
+
+
+def check_name(file_name, fmt):
+    """
+    Log when a file's extension disagrees with its sniffed format; the content wins.
+    """
+    ext = os.path.splitext(file_name or '')[1].lower()
+    if ext and ext not in fmt.extensions:
+        logger.info("%s is a %s file; storing it as %s", file_name, fmt.label, fmt.extension)
+
+
+def ingest_path(store, file_path, file_name=None, max_bytes=None):
+    """
+    Bring a local file into the upload store without reading it into memory.
+    Returns (stored file, created, format). Raises UnsupportedFormat for anything
+    that is not a supported resume, or that is empty or larger than max_bytes.
+    """
+    file_name = file_name or os.path.basename(file_path)
+    size = os.path.getsize(file_path)
+    if size == 0:
+        raise UnsupportedFormat(f"{file_name} is empty")
+    if max_bytes is not None and size > max_bytes:
+        raise UnsupportedFormat(f"{file_name} is {size} bytes; the limit is {max_bytes}")
+    fmt = require_format(read_header(file_path), file_path, file_name)
+    check_name(file_name, fmt)
+
+    file_hash = hash_file(file_path)
+    stored = store.lookup(file_hash, file_name)
+    if stored is not None:
+        return stored, False, fmt
+    fd, temp_path = store.temp_file()
+    os.close(fd)
+    try:
+        # A kernel-side copy (sendfile / copy_file_range where available), never through Python buffers
+        shutil.copyfile(file_path, temp_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+    stored, created = store.put_file(temp_path, file_name, file_hash, size, ext=fmt.extension)
+    return stored, created, fmt
+
+
+def ingest_bytes(store, data, file_name, file_hash=None):
+    """
+    ingest_path for the bytes of an upload. Returns (stored file, created, format).
+    """
+    if not data:
+        raise UnsupportedFormat(f"{file_name} is empty")
+    fmt = require_format(data[:SNIFF_BYTES], data, file_name)
+    check_name(file_name, fmt)
+    stored, created = store.put_bytes(data, file_name, file_hash or hash_bytes(data), ext=fmt.extension)
+    return stored, created, fmt
@@ -0,0 +1,88 @@
+"""
+Job descriptions compiled once for scoring against many resumes.
+
+Ranking hundreds of resumes against one posting used to re-scan the posting for
+skills and terms once per resume. compile_job does that work once and keeps the
+result in a small LRU cache keyed by the hash of the text, so every later call
+with the same posting (in this process) is a dictionary lookup.
+"""
+import threading
+from array import array
+from collections import OrderedDict
+
+from resume_cache import hash_text
+from similarity import term_frequencies
+from skills import get_matcher
+
+JOB_CACHE_SIZE = 64
+
+
+class CompiledJob:
+    """
+    Everything scoring needs from a job description.
+
+    required_skills are in taxonomy order, with their matcher indices in required_ids;
+    weights maps each required skill to its weight in the score (every skill counts
+    once for now); terms are the TF-IDF term counts of the text.
+    """
+    __slots__ = ('text', 'normalized', 'hash', 'required_skills', 'required_ids', 'weights', 'terms',
+                 'analysis_key')
+
+    def __init__(self, text):
+        matcher = get_matcher()
+        self.text = text
+        self.normalized = ' '.join(text.lower().split())
+        self.hash = hash_text(text)
+        found = {skill for skill, _, _ in matcher.find(text)}
+        self.required_ids = array('H', [i for i, skill in enumerate(matcher.skills) if skill in found])
+        self.required_skills = [matcher.skills[i] for i in self.required_ids]
+        self.weights = dict.fromkeys(self.required_skills, 1.0)
+        self.terms = term_frequencies(self.normalized)
+        self.analysis_key = None  # memoized by analyzer.job_cache_key
+
+    def __repr__(self):
+        return f"CompiledJob({len(self.text)} chars, required_skills={self.required_skills})"
+
+    def score(self, resume_skill_ids):
+        """
+        (matched, missing, score) for a set of resume skill ids; score is the weighted share of
+        required skills the resume has, 0-100, or None when the job names no skills.
+        """
+        matched, missing = [], []
+        for skill_id, skill in zip(self.required_ids, self.required_skills):
+            (matched if skill_id in resume_skill_ids else missing).append(skill)
+        if not self.required_skills:
+            return matched, missing, None
+        total = sum(self.weights.values())
+        return matched, missing, int(sum(self.weights[skill] for skill in matched) / total * 100)
+
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_job(job_desc):
+    """
+    CompiledJob for a job description string (stripped first), from the LRU cache when
+    possible. A CompiledJob passed in is returned as is.
+    """
+    if isinstance(job_desc, CompiledJob):
+        return job_desc
+    text = str(job_desc).strip() if job_desc else ""
+    key = hash_text(text)
+    with _cache_lock:
+        job = _cache.get(key)
+        if job is not None:
+            _cache.move_to_end(key)
+            return job
+    job = CompiledJob(text)
+    with _cache_lock:
+        _cache[key] = job
+        while len(_cache) > JOB_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return job
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
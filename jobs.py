@@ -0,0 +1,141 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from pyresume_log import get_logger
+
+logger = get_logger('jobs')
+
+# Finished jobs kept around so the page can still fetch their result
+MAX_FINISHED_JOBS = 100
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """
+    One background analysis. The worker function reports its stages through
+    progress() and calls check_cancelled() between stages.
+    """
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.id = job_id
+        self.status = 'queued'
+        self.stage = 'queued'
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.future = None
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.id)
+
+    def progress(self, stage, **info):
+        self.check_cancelled()
+        self.stage = stage
+        self.manager.notify(self, info)
+
+    def snapshot(self):
+        data = {
+            'job_id': self.id,
+            'status': self.status,
+            'stage': self.stage,
+            'created': self.created,
+            'finished': self.finished,
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'error':
+            data['message'] = self.error
+        return data
+
+
+class JobManager:
+    """
+    Runs jobs on a small thread pool and keeps their state by job id.
+    on_progress(snapshot, info) is called on every stage change, from the worker thread.
+    """
+    def __init__(self, max_workers=2, on_progress=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pyresume-job')
+        self.on_progress = on_progress
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args):
+        """
+        Queue fn(job, *args) and return the job id immediately. fn's return value becomes the job result.
+        """
+        job = Job(self, uuid.uuid4().hex)
+        with self._lock:
+            self.jobs[job.id] = job
+            self._prune()
+        job.future = self.executor.submit(self._run, job, fn, args)
+        return job.id
+
+    def _run(self, job, fn, args):
+        if job.cancelled:
+            return
+        job.status = 'running'
+        try:
+            job.progress('started')
+            job.result = fn(job, *args)
+            job.status = 'done'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.exception("Job %s failed", job.id)
+            job.status = 'error'
+            job.error = str(e)
+        finally:
+            job.finished = time.time()
+            job.stage = job.status
+            self.notify(job, {})
+
+    def notify(self, job, info):
+        if self.on_progress:
+            try:
+                self.on_progress(job.snapshot(), info)
+            except Exception as e:
+                logger.warning("Could not deliver progress for job %s: %s", job.id, e)
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Cancel a job: queued jobs never start, running jobs stop at their next stage boundary.
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+        job.cancel_event.set()
+        if job.future and job.future.cancel():
+            job.status = job.stage = 'cancelled'
+            job.finished = time.time()
+            self.notify(job, {})
+        return True
+
+    @property
+    def queue_depth(self):
+        return sum(1 for job in list(self.jobs.values()) if job.status in ('queued', 'running'))
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def shutdown(self):
+        for job in list(self.jobs.values()):
+            job.cancel_event.set()
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,387 @@
+"""
+Opt-in metrics and profiling for the analysis pipeline.
+
+    PYRESUME_METRICS=1        count requests and record stage latencies from every
+                              finished RequestTiming (see pyresume_log)
+    PYRESUME_METRICS_PORT=N   also serve them for scraping at http://127.0.0.1:N/metrics
+    PYRESUME_PROFILE=1        also profile each analysis with cProfile and tracemalloc;
+                              set it to a directory to choose where profiles go
+
+Metrics live in REGISTRY: counters and histograms updated as requests finish, and
+gauges read from their source (cache stats, job queue depth, ...) when collected.
+render_prometheus() gives the Prometheus text format for a local scraper,
+snapshot() the same numbers as plain data for the desktop bridge.
+
+Profiles are written per request to PROFILE_DIR as <kind>-<request id>.prof (open
+with pstats or snakeviz) and <kind>-<request id>.mem.txt, the lines that allocated
+the most memory during the request. tracemalloc traces the whole process, so the
+memory report of overlapping requests includes each other's allocations; only one
+request at a time is profiled with cProfile.
+"""
+import cProfile
+import math
+import os
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pyresume_log import add_timing_listener, get_logger
+
+logger = get_logger('metrics')
+
+# Latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PROFILE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "profiles")
+# Allocation sites listed in each memory report
+MEMORY_TOP_LINES = 25
+# Frames kept per traced allocation; more shows more of the call path but costs more
+TRACEMALLOC_FRAMES = 1
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _label_text(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """
+    Monotonic count per combination of label values.
+    """
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, (), value) for key, value in self.values.items()]
+
+    def snapshot(self):
+        with self._lock:
+            return [dict(zip(self.labels, key), value=value) for key, value in self.values.items()]
+
+
+class Histogram:
+    """
+    Distribution of observed values (latencies in seconds) per combination of label values.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self.values = {}  # label values -> [per-bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(label, '')) for label in self.labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            entries = [(key, list(counts), total, count) for key, (counts, total, count) in self.values.items()]
+        samples = []
+        for key, counts, total, count in entries:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((self.name + '_bucket', key, (('le', _number(bound)),), cumulative))
+            samples.append((self.name + '_sum', key, (), total))
+            samples.append((self.name + '_count', key, (), count))
+        return samples
+
+    def quantile(self, counts, count, q):
+        """
+        Upper bound of the bucket holding the q-quantile, the usual histogram estimate.
+        """
+        rank, cumulative = q * count, 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return bound if bound != math.inf else self.buckets[-2]
+        return self.buckets[-2]
+
+    def snapshot(self):
+        with self._lock:
+            entries = [(key, list(counts), total, count) for key, (counts, total, count) in self.values.items()]
+        return [dict(zip(self.labels, key), count=count, sum=round(total, 6), mean=round(total / count, 6),
+                     p50=self.quantile(counts, count, 0.5), p95=self.quantile(counts, count, 0.95))
+                for key, counts, total, count in entries]
+
+
+class Gauge:
+    """
+    Value read when metrics are collected: fn() returns a number, or a dict from label
+    values (a tuple, or a string for a single label) to numbers. type can be 'counter'
+    for totals kept elsewhere, e.g. cache hit counts.
+    """
+    def __init__(self, name, help, fn, labels=(), type='gauge'):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.labels = tuple(labels)
+        self.type = type
+
+    def _values(self):
+        try:
+            value = self.fn()
+        except Exception as e:
+            logger.debug("Could not collect %s: %s", self.name, e)
+            return {}
+        if value is None:
+            return {}
+        if not isinstance(value, dict):
+            return {(): value}
+        return {(key if isinstance(key, tuple) else (key,)): v for key, v in value.items()}
+
+    def samples(self):
+        return [(self.name, key, (), value) for key, value in self._values().items()]
+
+    def snapshot(self):
+        return [dict(zip(self.labels, key), value=value) for key, value in self._values().items()]
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, factory):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = factory()
+            return metric
+
+    def counter(self, name, help, labels=()):
+        return self._get(name, lambda: Counter(name, help, labels))
+
+    def histogram(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        return self._get(name, lambda: Histogram(name, help, labels, buckets))
+
+    def gauge(self, name, help, fn, labels=(), type='gauge'):
+        """
+        Register (or replace) a gauge read from fn at collection time.
+        """
+        with self._lock:
+            metric = self.metrics[name] = Gauge(name, help, fn, labels, type)
+        return metric
+
+    def render_prometheus(self):
+        """
+        Every metric in the Prometheus text exposition format (version 0.0.4).
+        """
+        with self._lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, key, extra, value in metric.samples():
+                lines.append(f'{name}{_label_text(metric.labels, key, extra)} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        Every metric as plain data: {name: {'type', 'help', 'values': [{labels..., value}]}};
+        histogram values carry count, sum, mean, p50 and p95 instead of value.
+        """
+        with self._lock:
+            metrics = list(self.metrics.values())
+        return {metric.name: {'type': metric.type, 'help': metric.help, 'values': metric.snapshot()}
+                for metric in metrics}
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.counter('pyresume_requests_total', "Finished requests by kind and status",
+                            ('kind', 'status'))
+REQUEST_SECONDS = REGISTRY.histogram('pyresume_request_duration_seconds', "Request latency by kind", ('kind',))
+STAGE_SECONDS = REGISTRY.histogram('pyresume_stage_duration_seconds', "Latency of each request stage",
+                                   ('kind', 'stage'))
+ANALYSES = REGISTRY.counter('pyresume_analyses_total',
+                            "Successful analyses by source: cache hit, reused duplicate or computed",
+                            ('source',))
+
+_enabled = False
+_enable_lock = threading.Lock()
+
+
+def observe_timing(record):
+    """
+    Timing listener: fold one finished RequestTiming record into the metrics.
+    """
+    kind = record['kind']
+    REQUESTS.inc(kind=kind, status=record['status'])
+    REQUEST_SECONDS.observe(record['totalMs'] / 1000, kind=kind)
+    for stage, ms in record['stages'].items():
+        STAGE_SECONDS.observe(ms / 1000, kind=kind, stage=stage)
+    if kind == 'analyze' and record['status'] == 'success':
+        source = 'cache' if record.get('cached') else 'duplicate' if record.get('duplicate') else 'computed'
+        ANALYSES.inc(source=source)
+
+
+def enable():
+    """
+    Start recording request metrics. Safe to call more than once.
+    """
+    global _enabled
+    with _enable_lock:
+        if not _enabled:
+            add_timing_listener(observe_timing)
+            _enabled = True
+            logger.info("Metrics enabled")
+
+
+def enabled():
+    return _enabled
+
+
+class RequestProfiler:
+    """
+    Per-request cProfile and tracemalloc snapshots, written to directory.
+
+        profiler = RequestProfiler()
+        with profiler.profile(timing):
+            ...
+
+    Does nothing unless enabled; fields of timing get the paths of the files written.
+    """
+    def __init__(self, directory=PROFILE_DIR, enabled=False):
+        self.directory = directory
+        self.enabled = enabled
+        self._cprofile_lock = threading.Lock()
+
+    def enable(self, directory=None):
+        self.directory = directory or self.directory
+        os.makedirs(self.directory, exist_ok=True)
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        self.enabled = True
+        logger.info("Profiling every analysis into %s", self.directory)
+
+    def disable(self):
+        self.enabled = False
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    @contextmanager
+    def profile(self, timing):
+        if not self.enabled:
+            yield
+            return
+        before = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        # cProfile can only run one profiler at a time; a request overlapping another is not profiled
+        profiler = cProfile.Profile() if self._cprofile_lock.acquire(blocking=False) else None
+        try:
+            if profiler is not None:
+                profiler.enable()
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._cprofile_lock.release()
+            # Snapshot before the profile is written, so its own allocations aren't counted
+            after = tracemalloc.take_snapshot() if before is not None else None
+            self._write(timing, profiler, before, after)
+
+    def _write(self, timing, profiler, before, after):
+        base = os.path.join(self.directory, f'{timing.kind}-{timing.id}')
+        try:
+            if profiler is not None:
+                profiler.dump_stats(base + '.prof')
+                timing.fields['profile'] = base + '.prof'
+            if before is not None:
+                # The snapshots' own bookkeeping is not the request's
+                ignore = (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, '<unknown>'))
+                growth = after.filter_traces(ignore).compare_to(before.filter_traces(ignore), 'lineno')
+                timing.fields['memoryDeltaKb'] = round(sum(stat.size_diff for stat in growth) / 1024, 1)
+                with open(base + '.mem.txt', 'w', encoding='utf-8') as f:
+                    f.write(f"{timing.kind} {timing.id}: {timing.fields['memoryDeltaKb']} KB net allocated\n")
+                    for stat in growth[:MEMORY_TOP_LINES]:
+                        f.write(f"{stat}\n")
+                timing.fields['memoryProfile'] = base + '.mem.txt'
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", base, e)
+
+
+PROFILER = RequestProfiler()
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = REGISTRY.render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', PROMETHEUS_CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port, host='127.0.0.1'):
+    """
+    Serve /metrics for a local Prometheus scraper on a daemon thread; returns the server.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info("Serving metrics on http://%s:%s/metrics", host, server.server_address[1])
+    return server
+
+
+def enable_from_env():
+    """
+    Turn on metrics, the scrape endpoint and profiling as requested by PYRESUME_METRICS,
+    PYRESUME_METRICS_PORT and PYRESUME_PROFILE. Returns the metrics server, if one was started.
+    """
+    profile = os.environ.get('PYRESUME_PROFILE', '')
+    port = os.environ.get('PYRESUME_METRICS_PORT', '')
+    if os.environ.get('PYRESUME_METRICS', '') not in ('', '0') or port or profile not in ('', '0'):
+        enable()
+    if profile not in ('', '0'):
+        PROFILER.enable(profile if profile not in ('1', 'true', 'yes') else None)
+    if port:
+        try:
+            return serve(int(port))
+        except (OSError, ValueError) as e:
+            logger.warning("Could not serve metrics on port %s: %s", port, e)
+    return None
@@ -0,0 +1,111 @@
+"""
+Shared spaCy pipeline, loaded lazily in a background thread.
+
+Nothing here imports spaCy until warm_up() or get_nlp() is called, so importing
+this module costs nothing. The desktop app calls warm_up() once the window is
+shown; analyses then use the model if it is ready and skip the NLP stage
+instead of blocking if it is not.
+"""
+import os
+import threading
+import time
+
+from pyresume_log import get_logger
+
+logger = get_logger('nlp')
+
+DEFAULT_MODEL = os.environ.get('PYRESUME_SPACY_MODEL', 'en_core_web_sm')
+# Only the entity recognizer is used; the rest of the pipeline is never loaded
+EXCLUDED_COMPONENTS = ('tagger', 'parser', 'attribute_ruler', 'lemmatizer', 'senter', 'morphologizer')
+# Entity labels kept in the analysis output
+ENTITY_LABELS = ('ORG', 'GPE', 'DATE', 'PERSON')
+
+
+class NlpLoader:
+    """
+    Loads one spaCy model on a background thread and hands the same instance to every caller.
+    """
+    def __init__(self, model_name=DEFAULT_MODEL):
+        self.model_name = model_name
+        self.nlp = None
+        self.error = None
+        self.load_seconds = None
+        self._ready = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """
+        Start loading in the background; calling it again is a no-op.
+        """
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name='spacy-loader', daemon=True)
+                self._thread.start()
+        return self
+
+    def _load(self):
+        start = time.perf_counter()
+        try:
+            import spacy
+            self.nlp = spacy.load(self.model_name, exclude=list(EXCLUDED_COMPONENTS))
+            logger.info("spaCy model '%s' loaded with %s", self.model_name, self.nlp.pipe_names)
+        except Exception as e:
+            self.error = e
+            logger.warning("spaCy model '%s' unavailable, NLP stage disabled: %s", self.model_name, e)
+        finally:
+            self.load_seconds = time.perf_counter() - start
+            self._ready.set()
+
+    @property
+    def ready(self):
+        return self._ready.is_set() and self.nlp is not None
+
+    def get(self, wait=True, timeout=None):
+        """
+        Return the loaded pipeline, or None if it failed to load (or is still
+        loading and wait is False).
+        """
+        self.start()
+        if wait:
+            self._ready.wait(timeout)
+        return self.nlp
+
+
+_loader = NlpLoader()
+
+
+def warm_up():
+    """
+    Begin loading the shared model in the background.
+    """
+    return _loader.start()
+
+
+def get_nlp(wait=True, timeout=None):
+    return _loader.get(wait, timeout)
+
+
+def loader():
+    return _loader
+
+
+def _entities(doc):
+    found = {}
+    for ent in doc.ents:
+        if ent.label_ in ENTITY_LABELS:
+            names = found.setdefault(ent.label_, [])
+            if ent.text not in names:
+                names.append(ent.text)
+    return found
+
+
+def extract_entities(texts, batch_size=16, wait=True):
+    """
+    Named entities for each text, as {label: [distinct texts]}. Texts are
+    processed together through nlp.pipe. Returns None when no model is available.
+    """
+    nlp = get_nlp(wait=wait)
+    if nlp is None:
+        return None
+    return [_entities(doc) for doc in nlp.pipe(texts, batch_size=batch_size)]
@@ -0,0 +1,225 @@
+"""
+OCR for scanned PDF pages, in worker processes of its own.
+
+Pages without a text layer are rendered and read by Tesseract through PyMuPDF's OCR
+support, which needs a local Tesseract install (its tessdata is found through
+TESSDATA_PREFIX or PyMuPDF's own lookup). Each page runs in a worker process with its
+own timeout; a page that overruns gets just its worker killed instead of stalling the
+analysis, and other analyses' pages carry on in their own workers.
+Set PYRESUME_OCR=0 to turn the stage off.
+"""
+import atexit
+import multiprocessing
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import pymupdf
+
+from pyresume_log import get_logger
+
+logger = get_logger('ocr')
+
+OCR_DPI = 300
+OCR_LANGUAGE = os.environ.get('PYRESUME_OCR_LANGUAGE', 'eng')
+OCR_PAGE_TIMEOUT = 30.0
+OCR_WORKERS = max(1, (os.cpu_count() or 2) // 2)
+# Pages with fewer non-whitespace characters than this are treated as images
+MIN_TEXT_CHARS = 16
+
+_context = multiprocessing.get_context('spawn')
+_workers = threading.Condition()
+_idle = []  # workers waiting for a page
+_started = 0  # live workers, idle or busy
+
+
+@lru_cache(maxsize=1)
+def available():
+    """
+    True when OCR is enabled and Tesseract's language data can be found.
+    """
+    if os.environ.get('PYRESUME_OCR', '1') == '0':
+        return False
+    try:
+        return bool(pymupdf.get_tessdata())
+    except AttributeError:  # PyMuPDF without get_tessdata
+        return bool(os.environ.get('TESSDATA_PREFIX') or shutil.which('tesseract'))
+    except Exception:
+        return False
+
+
+def needs_ocr(text):
+    return len(''.join((text or '').split())) < MIN_TEXT_CHARS
+
+
+def _ocr_page(pdf_path, number, dpi, language):
+    """
+    OCR one page - runs inside a worker process.
+    """
+    with pymupdf.open(pdf_path) as document:
+        page = document.load_page(number)
+        textpage = page.get_textpage_ocr(dpi=dpi, language=language, full=True)
+        return page.get_text(textpage=textpage)
+
+
+class _Worker:
+    """
+    One spawned OCR process, fed a page at a time over a pipe. Spawned rather than forked,
+    so it inherits no signal handling or wakeup fd from a server or batch worker.
+    """
+    def __init__(self):
+        self.conn, child = _context.Pipe()
+        self.process = _context.Process(target=_serve, args=(child,), name='pyresume-ocr', daemon=True)
+        self.process.start()
+        child.close()
+
+    def run(self, task, timeout):
+        self.conn.send(task)
+        if not self.conn.poll(timeout):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=1)
+        self.kill()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=1)
+        self.conn.close()
+
+
+def _serve(conn):
+    """
+    Worker process loop: OCR pages until told to stop or the pipe closes.
+    """
+    while True:
+        try:
+            task = conn.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        try:
+            conn.send((True, _ocr_page(*task)))
+        except Exception as e:
+            conn.send((False, str(e)))
+
+
+def _acquire():
+    """
+    An idle worker, a new one while fewer than OCR_WORKERS are running, or wait for one.
+    """
+    global _started
+    with _workers:
+        while not _idle and _started >= OCR_WORKERS:
+            _workers.wait()
+        if _idle:
+            return _idle.pop()
+        _started += 1
+    try:
+        return _Worker()
+    except Exception:
+        _release(None)
+        raise
+
+
+def _release(worker):
+    """
+    Hand a worker back, or None when it was killed or never started.
+    """
+    global _started
+    with _workers:
+        if worker is None:
+            _started -= 1
+        else:
+            _idle.append(worker)
+        _workers.notify()
+
+
+def _ocr_one(pdf_path, number, timeout):
+    """
+    OCR one page as (status, text); status is 'ok', 'failed' (Tesseract raised),
+    'timeout' or 'crashed'. The timeout starts once a worker has the page, and only
+    that worker is killed when it runs out.
+    """
+    worker = _acquire()
+    try:
+        ok, value = worker.run((pdf_path, number, OCR_DPI, OCR_LANGUAGE), timeout)
+    except TimeoutError:
+        worker.kill()
+        _release(None)
+        return 'timeout', ''
+    except (EOFError, OSError) as e:
+        logger.warning("OCR worker died on page %d of %s: %s", number + 1, pdf_path, e)
+        worker.kill()
+        _release(None)
+        return 'crashed', ''
+    _release(worker)
+    return ('ok', value) if ok else ('failed', value)
+
+
+def shutdown():
+    with _workers:
+        workers = list(_idle)
+        _idle.clear()
+    for worker in workers:
+        worker.stop()
+
+
+atexit.register(shutdown)
+
+
+def ocr_pages(pdf_path, page_numbers, cache=None, timeout=None):
+    """
+    OCR text of the given pages, as {page number: text}.
+
+    With a ResumeCache, results are kept under the file's hash, so each page is OCR'd at
+    most once. Pages Tesseract failed on come back (and are cached) as empty text; pages
+    that timed out or lost their worker are left out and not cached, so the caller can
+    tell its text is incomplete and a later call retries them.
+    timeout is per page, counted from when a worker picks the page up, and defaults to
+    OCR_PAGE_TIMEOUT.
+    """
+    page_numbers = sorted(set(page_numbers))
+    if not page_numbers:
+        return {}
+
+    cached, file_hash = {}, None
+    if cache is not None:
+        from resume_cache import hash_file
+        file_hash = hash_file(pdf_path)
+        cached = cache.get(file_hash, 'ocr') or {}
+    results = {number: cached[str(number)] for number in page_numbers if str(number) in cached}
+    todo = [number for number in page_numbers if number not in results]
+    if not todo:
+        return results
+
+    timeout = OCR_PAGE_TIMEOUT if timeout is None else timeout
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(len(todo), OCR_WORKERS)) as threads:
+        outcomes = dict(zip(todo, threads.map(lambda number: _ocr_one(pdf_path, number, timeout), todo)))
+    timed_out = [number for number, (status, _) in outcomes.items() if status == 'timeout']
+    for number, (status, value) in outcomes.items():
+        if status == 'failed':
+            logger.warning("OCR of page %d of %s failed: %s", number + 1, pdf_path, value)
+        if status in ('ok', 'failed'):
+            results[number] = value if status == 'ok' else ''
+    if timed_out:
+        logger.warning("OCR timed out on %d page(s) of %s", len(timed_out), pdf_path)
+
+    logger.info("OCR'd %d page(s) of %s in %.1fs", len(todo), pdf_path, time.perf_counter() - start)
+    if cache is not None:
+        done = [number for number in todo if number in results]
+        if done:
+            cached.update({str(number): results[number] for number in done})
+            cache.put(file_hash, 'ocr', cached)
+    return results
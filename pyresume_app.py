@@ -1,263 +1,600 @@
-import webview
+import time
+PROCESS_START = time.time()  # Taken before any other import, for the startup measurement
+
 import os
 import sys
-import tempfile
 import json
 import base64
-from pathlib import Path
-import pygame
+import hashlib
 import threading
-import time
-import shutil
-import mimetypes
+import sqlite3
+import uuid
+from collections import OrderedDict
+from analyzer import entity_fields, evidence_table, job_cache_key, parse_resume_cached, perform_analysis
+from ingestion import (FORMATS, SNIFF_BYTES, UnsupportedFormat, check_name, detect_format, ingest_path, read_header,
+                       require_format)
+from job_profile import compile_job
+from batch import run_batch
+from dedupe import REUSE_THRESHOLD, DuplicateIndex, minhash
+from jobs import JobManager
+from metrics import PROFILER, REGISTRY, enable_from_env
+from nlp import extract_entities, warm_up
+from pyresume_log import RequestTiming, configure_logging, get_logger
+from resume_cache import ResumeCache, hash_bytes
+from results_store import ResultsStore
+from similarity import SimilarityIndex
+from skills import get_matcher
+from upload_store import UploadStore, safe_file_name
+
+logger = get_logger('app')
+
+# Uploads larger than this are rejected before any of their base64 is decoded
+MAX_UPLOAD_BYTES = int(float(os.environ.get('PYRESUME_MAX_UPLOAD_MB', '20')) * 1024 * 1024)
+# Results per page sent to the page for batch runs and similarity searches
+RESULTS_PAGE_SIZE = 50
+# Full results of this many recently analyzed resumes are kept for lookups by file hash
+MAX_RECENT_RESULTS = 32
+# Fields of every batch result sent to the page unless the caller asks for others
+BATCH_SUMMARY_FIELDS = ('fileName', 'filePath', 'overallScore', 'combinedScore', 'similarity',
+                        'matchedSkills', 'missingSkills', 'experienceYears', 'education')
+# Fields from the optional spaCy stage. They depend on whether the model had loaded yet,
+# so they are cached per resume on their own and never as part of a cached analysis.
+ENTITY_FIELDS = ('organizations', 'locations')
+# Filters of the native file dialog
+FILE_DIALOG_TYPES = (
+    'Resumes ({})'.format(';'.join('*' + ext for fmt in FORMATS.values() for ext in fmt.extensions)),
+    'All files (*.*)',
+)
+
+
+def decoded_size(base64_text):
+    """
+    Size of the bytes base64 text decodes to, without decoding it (whitespace is not counted).
+    """
+    size = len(base64_text) * 3 // 4
+    if size > MAX_UPLOAD_BYTES:
+        # Only pay for counting line breaks when they could make the difference
+        whitespace = sum(base64_text.count(c) for c in '\r\n\t ')
+        size = (len(base64_text) - whitespace) * 3 // 4
+    return size
+
+
+def select_fields(data, fields):
+    """
+    Only the given keys of a result (fields is a list or a comma separated string);
+    the whole result when no fields are given.
+    """
+    if not fields or not isinstance(data, dict):
+        return data
+    if isinstance(fields, str):
+        fields = [field.strip() for field in fields.split(',')]
+    return {key: data[key] for key in fields if key in data}
+
+
+def paginate(items, offset=0, limit=None, fields=None):
+    """
+    One page of a result list, with each item trimmed to fields.
+    """
+    offset = max(0, int(offset or 0))
+    limit = RESULTS_PAGE_SIZE if limit is None else max(0, int(limit))
+    return {
+        'items': [select_fields(item, fields) for item in items[offset:offset + limit]],
+        'total': len(items),
+        'offset': offset,
+        'limit': limit
+    }
+
+
+def upload_too_large(file_name, size):
+    limit_mb = MAX_UPLOAD_BYTES / (1024 * 1024)
+    return {'status': 'error',
+            'message': f'{file_name} is {size / (1024 * 1024):.1f} MB; the upload limit is {limit_mb:g} MB'}
 
 class PyResumeAPI:
-    def __init__(self):
-        self.analysis_results = None
+    def __init__(self, data_dir=None):
+        """
+        data_dir holds uploads/, cache/ and results.db; the script directory by default.
+        """
+        self.analysis_results = None  # Result of the most recently requested analysis that has finished
+        self.recent_results = OrderedDict()  # file hash -> full result of its latest analysis
+        self.batch_results = None  # Summary of the last analyze_batch run
+        self.similarity_index = SimilarityIndex()  # TF-IDF index of every resume analyzed this session
+        self.jobs = JobManager(on_progress=self._push_progress)  # Background analysis jobs
+        self.window = None  # Set once the webview window exists, used to push progress events
         self.job_description = ""  # Store job description as string
-        self.uploaded_files = []   # Track uploaded files
+        self.compiled_job = None  # The same, compiled for scoring (see job_profile)
+        self.uploaded_files = []   # Hashes of the files uploaded in this session
         self.saved_file_path = ""  # Store the path of the saved file
+        self.saved_file_hash = ""  # SHA-256 of the saved file, used as the cache key
         self.script_dir = os.path.dirname(os.path.abspath(__file__))  # Directory where script is located
+        self.data_dir = data_dir or self.script_dir
+        self.active_uploads = {}   # upload_id -> ChunkedUpload for in-progress chunked uploads
+        self.picked_paths = set()  # Files (and batch folders) the user chose in the native file dialog
+        self._upload_lock = threading.Lock()
+        # Analyses run concurrently; the shared "current" file, job description and result
+        # are published together, and never by an analysis requested before the last one published
+        self._state_lock = threading.Lock()
+        self._requested = 0
+        self._published = 0
         
-        # Create uploads folder in script directory
-        self.uploads_dir = os.path.join(self.script_dir, "uploads")
+        # Create uploads folder in the data directory
+        self.uploads_dir = os.path.join(self.data_dir, "uploads")
         if not os.path.exists(self.uploads_dir):
             try:
                 os.makedirs(self.uploads_dir)
-                print(f"📁 Created uploads directory: {self.uploads_dir}")
+                logger.info("Created uploads directory: %s", self.uploads_dir)
             except Exception as e:
-                print(f"⚠️  Could not create uploads directory: {e}")
-                self.uploads_dir = self.script_dir  # Fall back to script directory
+                logger.warning("Could not create uploads directory: %s", e)
+                self.uploads_dir = self.data_dir  # Fall back to the data directory
+        
+        # Uploads are stored once per distinct content; the sweeper keeps the store within its quotas
+        self.store = UploadStore(self.uploads_dir).start_sweeper()
+        
+        # Compile the skill matcher once up front instead of on the first analysis
+        get_matcher()
+        
+        # Cache of extracted text and analysis results, keyed by file hash
+        self.cache = ResumeCache(os.path.join(self.data_dir, "cache"))
+        
+        # Every analysis, kept across sessions for get_result_history / query_results
+        self.results_store = ResultsStore(os.path.join(self.data_dir, "results.db"))
+        
+        # Signatures of every resume seen, to spot the same CV sent again with small edits
+        self.duplicates = DuplicateIndex(loader=self.results_store.signatures, saver=self.results_store.add_signature)
+        
+        self._register_metrics()
         
         # Ensure the directory is writable
-        print(f"📁 Script directory: {self.script_dir}")
-        print(f"📁 Uploads directory: {self.uploads_dir}")
-        print(f"📁 Directory writable: {os.access(self.uploads_dir, os.W_OK)}")
+        if not os.access(self.uploads_dir, os.W_OK):
+            logger.warning("Uploads directory is not writable: %s", self.uploads_dir)
+        logger.debug("Script directory: %s, uploads directory: %s", self.script_dir, self.uploads_dir)
+    
+    def _register_metrics(self):
+        """
+        Gauges read from this instance's state whenever metrics are collected.
+        """
+        REGISTRY.gauge('pyresume_job_queue_depth', "Analysis jobs queued or running", lambda: self.jobs.queue_depth)
+        REGISTRY.gauge('pyresume_active_uploads', "Chunked uploads in progress", lambda: len(self.active_uploads))
+        REGISTRY.gauge('pyresume_cache_lookups_total', "Resume cache lookups by result",
+                       lambda: {'hit': self.cache.hits, 'miss': self.cache.misses}, ('result',), 'counter')
+        REGISTRY.gauge('pyresume_cache_bytes', "Size of the resume cache on disk", lambda: self.cache.total_bytes)
+        REGISTRY.gauge('pyresume_upload_store_bytes', "Size of the upload store", lambda: self.store.total_bytes)
+        REGISTRY.gauge('pyresume_upload_store_files', "Files in the upload store", lambda: len(self.store))
+        REGISTRY.gauge('pyresume_similarity_index_resumes', "Resumes in the similarity index",
+                       lambda: len(self.similarity_index))
+        REGISTRY.gauge('pyresume_suggestion_cache_lookups_total', "Suggestion cache lookups by result",
+                       self._suggestion_cache_lookups, ('result',), 'counter')
     
-    def save_uploaded_file(self, file_data):
+    def _suggestion_cache_lookups(self):
+        if 'suggestions' not in sys.modules:
+            return None  # Not set up until the first suggestion is asked for
+        stats = sys.modules['suggestions'].get_service().cache.stats()
+        return {'hit': stats['hits'], 'miss': stats['misses']}
+    
+    def get_metrics(self, format=None):
+        """
+        Request counts, stage latencies, cache hit counts and queue depth. Counters and
+        latencies are only recorded with PYRESUME_METRICS set; format='prometheus' returns
+        the Prometheus text format instead of data.
+        """
+        try:
+            if format == 'prometheus':
+                return {'status': 'success', 'data': REGISTRY.render_prometheus()}
+            return {'status': 'success', 'data': REGISTRY.snapshot()}
+        except Exception as e:
+            logger.exception("Could not collect metrics: %s", e)
+            return {'status': 'error', 'message': f'Could not collect metrics: {str(e)}'}
+    
+    def save_uploaded_file(self, file_data, timing=None, current=True):
       """
       Save the uploaded file to the uploads directory - FIXED VERSION
+      current makes it the file later calls default to; analyses publish their own instead.
       """
+      own_timing = timing is None
+      timing = timing or RequestTiming('save_uploaded_file')
+      status = 'error'
       try:
-          print("\n" + "="*50)
-          print("📄 STARTING FILE SAVE PROCESS")
-          print("="*50)
-          
           # Extract and validate file data
           if not file_data:
-              print("❌ No file data provided")
-              return json.dumps({'status': 'error', 'message': 'No file data provided'})
-          
-          print(f"📄 Received file_data keys: {list(file_data.keys())}")
+              logger.warning("No file data provided")
+              return {'status': 'error', 'message': 'No file data provided'}
           
           file_name = file_data.get('name', 'uploaded_file.pdf')
           file_content = file_data.get('content', '')
-          file_type = file_data.get('type', 'application/pdf')
-          file_size = file_data.get('size', 0)
-          
-          print(f"📄 Original filename: {file_name}")
-          print(f"📄 File type: {file_type}")
-          print(f"📄 Original size: {file_size} bytes")
-          print(f"📄 Content length: {len(file_content)} characters")
-          print(f"📄 Content starts with: {file_content[:100]}...")
+          logger.debug("Saving %s (type %s, declared size %s bytes, %d base64 characters)",
+                       file_name, file_data.get('type', 'application/pdf'), file_data.get('size', 0), len(file_content))
           
           if not file_content:
-              print("❌ File content is empty")
-              return json.dumps({'status': 'error', 'message': 'File content is empty'})
+              logger.warning("File content is empty")
+              return {'status': 'error', 'message': 'File content is empty'}
+          
+          # Reject oversize files before splitting or decoding anything
+          size = max(int(file_data.get('size') or 0), decoded_size(file_content))
+          if size > MAX_UPLOAD_BYTES:
+              logger.warning("Rejected %s: %d bytes exceeds the upload limit", file_name, size)
+              return upload_too_large(file_name, size)
           
           # Handle base64 content - IMPROVED LOGIC
           if file_content.startswith('data:'):
               # Split data URL to get the base64 part
               try:
                   if ',' not in file_content:
-                      print("❌ Invalid data URL format - no comma separator")
-                      return json.dumps({'status': 'error', 'message': 'Invalid data URL format - no comma separator'})
+                      logger.warning("Invalid data URL format - no comma separator")
+                      return {'status': 'error', 'message': 'Invalid data URL format - no comma separator'}
                   
                   header_part, base64_part = file_content.split(',', 1)
-                  print(f"📄 Data URL header: {header_part}")
-                  print(f"📄 Base64 content length: {len(base64_part)} characters")
-                  print(f"📄 Base64 starts with: {base64_part[:50]}...")
+                  logger.debug("Data URL header: %s", header_part)
                   
                   if len(base64_part) == 0:
-                      print("❌ Base64 part is empty")
-                      return json.dumps({'status': 'error', 'message': 'Base64 content is empty'})
+                      logger.warning("Base64 part is empty")
+                      return {'status': 'error', 'message': 'Base64 content is empty'}
                       
               except ValueError as ve:
-                  print(f"❌ Error splitting data URL: {ve}")
-                  return json.dumps({'status': 'error', 'message': f'Invalid data URL format: {str(ve)}'})
+                  logger.warning("Error splitting data URL: %s", ve)
+                  return {'status': 'error', 'message': f'Invalid data URL format: {str(ve)}'}
           else:
               base64_part = file_content
-              print(f"📄 Direct base64 content length: {len(base64_part)} characters")
           
           # Clean and validate base64 content
           base64_part = base64_part.strip()
           if len(base64_part) == 0:
-              print("❌ Base64 part is empty after stripping")
-              return json.dumps({'status': 'error', 'message': 'Base64 content is empty'})
+              logger.warning("Base64 part is empty after stripping")
+              return {'status': 'error', 'message': 'Base64 content is empty'}
+          
+          # Sniff the format from the first bytes; an unsupported file is rejected before the rest is decoded
+          with timing.stage('sniff'):
+              head = ''.join(base64_part[:SNIFF_BYTES * 2].split())
+              head = head[:len(head) - len(head) % 4]
+              try:
+                  header = base64.b64decode(head, validate=True)
+              except base64.binascii.Error as decode_error:
+                  return {'status': 'error', 'message': f'Invalid base64 content: {str(decode_error)}'}
+          if detect_format(header) is None:
+              logger.warning("Rejected %s: not a supported resume format", file_name)
+              return {'status': 'error', 'message': f'{file_name} is not a supported resume format'}
           
           # Decode the base64 content - IMPROVED ERROR HANDLING
           try:
-              # Remove any whitespace and newlines
-              base64_part = ''.join(base64_part.split())
-              
-              # Add padding if needed (base64 strings must be multiple of 4)
-              missing_padding = len(base64_part) % 4
-              if missing_padding:
-                  base64_part += '=' * (4 - missing_padding)
-                  print(f"📄 Added {4 - missing_padding} padding characters")
-              
-              print(f"📄 Final base64 length: {len(base64_part)}")
-              print(f"📄 Attempting to decode base64...")
-              
-              file_bytes = base64.b64decode(base64_part, validate=True)
-              print(f"📄 Decoded file size: {len(file_bytes)} bytes")
+              with timing.stage('decode'):
+                  # Remove any whitespace and newlines
+                  base64_part = ''.join(base64_part.split())
+                  
+                  # Add padding if needed (base64 strings must be multiple of 4)
+                  missing_padding = len(base64_part) % 4
+                  if missing_padding:
+                      base64_part += '=' * (4 - missing_padding)
+                  
+                  file_bytes = base64.b64decode(base64_part, validate=True)
+              logger.debug("Decoded %d bytes", len(file_bytes))
               
               if len(file_bytes) == 0:
-                  print("❌ Decoded file is empty")
-                  return json.dumps({'status': 'error', 'message': 'Decoded file is empty'})
-                  
-              # Validate file content by checking file signature
-              if file_name.lower().endswith('.pdf') and not file_bytes.startswith(b'%PDF'):
-                  print("⚠️  Warning: PDF file doesn't start with PDF signature")
+                  logger.warning("Decoded file is empty")
+                  return {'status': 'error', 'message': 'Decoded file is empty'}
               
           except base64.binascii.Error as decode_error:
-              print(f"❌ Base64 decode error (binascii): {decode_error}")
-              return json.dumps({'status': 'error', 'message': f'Invalid base64 content: {str(decode_error)}'})
+              logger.warning("Base64 decode error: %s", decode_error)
+              return {'status': 'error', 'message': f'Invalid base64 content: {str(decode_error)}'}
           except Exception as decode_error:
-              print(f"❌ Base64 decode error (general): {decode_error}")
-              return json.dumps({'status': 'error', 'message': f'Failed to decode file content: {str(decode_error)}'})
-          
-          # Sanitize filename - remove problematic characters
-          import re
-          safe_name = re.sub(r'[<>:"/\\|?*]', '_', file_name)
-          if safe_name != file_name:
-              print(f"📄 Sanitized filename: {file_name} -> {safe_name}")
-              file_name = safe_name
+              logger.warning("Base64 decode error: %s", decode_error)
+              return {'status': 'error', 'message': f'Failed to decode file content: {str(decode_error)}'}
           
-          # Create unique file path to avoid overwrites
-          file_path = os.path.join(self.uploads_dir, file_name)
-          counter = 1
-          original_name = file_name
-          name, ext = os.path.splitext(file_name)
-          
-          while os.path.exists(file_path):
-              file_name = f"{name}_{counter}{ext}"
-              file_path = os.path.join(self.uploads_dir, file_name)
-              counter += 1
-              print(f"📄 File exists, trying: {file_name}")
+          # Now that the whole file is here, confirm the format (a zip must really be a Word document)
+          try:
+              fmt = require_format(header, file_bytes, file_name)
+          except UnsupportedFormat as e:
+              logger.warning("Rejected %s: %s", file_name, e)
+              return {'status': 'error', 'message': str(e)}
+          check_name(file_name, fmt)
           
-          print(f"📄 Final file path: {file_path}")
-          print(f"📄 Directory exists: {os.path.exists(self.uploads_dir)}")
-          print(f"📄 Directory writable: {os.access(self.uploads_dir, os.W_OK)}")
+          # Files are stored by content, so the same resume uploaded again is not written twice
+          with timing.stage('hash'):
+              file_hash = hash_bytes(file_bytes)
           
           # Write the file with error handling
           try:
-              print(f"📄 Writing {len(file_bytes)} bytes to disk...")
-              with open(file_path, 'wb') as f:
-                  bytes_written = f.write(file_bytes)
-                  f.flush()  # Force write to disk
-                  os.fsync(f.fileno())  # Force OS to write to disk
-              
-              print(f"📄 File write completed, {bytes_written} bytes written")
-              
+              with timing.stage('write'):
+                  stored, created = self.store.put_bytes(file_bytes, file_name, file_hash, fmt.extension)
           except PermissionError as pe:
-              print(f"❌ Permission denied: {pe}")
-              return json.dumps({'status': 'error', 'message': f'Permission denied writing to {file_path}'})
+              logger.error("Permission denied: %s", pe)
+              return {'status': 'error', 'message': f'Permission denied writing to {self.store.root}'}
           except OSError as os_error:
-              print(f"❌ OS error: {os_error}")
-              return json.dumps({'status': 'error', 'message': f'OS error writing file: {str(os_error)}'})
-          except Exception as write_error:
-              print(f"❌ File write error: {write_error}")
-              return json.dumps({'status': 'error', 'message': f'Failed to write file: {str(write_error)}'})
+              logger.error("OS error writing %s: %s", file_name, os_error)
+              return {'status': 'error', 'message': f'OS error writing file: {str(os_error)}'}
           
-          # Verify the file was actually created and has correct size
-          if os.path.exists(file_path):
-              actual_size = os.path.getsize(file_path)
-              is_readable = os.access(file_path, os.R_OK)
-              
-              print("✅ FILE SAVE SUCCESS:")
-              print(f"   - Path: {file_path}")
-              print(f"   - Size: {actual_size} bytes")
-              print(f"   - Expected: {len(file_bytes)} bytes")
-              print(f"   - Readable: {is_readable}")
-              print(f"   - Size match: {actual_size == len(file_bytes)}")
-              
-              if actual_size != len(file_bytes):
-                  print(f"⚠️  SIZE MISMATCH! Expected: {len(file_bytes)}, Actual: {actual_size}")
-                  return json.dumps({'status': 'error', 'message': f'File size mismatch. Expected: {len(file_bytes)}, Actual: {actual_size}'})
-              
-              # Store the file path and add to tracking list
-              self.uploaded_files.append(file_path)
-              self.saved_file_path = file_path
-              
-              # Also create a relative path for display
-              rel_path = os.path.relpath(file_path, self.script_dir)
-              
-              return json.dumps({
-                  'status': 'success', 
-                  'message': f'File saved successfully as {file_name}', 
-                  'path': file_path,
-                  'relative_path': rel_path,
-                  'size': actual_size,
-                  'original_name': original_name,
-                  'readable': is_readable,
-                  'bytes_written': len(file_bytes)
-              })
-          else:
-              print("❌ File verification failed - file does not exist after write")
-              return json.dumps({'status': 'error', 'message': 'File was not created successfully - file does not exist after write operation'})
+          status = 'success'
+          return self._saved_upload(stored, file_name, created, fmt, current)
               
       except Exception as e:
           error_msg = f'Unexpected error saving file: {str(e)}'
-          print(f"❌ {error_msg}")
-          import traceback
-          print("Full traceback:")
-          traceback.print_exc()
-          return json.dumps({'status': 'error', 'message': error_msg})
+          logger.exception(error_msg)
+          return {'status': 'error', 'message': error_msg}
       finally:
-          print("="*50)
-          print("📄 FILE SAVE PROCESS COMPLETED")
-          print("="*50 + "\n")
+          if own_timing:
+              timing.finish(status)
+    
+    def save_local_file(self, path, timing=None, current=True):
+        """
+        Bring a file picked with open_file_dialog into the upload store straight from disk,
+        without base64 or the JS bridge. Returns the same payload as save_uploaded_file.
+        """
+        own_timing = timing is None
+        timing = timing or RequestTiming('save_local_file')
+        status = 'error'
+        try:
+            path = os.path.abspath(path or '')
+            if path not in self.picked_paths:
+                # The page may only name files the user chose in the dialog
+                return {'status': 'error', 'message': 'Choose the file with the file dialog first'}
+            with timing.stage('write'):
+                stored, created, fmt = ingest_path(self.store, path, max_bytes=MAX_UPLOAD_BYTES)
+            status = 'success'
+            return self._saved_upload(stored, os.path.basename(path), created, fmt, current)
+        except UnsupportedFormat as e:
+            logger.warning("Rejected %s: %s", path, e)
+            return {'status': 'error', 'message': str(e)}
+        except OSError as os_error:
+            logger.error("Could not read %s: %s", path, os_error)
+            return {'status': 'error', 'message': f'Could not read file: {str(os_error)}'}
+        finally:
+            if own_timing:
+                timing.finish(status)
+    
+    def open_file_dialog(self):
+        """
+        Pick a resume with the native file dialog. Only its path, name, size and sniffed
+        format go back to the page; pass {'path': ...} as the file data to analyze it.
+        """
+        if self.window is None:
+            return {'status': 'error', 'message': 'No window to open a dialog from'}
+        try:
+            import webview
+            paths = self.window.create_file_dialog(webview.OPEN_DIALOG, allow_multiple=False,
+                                                   file_types=FILE_DIALOG_TYPES)
+            if not paths:
+                return {'status': 'cancelled'}
+            path = os.path.abspath(paths if isinstance(paths, str) else paths[0])
+            size = os.path.getsize(path)
+            if size > MAX_UPLOAD_BYTES:
+                return upload_too_large(os.path.basename(path), size)
+            fmt = require_format(read_header(path), path, os.path.basename(path))
+        except UnsupportedFormat as e:
+            return {'status': 'error', 'message': str(e)}
+        except Exception as e:
+            logger.exception("File dialog failed: %s", e)
+            return {'status': 'error', 'message': f'Could not open file: {str(e)}'}
+        self.picked_paths.add(path)
+        return {
+            'status': 'success',
+            'path': path,
+            'name': os.path.basename(path),
+            'size': size,
+            'format': fmt.name,
+            'type': fmt.mime
+        }
+    
+    def open_batch_dialog(self, folder=True):
+        """
+        Pick a folder of resumes (or, with folder false, several resume files) for analyze_batch.
+        Only the chosen paths go back to the page.
+        """
+        if self.window is None:
+            return {'status': 'error', 'message': 'No window to open a dialog from'}
+        try:
+            import webview
+            if folder:
+                paths = self.window.create_file_dialog(webview.FOLDER_DIALOG)
+            else:
+                paths = self.window.create_file_dialog(webview.OPEN_DIALOG, allow_multiple=True,
+                                                       file_types=FILE_DIALOG_TYPES)
+        except Exception as e:
+            logger.exception("Batch dialog failed: %s", e)
+            return {'status': 'error', 'message': f'Could not open dialog: {str(e)}'}
+        if not paths:
+            return {'status': 'cancelled'}
+        paths = [os.path.abspath(path) for path in ([paths] if isinstance(paths, str) else paths)]
+        self.picked_paths.update(paths)
+        return {'status': 'success', 'paths': paths}
+    
+    def _was_picked(self, path):
+        """
+        Whether path was chosen in a file dialog, or lies inside a folder that was.
+        """
+        path = os.path.abspath(path)
+        while True:
+            if path in self.picked_paths:
+                return True
+            parent = os.path.dirname(path)
+            if parent == path:
+                return False
+            path = parent
+    
+    def _saved_upload(self, stored, file_name, created, fmt, current=True):
+        """
+        Record a stored upload (as the current file if current is set) and build the
+        save_uploaded_file payload.
+        """
+        if stored.hash not in self.uploaded_files:
+            self.uploaded_files.append(stored.hash)
+        if current:
+            with self._state_lock:
+                self.saved_file_path = stored.path
+                self.saved_file_hash = stored.hash
+        
+        original_name = safe_file_name(file_name)
+        if created:
+            logger.info("Saved %s as %s (%d bytes)", original_name, stored.path, stored.size)
+        else:
+            logger.info("Identical file already uploaded: %s", stored.path)
+        return {
+            'status': 'success',
+            'message': f'File saved successfully as {original_name}' if created else f'File already uploaded as {original_name}',
+            'path': stored.path,
+            'size': stored.size,
+            'original_name': original_name,
+            'hash': stored.hash,
+            'format': fmt.name,
+            'type': fmt.mime
+        }
+    
+    def begin_upload(self, file_info):
+        """
+        Start a chunked upload. The file is decoded chunk by chunk into a temp file
+        inside the upload store, so memory use does not grow with the size of the resume.
+        """
+        try:
+            file_info = file_info or {}
+            file_name = file_info.get('name', 'uploaded_file.pdf')
+            if int(file_info.get('size') or 0) > MAX_UPLOAD_BYTES:
+                return upload_too_large(file_name, int(file_info['size']))
+            
+            fd, temp_path = self.store.temp_file()
+            upload = ChunkedUpload(
+                file_name,
+                file_info.get('type', 'application/pdf'),
+                file_info.get('size', 0),
+                temp_path,
+                os.fdopen(fd, 'wb'),
+                RequestTiming('upload', fileName=file_name),
+            )
+            
+            upload_id = uuid.uuid4().hex
+            with self._upload_lock:
+                self.active_uploads[upload_id] = upload
+            
+            logger.debug("Chunked upload started: %s (%s bytes) -> %s", file_name, upload.expected_size, upload_id)
+            return {'status': 'success', 'upload_id': upload_id}
+        except Exception as e:
+            error_msg = f'Could not start upload: {str(e)}'
+            logger.error(error_msg)
+            return {'status': 'error', 'message': error_msg}
+    
+    def append_upload_chunk(self, upload_id, chunk):
+        """
+        Decode one base64 chunk (optionally a data URL) and append it to the upload's temp file.
+        """
+        upload = self.active_uploads.get(upload_id)
+        if upload is None:
+            return {'status': 'error', 'message': f'Unknown upload id: {upload_id}'}
+        
+        # The declared size can't be trusted; stop as soon as the data itself goes over the limit
+        size = upload.bytes_written + decoded_size(chunk or '')
+        if size > MAX_UPLOAD_BYTES:
+            self.abort_upload(upload_id)
+            logger.warning("Aborted chunked upload of %s: over the upload limit", upload.file_name)
+            return upload_too_large(upload.file_name, size)
+        
+        try:
+            with upload.lock:
+                upload.write_chunk(chunk or '')
+                # Sniff once the first bytes are in, so an unsupported file stops uploading early
+                if upload.format is None and len(upload.header) >= SNIFF_BYTES:
+                    upload.format = detect_format(upload.header)
+                    if upload.format is None:
+                        self.abort_upload(upload_id)
+                        logger.warning("Aborted chunked upload of %s: not a supported resume format", upload.file_name)
+                        return {'status': 'error', 'message': f'{upload.file_name} is not a supported resume format'}
+            return {'status': 'success', 'received': upload.bytes_written}
+        except (ValueError, base64.binascii.Error) as decode_error:
+            self.abort_upload(upload_id)
+            return {'status': 'error', 'message': f'Invalid base64 content: {str(decode_error)}'}
+        except OSError as os_error:
+            self.abort_upload(upload_id)
+            return {'status': 'error', 'message': f'OS error writing file: {str(os_error)}'}
+    
+    def finish_upload(self, upload_id, timing=None, current=True):
+        """
+        Flush the remaining data and atomically move the temp file into the upload store.
+        Returns the same payload as save_uploaded_file. The upload's stage timings are
+        added to timing when given, otherwise exported as their own record.
+        """
+        with self._upload_lock:
+            upload = self.active_uploads.pop(upload_id, None)
+        if upload is None:
+            return {'status': 'error', 'message': f'Unknown upload id: {upload_id}'}
+        
+        status = 'error'
+        try:
+            with upload.lock:
+                upload.close()
+            
+            if upload.bytes_written == 0:
+                upload.discard()
+                return {'status': 'error', 'message': 'Decoded file is empty'}
+            
+            fmt = require_format(upload.header, upload.temp_path, upload.file_name)
+            check_name(upload.file_name, fmt)
+            
+            with upload.timing.stage('write'):
+                stored, created = self.store.put_file(upload.temp_path, upload.file_name,
+                                                      upload.digest.hexdigest(), upload.bytes_written, fmt.extension)
+            
+            status = 'success'
+            return self._saved_upload(stored, upload.file_name, created, fmt, current)
+        except UnsupportedFormat as e:
+            upload.discard()
+            logger.warning("Rejected %s: %s", upload.file_name, e)
+            return {'status': 'error', 'message': str(e)}
+        except (ValueError, base64.binascii.Error) as decode_error:
+            upload.discard()
+            return {'status': 'error', 'message': f'Invalid base64 content: {str(decode_error)}'}
+        except OSError as os_error:
+            upload.discard()
+            return {'status': 'error', 'message': f'OS error writing file: {str(os_error)}'}
+        finally:
+            if timing is not None:
+                timing.merge(upload.timing)
+            else:
+                upload.timing.finish(status)
+    
+    def abort_upload(self, upload_id):
+        """
+        Cancel a chunked upload and remove its temp file.
+        """
+        with self._upload_lock:
+            upload = self.active_uploads.pop(upload_id, None)
+        if upload is None:
+            return {'status': 'error', 'message': f'Unknown upload id: {upload_id}'}
+        
+        upload.discard()
+        return {'status': 'success', 'message': 'Upload aborted'}
     
     def set_job_description(self, job_desc):
         """
-        Store the job description as a string
+        Store the job description as a string, and compile it for scoring
         """
         try:
             self.job_description = str(job_desc).strip() if job_desc else ""
-            print(f"✅ Job description stored: {len(self.job_description)} characters")
-            if len(self.job_description) > 0:
-                preview = self.job_description[:100] + "..." if len(self.job_description) > 100 else self.job_description
-                print(f"✅ Preview: {preview}")
-            return json.dumps({
+            self.compiled_job = compile_job(self.job_description)
+            logger.debug("Job description stored: %d characters", len(self.job_description))
+            return {
                 'status': 'success', 
                 'message': 'Job description saved',
                 'length': len(self.job_description)
-            })
+            }
         except Exception as e:
             error_msg = f'Error saving job description: {str(e)}'
-            print(f"❌ {error_msg}")
-            return json.dumps({'status': 'error', 'message': error_msg})
+            logger.error(error_msg)
+            return {'status': 'error', 'message': error_msg}
     
     def get_job_description(self):
         """
         Retrieve the stored job description
         """
-        return json.dumps({
+        return {
             'status': 'success', 
             'data': self.job_description,
             'length': len(self.job_description)
-        })
+        }
     
     def get_saved_file_path(self):
         """
         Get the path of the saved file
         """
-        return json.dumps({
+        return {
             'status': 'success',
             'data': self.saved_file_path,
             'exists': os.path.exists(self.saved_file_path) if self.saved_file_path else False
-        })
+        }
     
     def list_directory_files(self):
         """
@@ -267,7 +604,8 @@ class PyResumeAPI:
             files = []
             directories_to_check = [self.uploads_dir, self.script_dir]
             
-            result = {'directories': {}}
+            # Uploads live in the sharded store, so report it separately
+            result = {'directories': {}, 'store': self.store.stats()}
             
             for directory in directories_to_check:
                 dir_files = []
@@ -288,232 +626,650 @@ class PyResumeAPI:
                     'count': len(dir_files)
                 }
             
-            return json.dumps({
+            return {
                 'status': 'success',
                 'data': result
-            })
+            }
         except Exception as e:
-            return json.dumps({'status': 'error', 'message': str(e)})
+            return {'status': 'error', 'message': str(e)}
     
-    def analyze_resume(self, file_data, job_description):
+    def analyze_resume(self, file_data, job_description, fields=None):
         """
         This method will be called from JavaScript to analyze the resume.
         It saves the file, stores the job description, and performs analysis.
+        Blocks until the analysis is done; the page uses submit_analysis instead.
+        fields, if given, limits the result to those keys.
         """
         try:
-            print("\n" + "="*60)
-            print("🐍 PyResume AI - Starting Analysis")
-            print("="*60)
-            
-            # Print received data info
-            print("📥 Received data:")
-            print(f"   - File data keys: {list(file_data.keys()) if file_data else 'None'}")
-            print(f"   - Job description length: {len(job_description) if job_description else 0}")
-            
-            # First save the uploaded file
-            print("\n📄 Step 1: Saving uploaded file...")
-            file_result = json.loads(self.save_uploaded_file(file_data))
-            if file_result['status'] == 'error':
-                print(f"❌ File save failed: {file_result['message']}")
-                return json.dumps({'status': 'error', 'message': f"File save failed: {file_result['message']}"})
-            else:
-                print(f"✅ File saved successfully: {file_result.get('path', 'Unknown path')}")
-            
-            # Save the job description
-            print("\n💼 Step 2: Storing job description...")
-            job_result = json.loads(self.set_job_description(job_description))
-            if job_result['status'] == 'error':
-                print(f"❌ Job description save failed: {job_result['message']}")
-                return json.dumps({'status': 'error', 'message': f"Job description save failed: {job_result['message']}"})
-            else:
-                print(f"✅ Job description saved: {job_result.get('length', 0)} characters")
-            
-            # List directory contents for verification
-            print("\n📁 Step 3: Verifying file system...")
-            dir_result = json.loads(self.list_directory_files())
-            if dir_result['status'] == 'success':
-                for directory, info in dir_result['data']['directories'].items():
-                    print(f"📁 {directory}: {info['count']} files")
-                    for file_info in info['files']:
-                        print(f"   - {file_info['name']} ({file_info['size']} bytes)")
-            
-            print(f"\n✅ Current saved file: {self.saved_file_path}")
-            print(f"✅ File exists: {os.path.exists(self.saved_file_path) if self.saved_file_path else False}")
-            
-            # Simulate processing time
-            print("\n🔍 Step 4: Processing analysis...")
-            time.sleep(1.0)
-            
-            # Generate analysis results
-            file_info = {
-                'name': file_data.get('name', 'resume.pdf') if file_data else 'resume.pdf',
-                'size': file_data.get('size', 0) if file_data else 0,
-                'type': file_data.get('type', 'application/pdf') if file_data else 'application/pdf'
-            }
-            
-            analysis_result = self._perform_analysis(file_info, self.job_description)
-            self.analysis_results = analysis_result
-            
-            print("✅ Analysis completed successfully!")
-            print("="*60 + "\n")
-            
-            return json.dumps({'status': 'success', 'data': analysis_result})
-            
+            result = self._run_analysis(file_data, job_description)
+            if result['status'] == 'success':
+                result['data'] = select_fields(result['data'], fields)
+            return result
         except Exception as e:
             error_msg = str(e)
-            print(f"❌ Error during analysis: {error_msg}")
-            import traceback
-            traceback.print_exc()
-            return json.dumps({'status': 'error', 'message': error_msg})
+            logger.exception("Error during analysis: %s", error_msg)
+            return {'status': 'error', 'message': error_msg}
     
-    def _perform_analysis(self, file_info, job_desc):
+    def submit_analysis(self, file_data, job_description, fields=None):
         """
-        Perform the actual resume analysis logic.
+        Queue an analysis on the worker pool and return its job id immediately.
+        Progress (saved -> extracted -> scored) is pushed to window.onAnalysisProgress;
+        fields, if given, limits the result sent with the final event to those keys.
         """
-        # Keywords to look for in job description
-        skill_keywords = {
-            'Python': ['python', 'py', 'django', 'flask', 'fastapi'],
-            'JavaScript': ['javascript', 'js', 'node', 'react', 'vue', 'angular'],
-            'Java': ['java', 'spring', 'hibernate'],
-            'C++': ['c++', 'cpp'],
-            'SQL': ['sql', 'mysql', 'postgresql', 'database'],
-            'Docker': ['docker', 'container', 'containerization'],
-            'AWS': ['aws', 'amazon web services', 'ec2', 's3', 'lambda'],
-            'Git': ['git', 'github', 'version control'],
-            'Machine Learning': ['machine learning', 'ml', 'ai', 'tensorflow', 'pytorch'],
-            'REST API': ['rest', 'api', 'restful', 'web service'],
-        }
+        job_id = self.jobs.submit(self._run_analysis_job, file_data, job_description, fields)
+        logger.debug("Analysis job queued: %s", job_id)
+        return {'status': 'success', 'job_id': job_id}
+    
+    def get_job_status(self, job_id):
+        """
+        Current state of an analysis job, including its result once it is done.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {'status': 'error', 'message': f'Unknown job id: {job_id}'}
+        return {'status': 'success', 'data': job.snapshot()}
+    
+    def cancel_job(self, job_id):
+        """
+        Cancel a queued or running analysis job.
+        """
+        if self.jobs.cancel(job_id):
+            return {'status': 'success', 'message': 'Cancellation requested'}
+        return {'status': 'error', 'message': f'Job {job_id} is unknown or already finished'}
+    
+    def _run_analysis_job(self, job, file_data, job_description, fields=None):
+        result = self._run_analysis(file_data, job_description, job)
+        if result['status'] == 'error':
+            raise RuntimeError(result['message'])
+        return select_fields(result['data'], fields)
+    
+    def _push_progress(self, snapshot, info):
+        """
+        Forward a job's stage change to the page.
+        """
+        if self.window is None:
+            return
+        payload = dict(snapshot, **info)
+        self.window.evaluate_js(
+            f"window.onAnalysisProgress && window.onAnalysisProgress({json.dumps(payload, separators=(',', ':'))})"
+        )
+    
+    def _run_analysis(self, file_data, job_description, job=None):
+        """
+        Save, extract and score one resume. job, when given, receives progress
+        events and is checked for cancellation between the stages.
+        """
+        timing = RequestTiming('analyze', fileName=file_data.get('name') if file_data else None)
+        with self._state_lock:
+            self._requested += 1
+            request = self._requested
+        result = {'status': 'error'}
+        try:
+            # A no-op unless PYRESUME_PROFILE is set
+            with PROFILER.profile(timing):
+                result = self._analyze(file_data, job_description, job, timing, request)
+            return result
+        finally:
+            record = timing.finish(result['status'])
+            logger.info("Analysis %s: %s in %.1f ms", record['id'], result['status'], record['totalMs'])
+    
+    def _analyze(self, file_data, job_description, job, timing, request):
+        logger.debug("Analysis request: file data keys %s, job description length %d",
+                     list(file_data.keys()) if file_data else None, len(job_description) if job_description else 0)
         
-        job_desc_lower = job_desc.lower() if job_desc else ""
+        # First save the uploaded file (or finish a chunked upload started with begin_upload,
+        # or copy a file picked with open_file_dialog)
+        with timing.stage('save'):
+            if file_data and file_data.get('upload_id'):
+                file_result = self.finish_upload(file_data['upload_id'], timing, current=False)
+            elif file_data and file_data.get('path'):
+                file_result = self.save_local_file(file_data['path'], timing, current=False)
+            else:
+                file_result = self.save_uploaded_file(file_data, timing, current=False)
+        if file_result['status'] == 'error':
+            logger.warning("File save failed: %s", file_result['message'])
+            return {'status': 'error', 'message': f"File save failed: {file_result['message']}"}
         
-        # Find skills mentioned in job description
-        required_skills = []
-        for skill, keywords in skill_keywords.items():
-            if any(keyword in job_desc_lower for keyword in keywords):
-                required_skills.append(skill)
+        # Jobs may run concurrently, so work on this file's path/hash rather than self.saved_file_*
+        file_path = file_result['path']
+        file_hash = file_result['hash']
+        if job:
+            job.progress('saved', path=file_path)
         
-        # Mock skill matching (in real implementation, you'd parse the resume)
-        import random
-        random.seed(42)  # For consistent results
+        # Compiled once per distinct job description; repeat analyses reuse it from the LRU cache.
+        # It only becomes the shared job description when the result is published.
+        try:
+            job_description = compile_job(str(job_description).strip() if job_description else "")
+        except Exception as e:
+            return {'status': 'error', 'message': f"Job description save failed: {str(e)}"}
         
-        matched_skills = []
-        missing_skills = []
+        # Generate analysis results
+        file_info = {
+            'name': file_data.get('name', 'resume.pdf') if file_data else 'resume.pdf',
+            'size': file_data.get('size', 0) if file_data else 0,
+            'type': file_result['type']
+        }
         
-        for skill in required_skills:
-            if random.random() > 0.3:
-                matched_skills.append(skill)
-            else:
-                missing_skills.append(skill)
+        # Same resume against the same job description: reuse the cached result
+        job_hash = job_cache_key(job_description)
+        cached_result = self.cache.get_analysis(file_hash, job_hash)
+        if cached_result:
+            logger.debug("Using cached analysis for %s", file_path)
+            timing.fields['cached'] = True
+            cached_result.update({'fileName': file_info['name'], 'fileHash': file_hash, 'cached': True})
+            entities = self.cache.get(file_hash, 'entities')
+            if entities:
+                cached_result.update(entity_fields(entities))
+            self._publish(request, file_result, job_description, cached_result)
+            if file_hash not in self.similarity_index:
+                with timing.stage('index'):
+                    self._index_resume(file_hash, self.cache.get_or_extract_text(file_hash, file_path), cached_result)
+            with timing.stage('record'):
+                self._record_results(job_description, [(file_hash, cached_result)])
+            if job:
+                job.progress('scored', score=cached_result['overallScore'])
+            return {'status': 'success', 'data': cached_result}
         
-        # Calculate overall score
-        if required_skills:
-            score = int((len(matched_skills) / len(required_skills)) * 100)
-        else:
-            score = 75
+        with timing.stage('extract'):
+            resume_text, complete = self.cache.get_or_extract(file_hash, file_path)
+        logger.debug("Extracted %d characters of resume text", len(resume_text))
+        if job:
+            job.progress('extracted', characters=len(resume_text))
+        # A scanned page's OCR didn't finish: analyze what was read, but cache nothing derived
+        # from it (nor keep its signature), so the next analysis of the file tries that page again
+        cache = self.cache if complete else None
         
-        score += random.randint(-10, 15)
-        score = max(0, min(100, score))
+        with timing.stage('dedupe'):
+            duplicate = self._check_duplicate(file_hash, file_info['name'], resume_text) if complete else None
         
-        # Generate recommendations
-        recommendations = []
-        if score >= 80:
-            recommendations.append("Strong candidate with excellent skill match")
-            recommendations.append("Suitable for senior-level positions")
-        elif score >= 60:
-            recommendations.append("Good candidate with solid foundation")
-            recommendations.append("Consider for mid-level positions")
-        else:
-            recommendations.append("Candidate needs additional training")
-            recommendations.append("Consider for junior positions with mentoring")
+        with timing.stage('parse'):
+            parsed = parse_resume_cached(cache, file_hash, resume_text)
         
-        if missing_skills:
-            recommendations.append(f"Training needed in: {', '.join(missing_skills)}")
+        # A close enough near-duplicate with the same scoring inputs reuses the earlier analysis
+        earlier = self._reusable_analysis(duplicate, job_hash, parsed)
+        if earlier:
+            logger.info("%s is a near-duplicate of %s (%.0f%% similar); reusing its analysis",
+                        file_info['name'], duplicate['fileName'] or duplicate['fileHash'], duplicate['similarity'] * 100)
+            timing.fields['duplicate'] = True
+            analysis_result = dict(earlier, fileName=file_info['name'], fileSize=file_info['size'],
+                                   fileType=file_info['type'], analysisTimestamp=time.strftime('%Y-%m-%d %H:%M:%S'))
+            # The earlier resume's entities stand in until this one's are extracted
+            entities = self.cache.get(file_hash, 'entities') or self.cache.get(duplicate['fileHash'], 'entities')
+            if entities:
+                analysis_result.update(entity_fields(entities))
+        else:
+            if duplicate:
+                logger.info("%s is a near-duplicate of %s (%.0f%% similar)", file_info['name'],
+                            duplicate['fileName'] or duplicate['fileHash'], duplicate['similarity'] * 100)
+            # Only use the NLP stage if the model has finished loading in the background
+            with timing.stage('nlp'):
+                entities = self._resume_entities(file_hash, resume_text, cache)
+            
+            with timing.stage('score'):
+                analysis_result = self._perform_analysis(file_info, job_description, resume_text,
+                                                         entities, parsed)
+        analysis_result.pop('duplicateOf', None)
+        # Identifies the resume for get_evidence; a reused analysis still points at this file
+        analysis_result['fileHash'] = file_hash
+        if duplicate:
+            analysis_result['duplicateOf'] = duplicate
+        self._publish(request, file_result, job_description, analysis_result)
+        with timing.stage('index'):
+            if complete:
+                self.cache.put_analysis(file_hash, job_hash, {key: value for key, value in analysis_result.items()
+                                                              if key not in ENTITY_FIELDS})
+            self._index_resume(file_hash, resume_text, analysis_result)
+        with timing.stage('record'):
+            self._record_results(job_description, [(file_hash, analysis_result)])
+        if job:
+            job.progress('scored', score=analysis_result['overallScore'])
         
-        return {
-            'fileName': file_info['name'],
-            'fileSize': file_info['size'],
-            'fileType': file_info['type'],
-            'overallScore': score,
-            'matchedSkills': matched_skills,
-            'missingSkills': missing_skills,
-            'requiredSkills': required_skills,
-            'experience': f"{random.randint(2, 8)} years",
-            'education': 'Bachelor\'s in Computer Science',
-            'recommendations': recommendations,
-            'savedFilePath': self.saved_file_path,
-            'savedFileExists': os.path.exists(self.saved_file_path) if self.saved_file_path else False,
-            'uploadsDirectory': self.uploads_dir,
-            'jobDescriptionLength': len(self.job_description),
-            'analysisTimestamp': time.strftime('%Y-%m-%d %H:%M:%S')
-        }
+        return {'status': 'success', 'data': analysis_result}
     
-    def get_results(self):
+    def _publish(self, request, file_result, job, result):
         """
-        Retrieve the analysis results
+        Keep an analysis result for lookups by file hash, and make its file, job description
+        and result the current ones unless a later requested analysis already did.
         """
-        if self.analysis_results:
-            return json.dumps({'status': 'success', 'data': self.analysis_results})
-        return json.dumps({'status': 'error', 'message': 'No analysis results available'})
+        with self._state_lock:
+            self.recent_results[file_result['hash']] = result
+            self.recent_results.move_to_end(file_result['hash'])
+            while len(self.recent_results) > MAX_RECENT_RESULTS:
+                self.recent_results.popitem(last=False)
+            if request < self._published:
+                return
+            self._published = request
+            self.saved_file_path = file_result['path']
+            self.saved_file_hash = file_result['hash']
+            self.job_description = job.text
+            self.compiled_job = job
+            self.analysis_results = result
+    
+    def _result_for(self, file_hash=None):
+        """
+        The latest result for a file hash, or the current result without one.
+        """
+        with self._state_lock:
+            return self.recent_results.get(file_hash) if file_hash else self.analysis_results
+    
+    def _resume_entities(self, file_hash, resume_text, cache):
+        """
+        spaCy entities of a resume, from cache (a ResumeCache, or None) or, if the model has
+        finished loading in the background, freshly extracted and cached. None while the
+        model is unavailable.
+        """
+        entities = cache.get(file_hash, 'entities') if cache else None
+        if entities is None:
+            found = extract_entities([resume_text], wait=False)
+            if found is None:
+                return None
+            entities = found[0]
+            if cache:
+                cache.put(file_hash, 'entities', entities)
+        return entities
+    
+    def _perform_analysis(self, file_info, job_desc, resume_text="", entities=None, parsed=None):
+        """
+        Perform the actual resume analysis logic.
+        """
+        return perform_analysis(file_info, job_desc, resume_text, entities, parsed)
+    
+    def _record_results(self, job, results):
+        """
+        Add (file hash, result) analyses against a CompiledJob to the results store. A store
+        failure is logged rather than failing the analysis that produced the results.
+        """
+        try:
+            self.results_store.add_many((file_hash, job, result) for file_hash, result in results)
+        except sqlite3.Error as e:
+            logger.warning("Could not record %d result(s): %s", len(results), e)
+    
+    def _check_duplicate(self, file_hash, file_name, resume_text):
+        """
+        The earlier resume this one is a near-duplicate of, as {fileHash, fileName, similarity},
+        or None. The resume joins the duplicate index (and the results store) either way.
+        """
+        signature = minhash(resume_text)
+        if signature is None:
+            return None
+        return self.duplicates.check(file_hash, signature, file_name)
+    
+    def _reusable_analysis(self, duplicate, job_hash, parsed):
+        """
+        The cached analysis of the earlier resume against the same job, if this resume is at
+        least REUSE_THRESHOLD similar to it and parsed to the same skills, experience and
+        education, so an edit that changes the score is never hidden by the reuse. Else None.
+        """
+        if not duplicate or duplicate['similarity'] < REUSE_THRESHOLD:
+            return None
+        earlier = self.cache.get_analysis(duplicate['fileHash'], job_hash)
+        if not earlier or set(earlier.get('resumeSkills') or ()) != set(parsed.skills):
+            return None
+        if earlier.get('experienceYears') != parsed.experience_years:
+            return None
+        if earlier.get('education') != (parsed.education or 'Not specified'):
+            return None
+        return earlier
+    
+    def _index_resume(self, file_hash, resume_text, result):
+        """
+        Add an analyzed resume to the similarity index, keyed by its file hash.
+        """
+        self.similarity_index.add(file_hash, resume_text, meta={
+            'fileName': result['fileName'],
+            'overallScore': result['overallScore'],
+            'matchedSkills': result['matchedSkills']
+        })
+    
+    def find_similar_resumes(self, job_description, k=10, offset=0, fields=None):
+        """
+        Rank every resume analyzed in this session by TF-IDF similarity to a job description,
+        blended with its skill-match score. Returns ranks offset to offset + k.
+        """
+        try:
+            offset = max(0, int(offset or 0))
+            ranked = self.similarity_index.top_k(compile_job(job_description), offset + int(k))[offset:]
+            return {'status': 'success', 'data': [select_fields(result, fields) for result in ranked]}
+        except Exception as e:
+            error_msg = f'Error ranking resumes: {str(e)}'
+            logger.error(error_msg)
+            return {'status': 'error', 'message': error_msg}
+    
+    def analyze_batch(self, paths, job_description, limit=None, fields=None):
+        """
+        Score a list of resume files and/or folders against one job description in a process pool.
+        Returns the throughput of the run and the first page of ranked results, each trimmed
+        to BATCH_SUMMARY_FIELDS unless other fields are given; get_batch_results pages further.
+        Only files and folders chosen with open_batch_dialog (or open_file_dialog) are read.
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        refused = [path for path in paths or () if not self._was_picked(path)]
+        if refused or not paths:
+            return {'status': 'error', 'message': 'Choose the files or folder with the file dialog first'}
+        try:
+            logger.info("Batch analysis of %d path(s)", len(paths))
+            summary = run_batch(
+                paths, job_description,
+                cache_dir=self.cache.cache_dir,
+                on_result=lambda r: logger.debug("Batch result %s: %s", r.get('overallScore', 'ERR'), r.get('filePath')),
+                rank_by='similarity',
+                duplicates=self.duplicates
+            )
+            self.batch_results = summary
+            self._record_results(compile_job(job_description),
+                                 [(result['fileHash'], result) for result in summary['ranked'] if 'fileHash' in result])
+            logger.info("Batch complete: %d resumes, %s resumes/s", summary['count'], summary['resumesPerSecond'])
+            return {'status': 'success', 'data': self._batch_page(0, limit, fields)}
+        except Exception as e:
+            error_msg = f'Error during batch analysis: {str(e)}'
+            logger.error(error_msg)
+            return {'status': 'error', 'message': error_msg}
+    
+    def get_batch_results(self, offset=0, limit=None, fields=None):
+        """
+        A page of the ranked results of the last analyze_batch run.
+        """
+        if not self.batch_results:
+            return {'status': 'error', 'message': 'No batch results available'}
+        try:
+            return {'status': 'success', 'data': self._batch_page(offset, limit, fields)}
+        except (TypeError, ValueError) as e:
+            return {'status': 'error', 'message': f'Invalid page: {str(e)}'}
+    
+    def _batch_page(self, offset, limit, fields):
+        summary = self.batch_results
+        page = paginate(summary['ranked'], offset, limit, fields or BATCH_SUMMARY_FIELDS)
+        page.update({
+            'count': summary['count'],
+            'errors': summary['errors'][:RESULTS_PAGE_SIZE],
+            'errorCount': len(summary['errors']),
+            'elapsedSeconds': summary['elapsedSeconds'],
+            'resumesPerSecond': summary['resumesPerSecond']
+        })
+        return page
+    
+    def report_first_paint(self, page_ms=None):
+        """
+        Called by the page once it has painted. Records the time since process start
+        and flags launches much slower than recent ones.
+        """
+        try:
+            seconds = time.time() - PROCESS_START
+            entry = record_startup_time(seconds, pageMs=page_ms)
+            logger.info("Startup to first paint: %.3fs (recent median: %s)", seconds, entry['baselineSeconds'])
+            if entry['regression']:
+                logger.warning("Startup regression: %.3fs vs median %ss", seconds, entry['baselineSeconds'])
+            return {'status': 'success', 'data': entry}
+        except Exception as e:
+            return {'status': 'error', 'message': f'Could not record startup time: {str(e)}'}
+    
+    def get_results(self, fields=None, file_hash=None):
+        """
+        Retrieve the analysis results, optionally only the given fields: of the resume with
+        file_hash (its fileHash field), else of the most recently requested analysis. After
+        a restart this is the most recent analysis in the results store.
+        """
+        result = self._result_for(file_hash)
+        if result:
+            return {'status': 'success', 'data': select_fields(result, fields)}
+        if file_hash:
+            return {'status': 'error', 'message': 'No recent analysis of that resume'}
+        latest = self.results_store.recent(limit=1)
+        if latest:
+            return {'status': 'success', 'data': select_fields(latest[0], fields)}
+        return {'status': 'error', 'message': 'No analysis results available'}
+    
+    def get_result_history(self, offset=0, limit=None, fields=None):
+        """
+        Past analyses from the results store, most recent first.
+        """
+        try:
+            limit = RESULTS_PAGE_SIZE if limit is None else int(limit)
+            results = self.results_store.recent(limit, int(offset or 0))
+            return {'status': 'success', 'data': [select_fields(result, fields) for result in results]}
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            return {'status': 'error', 'message': f'Error reading result history: {str(e)}'}
+    
+    def query_results(self, job_description=None, skills=None, min_score=None, offset=0, limit=None,
+                      fields=None, job_hash=None):
+        """
+        Best past analyses first, e.g. the top 50 candidates for a posting who know Docker
+        and AWS. job_description (or the jobHash of a listed job) limits the results to one
+        posting; skills to resumes that list all of them, whether or not the posting asked for them.
+        """
+        try:
+            if job_description:
+                job_hash = compile_job(job_description).hash
+            if isinstance(skills, str):
+                skills = skills.split(',')
+            limit = RESULTS_PAGE_SIZE if limit is None else int(limit)
+            results = self.results_store.top(job_hash, skills or (), limit, int(offset or 0), min_score)
+            return {'status': 'success', 'data': [select_fields(result, fields) for result in results]}
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            return {'status': 'error', 'message': f'Error querying results: {str(e)}'}
+    
+    def list_job_descriptions(self, limit=None):
+        """
+        Job descriptions in the results store, most recently used first.
+        """
+        try:
+            return {'status': 'success', 'data': self.results_store.jobs(RESULTS_PAGE_SIZE if limit is None else int(limit))}
+        except (TypeError, ValueError, sqlite3.Error) as e:
+            return {'status': 'error', 'message': f'Error listing job descriptions: {str(e)}'}
+    
+    def get_evidence(self, skill=None, kind='skill', file_hash=None):
+        """
+        Where the resume shows a skill (or, with kind 'experience' or 'education', its date
+        ranges or degrees) as a compact table of offsets, pages and context (see
+        analyzer.evidence_table). Defaults to the current resume; the spans come from the
+        parse already done for its analysis, so results stay small and the UI asks per skill.
+        """
+        file_hash = file_hash or self.saved_file_hash
+        if not file_hash:
+            return {'status': 'error', 'message': 'No resume has been analyzed'}
+        stored = self.store.get(file_hash)
+        if stored is None:
+            return {'status': 'error', 'message': 'The resume is no longer in the upload store'}
+        try:
+            resume_text, complete = self.cache.get_or_extract(file_hash, stored.path)
+            parsed = parse_resume_cached(self.cache if complete else None, file_hash, resume_text)
+            return {'status': 'success', 'data': dict(evidence_table(parsed, resume_text, kind, skill), skill=skill)}
+        except Exception as e:
+            logger.warning("Evidence lookup failed: %s", e)
+            return {'status': 'error', 'message': f'Could not get evidence: {str(e)}'}
+    
+    def get_suggestions(self, file_hash=None):
+        """
+        LLM suggestions for improving the resume of the last analysis, or of the recently
+        analyzed resume with file_hash (see suggestions.py).
+        """
+        result = self._result_for(file_hash)
+        if not result:
+            return {'status': 'error', 'message': 'No analysis results available'}
+        try:
+            from suggestions import get_service  # The LLM client is only set up when first needed
+            return {'status': 'success', 'data': get_service().suggest(result)}
+        except Exception as e:
+            logger.warning("Suggestions failed: %s", e)
+            return {'status': 'error', 'message': f'Could not get suggestions: {str(e)}'}
+    
+    def get_batch_suggestions(self, offset=0, limit=10):
+        """
+        LLM suggestions for a page of the last batch run's ranked results, sent to the LLM in batches.
+        """
+        if not self.batch_results:
+            return {'status': 'error', 'message': 'No batch results available'}
+        try:
+            from suggestions import get_service
+            results = paginate(self.batch_results['ranked'], offset, limit)['items']
+            suggestions = get_service().suggest_batch(results)
+            return {'status': 'success', 'data': [
+                {'fileName': result.get('fileName'), 'filePath': result.get('filePath'), 'suggestions': text}
+                for result, text in zip(results, suggestions)
+            ]}
+        except Exception as e:
+            logger.warning("Batch suggestions failed: %s", e)
+            return {'status': 'error', 'message': f'Could not get suggestions: {str(e)}'}
     
     def cleanup_files(self):
         """
-        Clean up uploaded files
+        Remove the files uploaded in this session from the upload store
         """
         try:
             cleaned_files = []
-            for file_path in self.uploaded_files:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    cleaned_files.append(file_path)
+            for file_hash in self.uploaded_files:
+                stored = self.store.get(file_hash)
+                if stored and self.store.remove(file_hash):
+                    cleaned_files.append(stored.path)
             
             self.uploaded_files.clear()
             self.saved_file_path = ""
             
-            return json.dumps({
+            return {
                 'status': 'success',
                 'message': f'Cleaned up {len(cleaned_files)} files',
                 'files': cleaned_files
-            })
+            }
         except Exception as e:
-            return json.dumps({'status': 'error', 'message': f'Error cleaning up files: {str(e)}'})
+            return {'status': 'error', 'message': f'Error cleaning up files: {str(e)}'}
 
-def play_background_music():
+class ChunkedUpload:
+    """
+    State of one in-progress chunked upload. Base64 text is decoded incrementally:
+    only whole 4-character groups are decoded, the leftover characters are carried
+    over to the next chunk.
+    """
+    def __init__(self, file_name, file_type, expected_size, temp_path, handle, timing):
+        self.file_name = file_name
+        self.file_type = file_type
+        self.expected_size = expected_size
+        self.temp_path = temp_path
+        self.handle = handle
+        self.remainder = ''
+        self.header = b''  # First SNIFF_BYTES bytes, for format detection
+        self.format = None
+        self.bytes_written = 0
+        self.digest = hashlib.sha256()
+        self.lock = threading.Lock()
+        self.timing = timing
+    
+    def write_chunk(self, chunk):
+        if chunk.startswith('data:'):
+            if ',' not in chunk:
+                raise ValueError('Invalid data URL format - no comma separator')
+            chunk = chunk.split(',', 1)[1]
+        
+        data = self.remainder + ''.join(chunk.split())
+        if '=' in data:
+            # A padded chunk is a complete base64 string on its own
+            self.remainder = ''
+            self._write(data)
+        else:
+            cut = len(data) - len(data) % 4
+            self.remainder = data[cut:]
+            self._write(data[:cut])
+    
+    def _write(self, data):
+        if not data:
+            return
+        missing_padding = len(data) % 4
+        if missing_padding:
+            data += '=' * (4 - missing_padding)
+        with self.timing.stage('decode'):
+            file_bytes = base64.b64decode(data, validate=True)
+        if len(self.header) < SNIFF_BYTES:
+            self.header += file_bytes[:SNIFF_BYTES - len(self.header)]
+        with self.timing.stage('write'):
+            self.handle.write(file_bytes)
+        with self.timing.stage('hash'):
+            self.digest.update(file_bytes)
+        self.bytes_written += len(file_bytes)
+    
+    def close(self):
+        if not self.handle.closed:
+            self._write(self.remainder)
+            self.remainder = ''
+            self.handle.close()
+    
+    def discard(self):
+        try:
+            if not self.handle.closed:
+                self.handle.close()
+            if os.path.exists(self.temp_path):
+                os.remove(self.temp_path)
+        except OSError as e:
+            logger.warning("Could not remove temp upload %s: %s", self.temp_path, e)
+
+MUSIC_FILE = "background_music.mp3"
+# Every launch appends its time to first paint here; compared against earlier launches
+STARTUP_LOG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_times.jsonl")
+# A launch slower than this multiple of the recent median is reported as a regression
+STARTUP_REGRESSION_RATIO = 1.5
+STARTUP_HISTORY = 20
+
+_mixer = None  # pygame.mixer, once music is playing
+
+def find_music_file():
+    music_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), MUSIC_FILE)
+    return music_path if os.path.exists(music_path) else None
+
+def play_background_music(music_path):
     """
     Play background music in a loop until the application closes
     """
+    global _mixer
     try:
+        import pygame  # Only imported when there is music to play
         pygame.mixer.init()
-        music_file = "background_music.mp3"
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        music_path = os.path.join(script_dir, music_file)
+        _mixer = pygame.mixer
+        pygame.mixer.music.load(music_path)
+        pygame.mixer.music.play(-1)
+        logger.info("Background music started")
         
-        if os.path.exists(music_path):
-            pygame.mixer.music.load(music_path)
-            pygame.mixer.music.play(-1)
-            print("🎵 Background music started...")
-            
-            while pygame.mixer.music.get_busy():
-                time.sleep(1)
-        else:
-            print(f"🎵 Music file '{music_file}' not found. Continuing without background music.")
+        while pygame.mixer.music.get_busy():
+            time.sleep(1)
             
     except Exception as e:
-        print(f"🎵 Error playing background music: {e}")
+        logger.warning("Error playing background music: %s", e)
 
-def load_html_content():
+def stop_background_music():
+    if _mixer is not None and _mixer.get_init():
+        _mixer.music.stop()
+        _mixer.quit()
+        logger.debug("Background music stopped")
+
+def record_startup_time(seconds, log_path=STARTUP_LOG, **details):
     """
-    Load the HTML content from the index.html file
+    Append a startup measurement to the log and compare it with the median of recent launches.
+    Returns the entry that was written, including 'baselineSeconds' and 'regression'.
     """
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    html_file = os.path.join(script_dir, 'index.html')
+    history = []
+    if os.path.exists(log_path):
+        with open(log_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    history.append(json.loads(line)['seconds'])
+                except (ValueError, KeyError):
+                    continue
     
-    if os.path.exists(html_file):
-        print(f"📄 Loading HTML from: {html_file}")
-        with open(html_file, 'r', encoding='utf-8') as f:
-            return f.read()
+    recent = sorted(history[-STARTUP_HISTORY:])
+    baseline = recent[len(recent) // 2] if recent else None
+    entry = dict(details, seconds=round(seconds, 4),
+                 baselineSeconds=round(baseline, 4) if baseline else None,
+                 regression=bool(baseline and seconds > baseline * STARTUP_REGRESSION_RATIO),
+                 timestamp=time.strftime('%Y-%m-%d %H:%M:%S'))
     
-    print("⚠️  index.html not found, creating fallback HTML")
-    return create_fallback_html()
+    with open(log_path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(entry) + "\n")
+    return entry
+
+def find_index_html():
+    """
+    Path of index.html next to this script, or None if it is missing
+    """
+    html_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'index.html')
+    return html_file if os.path.exists(html_file) else None
 
 def create_fallback_html():
     """
@@ -554,77 +1310,73 @@ def create_fallback_html():
     </html>
     """.format(script_dir=os.path.dirname(os.path.abspath(__file__)))
 
-def create_temp_html(html_content):
-    """
-    Create a temporary HTML file with the provided content
-    """
-    temp_dir = tempfile.mkdtemp()
-    html_file = os.path.join(temp_dir, 'index.html')
-    
-    with open(html_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
-    
-    print(f"📄 Temporary HTML created: {html_file}")
-    return html_file
-
 if __name__ == '__main__':
+    # PYRESUME_LOG_LEVEL=DEBUG (or PYRESUME_DEBUG=1) for detailed output
+    configure_logging()
+    metrics_server = enable_from_env()
     print("🐍 PyResume AI - Intelligent Resume Analysis Platform")
     print("=" * 60)
     
-    # Get script directory for reference
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    print(f"📁 Script directory: {script_dir}")
-    print(f"📁 Directory exists: {os.path.exists(script_dir)}")
-    print(f"📁 Directory writable: {os.access(script_dir, os.W_OK)}")
-    
-    # Load HTML content
-    html_content = load_html_content()
+    import webview
     
     # Create API instance
     api = PyResumeAPI()
-    print("✅ PyResume API initialized")
+    logger.debug("PyResume API initialized")
     
-    # Create temporary HTML file
-    html_file = create_temp_html(html_content)
+    # Start background music in a separate thread, only if there is any
+    music_path = find_music_file()
+    if music_path:
+        music_thread = threading.Thread(target=play_background_music, args=(music_path,), daemon=True)
+        music_thread.start()
+    else:
+        logger.debug("Music file '%s' not found. Continuing without background music.", MUSIC_FILE)
     
-    # Start background music in a separate thread
-    music_thread = threading.Thread(target=play_background_music, daemon=True)
-    music_thread.start()
+    # Load index.html in place; fall back to inline HTML if it is missing
+    html_file = find_index_html()
+    if html_file:
+        logger.debug("Loading HTML from: %s", html_file)
+        window_source = {'url': html_file}
+    else:
+        logger.warning("index.html not found, using fallback HTML")
+        window_source = {'html': create_fallback_html()}
     
     # Create and start webview window
-    print("🚀 Starting PyResume AI Application...")
-    window = webview.create_window(
+    window = api.window = webview.create_window(
         'PyResume AI - Intelligent Resume Analysis',
-        f'file:///{html_file.replace(os.sep, "/")}',
         js_api=api,
         width=1200,
         height=800,
         min_size=(800, 600),
-        text_select=True
+        text_select=True,
+        **window_source
     )
     
     print("📋 Instructions:")
-    print("   1. Upload a resume (PDF or DOC)")
+    print("   1. Upload a resume (PDF, Word, RTF, HTML or plain text)")
     print("   2. Enter job description (minimum 1 character)")
     print("   3. Click 'Analyze with PyResume AI'")
     print("   4. Files will be saved in: uploads/ subdirectory")
-    print("   5. Check console for detailed debugging info")
+    print("   5. Set PYRESUME_LOG_LEVEL=DEBUG for detailed debugging info")
     print("   6. Close the window to exit")
     print("=" * 60)
     
     try:
-        webview.start(debug=False)
+        # Load the spaCy model in the background once the window is up
+        webview.start(warm_up, debug=False)
     except KeyboardInterrupt:
         print("\n🛑 Application interrupted by user")
     except Exception as e:
-        print(f"\n💥 Error starting application: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error starting application: %s", e)
     finally:
-        if pygame.mixer.get_init():
-            pygame.mixer.music.stop()
-            pygame.mixer.quit()
-        print("🎵 Background music stopped")
+        api.jobs.shutdown()
+        # Uploads are kept for reuse; only files past the age/size quotas are removed
+        api.store.close()
+        api.results_store.close()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+        if 'suggestions' in sys.modules:
+            sys.modules['suggestions'].get_service().close()
+        stop_background_music()
         print("👋 PyResume AI Application closed")
         
-        # api.cleanup_files()  # Uncomment to auto-cleanup
\ No newline at end of file
+        # api.cleanup_files()  # Uncomment to also remove this session's uploads
\ No newline at end of file
@@ -0,0 +1,134 @@
+"""
+Logging and per-request timing for PyResume.
+
+All modules log through get_logger(); nothing is printed below INFO unless
+PYRESUME_LOG_LEVEL=DEBUG (or PYRESUME_DEBUG=1) is set. Each request can
+record how long its stages took in a RequestTiming; finished records are
+appended as JSON lines to the file named by PYRESUME_TIMINGS, if set.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+LOGGER_NAME = 'pyresume'
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(name)s: %(message)s'
+
+_timings_path = os.environ.get('PYRESUME_TIMINGS') or None
+_timings_lock = threading.Lock()
+_timing_listeners = []
+
+
+def configure_logging(level=None):
+    """
+    Attach a console handler to the 'pyresume' logger. The level comes from the
+    argument, PYRESUME_LOG_LEVEL, or PYRESUME_DEBUG, and defaults to INFO.
+    """
+    if level is None:
+        level = os.environ.get('PYRESUME_LOG_LEVEL')
+        if not level:
+            level = 'DEBUG' if os.environ.get('PYRESUME_DEBUG') else 'INFO'
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.setLevel(level.upper() if isinstance(level, str) else level)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.propagate = False
+    return logger
+
+
+def get_logger(name):
+    return logging.getLogger(f'{LOGGER_NAME}.{name}')
+
+
+def set_timings_path(path):
+    """
+    Export finished timing records to this JSON lines file (None disables the export).
+    """
+    global _timings_path
+    _timings_path = path
+
+
+def add_timing_listener(listener):
+    """
+    Call listener(record) for every finished RequestTiming.
+    """
+    _timing_listeners.append(listener)
+
+
+def _export(record):
+    for listener in list(_timing_listeners):
+        try:
+            listener(record)
+        except Exception:
+            get_logger('timing').exception("Timing listener failed")
+    if not _timings_path:
+        return
+    line = json.dumps(record, separators=(',', ':'))
+    with _timings_lock:
+        with open(_timings_path, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+
+
+class RequestTiming:
+    """
+    Durations of the stages of one request, in milliseconds.
+
+        timing = RequestTiming('analyze')
+        with timing.stage('extract'):
+            ...
+        timing.finish()
+
+    Repeated stages (e.g. one decode per upload chunk) are summed.
+    """
+    def __init__(self, kind, **fields):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.fields = fields
+        self.stages = {}
+        self.started = time.time()
+        self._start = time.perf_counter()
+        self.finished = False
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds * 1000
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def merge(self, other):
+        for name, ms in other.stages.items():
+            self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def record(self, status='success'):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': status,
+            'started': round(self.started, 3),
+            'totalMs': round((time.perf_counter() - self._start) * 1000, 3),
+            'stages': {name: round(ms, 3) for name, ms in self.stages.items()},
+            **self.fields,
+        }
+
+    def finish(self, status='success'):
+        """
+        Close the record, export it and return it. Only the first call has an effect.
+        """
+        if self.finished:
+            return None
+        self.finished = True
+        record = self.record(status)
+        _export(record)
+        get_logger('timing').debug("%s %s %s in %.1f ms %s", self.kind, self.id, status,
+                                   record['totalMs'], record['stages'])
+        return record
@@ -0,0 +1,204 @@
+"""
+Every analysis ever run, in a local SQLite database.
+
+    analyses          one row per (job description, resume): score, experience, education
+                      and the full result as JSON
+    analysis_skills   (skill, analysis) pairs for every skill found in each resume
+    jobs              the job descriptions the analyses were run against
+    signatures        MinHash signature of every resume's text, for near-duplicate checks
+
+Rows are keyed by the SHA-256 of the resume file and of the job description text,
+so analysing the same pair again replaces the old row. The database runs in WAL
+mode: readers never wait for the writer, and analysis jobs on worker threads can
+record results while the page queries them.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pyresume_log import get_logger
+
+logger = get_logger('results')
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results.db")
+# Per-request keys that are not part of an analysis and aren't kept with it
+# (fileId is the HTTP service's name for the file hash the row is keyed by)
+UNRECORDED_FIELDS = ('cached', 'status', 'id', 'fileId')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS analyses (
+    id INTEGER PRIMARY KEY,
+    file_hash TEXT NOT NULL,
+    job_hash TEXT NOT NULL,
+    file_name TEXT,
+    score INTEGER NOT NULL,
+    experience_years INTEGER,
+    education TEXT,
+    created REAL NOT NULL,
+    result TEXT NOT NULL,
+    UNIQUE (job_hash, file_hash)
+);
+CREATE INDEX IF NOT EXISTS analyses_job_score ON analyses (job_hash, score DESC);
+CREATE INDEX IF NOT EXISTS analyses_score ON analyses (score DESC);
+CREATE INDEX IF NOT EXISTS analyses_created ON analyses (created DESC);
+CREATE TABLE IF NOT EXISTS analysis_skills (
+    skill TEXT NOT NULL COLLATE NOCASE,
+    analysis_id INTEGER NOT NULL REFERENCES analyses (id) ON DELETE CASCADE,
+    PRIMARY KEY (skill, analysis_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS analysis_skills_analysis ON analysis_skills (analysis_id);
+CREATE TABLE IF NOT EXISTS signatures (
+    file_hash TEXT PRIMARY KEY,
+    file_name TEXT,
+    signature BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class ResultsStore:
+    """
+    Thread-safe store of analysis results: one connection, serialised by a lock.
+    """
+    def __init__(self, path=DEFAULT_DB_PATH):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        # Durable at checkpoints; a crash can lose the last few results but never corrupt the file
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        self._db.executescript(SCHEMA)
+
+    def add(self, file_hash, job, result):
+        """
+        Record one analysis of a resume (by file hash) against a job.CompiledJob.
+        """
+        self.add_many([(file_hash, job, result)])
+
+    def add_many(self, rows):
+        """
+        Record many (file hash, CompiledJob, result) analyses in a single transaction.
+        A result's resumeSkills (all the skills parsed from the resume, not just the ones
+        the job asked for) are indexed in analysis_skills; UNRECORDED_FIELDS are left out.
+        Returns the number recorded.
+        """
+        now = time.time()
+        jobs, analyses, skills = {}, [], []
+        for file_hash, job, result in rows:
+            result = {key: value for key, value in result.items() if key not in UNRECORDED_FIELDS}
+            jobs[job.hash] = job.text
+            analyses.append((file_hash, job.hash, result.get('fileName'), result['overallScore'],
+                             result.get('experienceYears'), result.get('education'), now,
+                             json.dumps(result, separators=(',', ':'))))
+            skills.append(result.get('resumeSkills') or result.get('matchedSkills') or [])
+        if not analyses:
+            return 0
+
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR IGNORE INTO jobs (job_hash, text, created) VALUES (?, ?, ?)",
+                                 [(job_hash, text, now) for job_hash, text in jobs.items()])
+            self._db.executemany(
+                "INSERT INTO analyses (file_hash, job_hash, file_name, score, experience_years, education,"
+                " created, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (job_hash, file_hash) DO UPDATE SET file_name = excluded.file_name,"
+                " score = excluded.score, experience_years = excluded.experience_years,"
+                " education = excluded.education, created = excluded.created, result = excluded.result",
+                analyses)
+            ids = [self._db.execute("SELECT id FROM analyses WHERE job_hash = ? AND file_hash = ?",
+                                    (row[1], row[0])).fetchone()[0] for row in analyses]
+            self._db.executemany("DELETE FROM analysis_skills WHERE analysis_id = ?", [(i,) for i in ids])
+            self._db.executemany("INSERT OR IGNORE INTO analysis_skills (skill, analysis_id) VALUES (?, ?)",
+                                 [(skill, i) for i, names in zip(ids, skills) for skill in names])
+        return len(ids)
+
+    def top(self, job_hash=None, skills=(), limit=50, offset=0, min_score=None):
+        """
+        Best results first, optionally only for one job description (by CompiledJob.hash),
+        only resumes listing every one of skills, and only scores >= min_score.
+        """
+        where, params = [], []
+        if job_hash:
+            where.append("a.job_hash = ?")
+            params.append(job_hash)
+        if min_score is not None:
+            where.append("a.score >= ?")
+            params.append(int(min_score))
+        skills = sorted({skill.strip().lower() for skill in skills or () if skill and skill.strip()})
+        if skills:
+            where.append(f"a.id IN (SELECT analysis_id FROM analysis_skills WHERE skill IN"
+                         f" ({', '.join('?' * len(skills))}) GROUP BY analysis_id HAVING COUNT(*) = ?)")
+            params.extend(skills + [len(skills)])
+        sql = ("SELECT a.file_hash, a.job_hash, a.created, a.result FROM analyses a"
+               + (" WHERE " + " AND ".join(where) if where else "")
+               + " ORDER BY a.score DESC, a.file_name LIMIT ? OFFSET ?")
+        return self._query(sql, params + [int(limit), int(offset)])
+
+    def recent(self, limit=50, offset=0):
+        """
+        Most recent analyses first.
+        """
+        return self._query("SELECT file_hash, job_hash, created, result FROM analyses"
+                           " ORDER BY created DESC, id DESC LIMIT ? OFFSET ?", [int(limit), int(offset)])
+
+    def count(self, job_hash=None):
+        with self._lock:
+            if job_hash:
+                return self._db.execute("SELECT COUNT(*) FROM analyses WHERE job_hash = ?", (job_hash,)).fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM analyses").fetchone()[0]
+
+    def jobs(self, limit=50):
+        """
+        Job descriptions with analyses, most recently used first, with a preview of their text.
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT j.job_hash, substr(j.text, 1, 200) AS preview, length(j.text) AS length,"
+                " COUNT(a.id) AS analyses, MAX(a.created) AS last_used"
+                " FROM jobs j JOIN analyses a ON a.job_hash = j.job_hash"
+                " GROUP BY j.job_hash ORDER BY last_used DESC LIMIT ?", (int(limit),)).fetchall()
+        return [{'jobHash': row['job_hash'], 'preview': row['preview'], 'length': row['length'],
+                 'analyses': row['analyses'], 'lastUsed': row['last_used']} for row in rows]
+
+    def add_signature(self, file_hash, file_name, signature):
+        """
+        Keep the near-duplicate signature (see dedupe.minhash) of a resume's text.
+        """
+        with self._lock, self._db:
+            self._db.execute("INSERT OR IGNORE INTO signatures (file_hash, file_name, signature) VALUES (?, ?, ?)",
+                             (file_hash, file_name, signature.tobytes()))
+
+    def signatures(self):
+        """
+        (file hash, file name, signature bytes) of every resume, for dedupe.DuplicateIndex.
+        """
+        with self._lock:
+            return self._db.execute("SELECT file_hash, file_name, signature FROM signatures").fetchall()
+
+    def _query(self, sql, params):
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+        results = []
+        for row in rows:
+            result = json.loads(row['result'])
+            result.update({'fileHash': row['file_hash'], 'jobHash': row['job_hash'], 'storedAt': row['created']})
+            results.append(result)
+        return results
+
+    def close(self):
+        with self._lock:
+            try:
+                # Fold the WAL back into the database file so it doesn't linger between runs
+                self._db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            except sqlite3.Error as e:
+                logger.warning("Could not checkpoint %s: %s", self.path, e)
+            self._db.close()
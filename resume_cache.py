@@ -0,0 +1,171 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Default on-disk budget for the cache directory
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+# After an eviction the cache is trimmed down to this fraction of the budget
+EVICT_TO_RATIO = 0.9
+
+
+def hash_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path, block_size=1024 * 1024):
+    """
+    SHA-256 of a file, read in blocks so large resumes are never fully loaded.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def hash_text(text):
+    """
+    Hash of a job description (or any text), ignoring surrounding whitespace.
+    """
+    return hashlib.sha256((text or '').strip().encode('utf-8')).hexdigest()
+
+
+class ResumeCache:
+    """
+    Persistent cache keyed by the SHA-256 of the resume file bytes.
+
+    Every entry is one small JSON file, cache_dir/<hash[:2]>/<hash>.<kind>.json, so
+    extracted text, parsed sections and analysis results can be stored and evicted
+    independently. The total size is kept under max_bytes by evicting the least
+    recently used entries; reads refresh an entry's mtime so recency survives restarts.
+    """
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for shard in os.scandir(self.cache_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith('.json'):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self.total_bytes += size
+
+    def _entry_path(self, key_hash, kind):
+        return os.path.join(self.cache_dir, key_hash[:2], f"{key_hash}.{kind}.json")
+
+    def get(self, key_hash, kind):
+        """
+        Return the cached value for (key_hash, kind), or None.
+        """
+        path = self._entry_path(key_hash, kind)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if path in self._entries:
+                self._entries.move_to_end(path)
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return value
+
+    def put(self, key_hash, kind, value):
+        """
+        Store a JSON-serializable value, replacing any previous entry atomically.
+        """
+        path = self._entry_path(key_hash, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, separators=(',', ':'))
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        size = os.path.getsize(path)
+        with self._lock:
+            self.total_bytes += size - self._entries.pop(path, 0)
+            self._entries[path] = size
+            if self.total_bytes > self.max_bytes:
+                self._evict(int(self.max_bytes * EVICT_TO_RATIO))
+
+    def _evict(self, target_bytes):
+        while self._entries and self.total_bytes > target_bytes:
+            path, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def get_analysis(self, file_hash, job_hash):
+        return self.get(file_hash, f"analysis-{job_hash}")
+
+    def put_analysis(self, file_hash, job_hash, result):
+        self.put(file_hash, f"analysis-{job_hash}", result)
+
+    def get_or_extract_text(self, file_hash, file_path, extract=None):
+        """
+        Return the extracted text of a resume, extracting and caching it on a miss.
+        """
+        return self.get_or_extract(file_hash, file_path, extract)[0]
+
+    def get_or_extract(self, file_hash, file_path, extract=None):
+        """
+        get_or_extract_text, as (text, complete). Text missing a scanned page whose OCR
+        timed out is returned with complete False and isn't cached, so the next call
+        extracts it again; anything derived from it shouldn't be cached either.
+        """
+        cached = self.get(file_hash, 'text')
+        if cached is not None:
+            return cached, True
+
+        if extract is None:
+            # Passing the cache lets OCR'd pages be reused even if the text entry is evicted
+            from extractor import extract_resume_text
+            text, complete = extract_resume_text(file_path, cache=self)
+        else:
+            text, complete = extract(file_path), True
+        if text and complete:
+            self.put(file_hash, 'text', text)
+        return text, complete
+
+    def clear(self):
+        with self._lock:
+            self._evict(0)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self.total_bytes,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,230 @@
+"""
+Resume sections, found in a single pass over the extracted text.
+
+A resume is split at its headings ("Work Experience", "EDUCATION", "Technical
+Skills:", ...) into spans of the original text. The parsed record keeps only
+offsets and small integer codes in arrays, plus the facts scoring needs, so
+thousands of them can stay in memory and be rescored against any job
+description without touching the text again.
+
+Evidence for the facts scoring uses (where each skill, employment date range and
+degree was found) is recorded during the same pass, as offsets into the text and
+page numbers, so a result can be explained without scanning the resume again.
+"""
+import re
+from array import array
+from bisect import bisect_right
+
+from skills import get_matcher
+
+# Section kinds; a kind's code is its index here. Text before the first heading is the header.
+KINDS = ('header', 'summary', 'experience', 'education', 'skills', 'projects', 'certifications', 'other')
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+SECTION_HEADINGS = {
+    'summary': ('summary', 'professional summary', 'career summary', 'profile', 'professional profile',
+                'objective', 'career objective', 'about me'),
+    'experience': ('experience', 'work experience', 'professional experience', 'relevant experience',
+                   'employment', 'employment history', 'work history', 'career history', 'internships',
+                   'internship experience'),
+    'education': ('education', 'academic background', 'academic qualifications', 'qualifications',
+                  'education and training', 'academics'),
+    'skills': ('skills', 'technical skills', 'key skills', 'core skills', 'core competencies', 'technologies',
+               'tools', 'skills and tools', 'skills & tools', 'tech stack'),
+    'projects': ('projects', 'personal projects', 'academic projects', 'key projects', 'selected projects'),
+    'certifications': ('certifications', 'certificates', 'licenses and certifications', 'courses',
+                       'training'),
+    'other': ('awards', 'achievements', 'honors', 'publications', 'languages', 'interests', 'hobbies',
+              'volunteering', 'volunteer experience', 'references', 'activities', 'extracurricular activities'),
+}
+_HEADING_KINDS = {alias: kind for kind, aliases in SECTION_HEADINGS.items() for alias in aliases}
+
+# What an evidence row points at; a kind's code is its index here. The row's ref is the
+# skill's matcher index for 'skill', the date range's index in date_months (in pairs) for
+# 'experience' and the analyzer.EDUCATION_LEVELS index for 'education'.
+EVIDENCE_KINDS = ('skill', 'experience', 'education')
+EVIDENCE_CODES = {kind: code for code, kind in enumerate(EVIDENCE_KINDS)}
+# Extractors separate pages with this character (see extractor.PAGE_BREAK)
+PAGE_BREAK_CHAR = '\f'
+
+
+def _heading_pattern(aliases):
+    # Longest first, so "work experience" wins over "experience"
+    alternatives = [re.escape(alias).replace(r'\ ', r'\s+') for alias in sorted(aliases, key=len, reverse=True)]
+    return '|'.join(alternatives)
+
+
+# A heading is a line of its own, optionally bulleted or numbered, optionally ending in a
+# colon; "Skills: Python, SQL" is a heading followed by its body on the same line.
+HEADING_RE = re.compile(
+    r'^[ \t]*(?:[#*•\-–]+[ \t]*|\d{1,2}[.)][ \t]*)?(?P<title>' + _heading_pattern(_HEADING_KINDS) + r')[ \t]*(?::|$)',
+    re.IGNORECASE | re.MULTILINE
+)
+
+
+def split_sections(text):
+    """
+    (kinds, bounds) for the sections of text: kinds is an array of kind codes and bounds
+    holds each section's body as a flat start, end pair of offsets. Empty sections are dropped.
+    """
+    text = text or ''
+    kinds, bounds = array('B'), array('I')
+    kind, position = KIND_CODES['header'], 0
+    for match in HEADING_RE.finditer(text):
+        if match.start() > position and not text[position:match.start()].isspace():
+            kinds.append(kind)
+            bounds.extend((position, match.start()))
+        title = ' '.join(match.group('title').lower().split())
+        kind, position = KIND_CODES[_HEADING_KINDS[title]], match.end()
+    if position < len(text) and not text[position:].isspace():
+        kinds.append(kind)
+        bounds.extend((position, len(text)))
+    return kinds, bounds
+
+
+def page_starts(text):
+    """
+    Offsets at which the second and later pages of text start.
+    """
+    starts = array('I')
+    position = text.find(PAGE_BREAK_CHAR)
+    while position != -1:
+        starts.append(position + 1)
+        position = text.find(PAGE_BREAK_CHAR, position + 1)
+    return starts
+
+
+class ParsedResume:
+    """
+    Compact structured form of one resume.
+
+    kinds/bounds locate the sections in the text the record was parsed from (which is
+    not kept); skill_ids index the skill matcher's taxonomy; date_months holds the
+    employment date ranges as flat start, end pairs of months since year 0.
+    evidence holds flat (kind code, ref, start, end) rows, see EVIDENCE_KINDS, and
+    pages the offsets where each page after the first starts.
+    """
+    __slots__ = ('length', 'kinds', 'bounds', 'skill_ids', 'date_months', 'experience_years', 'education',
+                 'evidence', 'pages')
+
+    def __init__(self, length=0, kinds=None, bounds=None, skill_ids=None, date_months=None,
+                 experience_years=0, education=None, evidence=None, pages=None):
+        self.length = length
+        self.kinds = kinds if kinds is not None else array('B')
+        self.bounds = bounds if bounds is not None else array('I')
+        self.skill_ids = skill_ids if skill_ids is not None else array('H')
+        self.date_months = date_months if date_months is not None else array('I')
+        self.experience_years = experience_years
+        self.education = education
+        self.evidence = evidence if evidence is not None else array('I')
+        self.pages = pages if pages is not None else array('I')
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __repr__(self):
+        return (f"ParsedResume(sections={self.section_names()}, skills={len(self.skill_ids)}, "
+                f"experience_years={self.experience_years}, education={self.education!r})")
+
+    @property
+    def skills(self):
+        """
+        Skill names found in the resume, in taxonomy order.
+        """
+        names = get_matcher().skills
+        return [names[i] for i in self.skill_ids]
+
+    def section_names(self):
+        """
+        Kinds of the sections present, in order of first appearance.
+        """
+        seen = []
+        for code in self.kinds:
+            if KINDS[code] not in seen:
+                seen.append(KINDS[code])
+        return seen
+
+    def spans(self, kind):
+        """
+        (start, end) offsets of every section of the given kind.
+        """
+        code = KIND_CODES[kind]
+        return [(self.bounds[2 * i], self.bounds[2 * i + 1]) for i, c in enumerate(self.kinds) if c == code]
+
+    def section_text(self, text, kind):
+        """
+        Body of every section of the given kind in text (the text this record was parsed from).
+        """
+        return '\n'.join(text[start:end] for start, end in self.spans(kind))
+
+    def section_at(self, offset):
+        """
+        Kind of the section containing a text offset.
+        """
+        for i, code in enumerate(self.kinds):
+            if self.bounds[2 * i] <= offset < self.bounds[2 * i + 1]:
+                return KINDS[code]
+        return None
+
+    def add_evidence(self, kind, ref, start, end):
+        self.evidence.extend((EVIDENCE_CODES[kind], ref, start, end))
+
+    def page_at(self, offset):
+        """
+        1-based page number of a text offset.
+        """
+        return bisect_right(self.pages, offset) + 1
+
+    def evidence_for(self, kind, ref=None):
+        """
+        (ref, start, end, page) of every evidence row of a kind, optionally only for one ref.
+        """
+        code = EVIDENCE_CODES[kind]
+        rows = []
+        for i in range(0, len(self.evidence), 4):
+            if self.evidence[i] == code and (ref is None or self.evidence[i + 1] == ref):
+                start = self.evidence[i + 2]
+                rows.append((self.evidence[i + 1], start, self.evidence[i + 3], self.page_at(start)))
+        return rows
+
+    def evidence_counts(self, kind):
+        """
+        Number of evidence rows per ref of a kind.
+        """
+        code = EVIDENCE_CODES[kind]
+        counts = {}
+        for i in range(0, len(self.evidence), 4):
+            if self.evidence[i] == code:
+                counts[self.evidence[i + 1]] = counts.get(self.evidence[i + 1], 0) + 1
+        return counts
+
+    def to_list(self):
+        """
+        Plain JSON-compatible form, for caches and process boundaries. Skills are stored
+        by name so cached records survive taxonomy changes.
+        """
+        names = get_matcher().skills
+        skill_code = EVIDENCE_CODES['skill']
+        evidence = self.evidence.tolist()
+        for i in range(0, len(evidence), 4):
+            if evidence[i] == skill_code:
+                evidence[i + 1] = names[evidence[i + 1]]
+        return [self.length, self.kinds.tolist(), self.bounds.tolist(), self.skills,
+                self.date_months.tolist(), self.experience_years, self.education, evidence, self.pages.tolist()]
+
+    @classmethod
+    def from_list(cls, data):
+        length, kinds, bounds, skill_names, date_months, experience_years, education, evidence, pages = data
+        index = {name: i for i, name in enumerate(get_matcher().skills)}
+        skill_code = EVIDENCE_CODES['skill']
+        rows = array('I')
+        for i in range(0, len(evidence), 4):
+            kind, ref = evidence[i], evidence[i + 1]
+            if kind == skill_code:
+                if ref not in index:
+                    continue
+                ref = index[ref]
+            rows.extend((kind, ref, evidence[i + 2], evidence[i + 3]))
+        return cls(length, array('B', kinds), array('I', bounds),
+                   array('H', sorted(index[name] for name in skill_names if name in index)),
+                   array('I', date_months), experience_years, education, rows, array('I', pages))
@@ -0,0 +1,762 @@
+"""
+Headless HTTP service: PyResume analysis for many users at once, without the desktop window.
+
+    python server.py --port 8080 --workers 4
+
+Endpoints (JSON, in the same {'status', 'data' | 'message'} envelope as the desktop bridge):
+
+    GET   /health               server, session and worker pool status
+    GET   /metrics              Prometheus text format (request counts and latencies with --metrics)
+    POST  /upload               multipart/form-data with 'file' parts and an optional 'job_description' field
+    POST  /job-description      {"job_description": "..."}
+    POST  /analyze              {"file_id": "...", "job_description": "..."}, both optional
+    GET   /results              this session's analyses, newest first
+    GET   /results/<file_id>
+    POST  /cleanup              release this session's uploads and results
+
+Each client is a session, identified by the X-Session-Id header (or the pyresume_session
+cookie); a new one is issued on the first request. Uploads are streamed into the shared
+content-addressed upload store and hashed as they arrive, extraction and scoring run in a
+bounded process pool, and analyses beyond the queue limit are answered with 503 instead
+of piling up. Every analysis is also recorded in the results store (results.db), the
+same one the desktop app queries, and checked against the near-duplicate index of every
+resume seen before.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import signal
+import sqlite3
+import sys
+import time
+import uuid
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import suppress
+from functools import partial
+from http import HTTPStatus
+from urllib.parse import urlsplit
+
+import metrics
+from batch import DEFAULT_CACHE_DIR, _init_worker, analyze_file
+from dedupe import DuplicateIndex
+from ingestion import SNIFF_BYTES, UnsupportedFormat, check_name, detect_format, require_format
+from job_profile import compile_job
+from pyresume_log import RequestTiming, configure_logging, get_logger
+from results_store import DEFAULT_DB_PATH, ResultsStore
+from upload_store import UploadStore, safe_file_name
+
+logger = get_logger('server')
+
+DEFAULT_UPLOADS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "uploads")
+DEFAULT_MAX_UPLOAD_BYTES = 20 * 1024 * 1024
+READ_SIZE = 64 * 1024
+MAX_HEADER_BYTES = 16 * 1024
+MAX_HEADERS = 100
+MAX_JSON_BYTES = 1024 * 1024
+MAX_FIELD_BYTES = 256 * 1024
+MAX_RESULTS_PER_SESSION = 200
+KEEP_ALIVE_TIMEOUT = 15
+# A client that sends nothing of its request body for this many seconds is cut off
+BODY_READ_TIMEOUT = 30
+# Idle sessions are dropped after this many seconds, releasing their uploads
+SESSION_TTL = 3600
+SWEEP_INTERVAL = 60
+
+SESSION_HEADER = 'x-session-id'
+SESSION_COOKIE = 'pyresume_session'
+BOUNDARY_RE = re.compile(r'boundary=(?:"([^"]+)"|([^;\s]+))', re.IGNORECASE)
+DISPOSITION_PARAM_RE = re.compile(r'(\w+)="([^"]*)"|(\w+)=([^;\s]+)')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class RawResponse:
+    """
+    A handler result sent as is instead of wrapped in the JSON envelope.
+    """
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+
+
+class Session:
+    """
+    Everything one client has uploaded and analyzed; replaces the desktop app's instance state.
+    """
+    def __init__(self, session_id):
+        self.id = session_id
+        self.job_description = ""
+        self.uploads = OrderedDict()   # file id (sha256) -> upload info
+        self.results = OrderedDict()   # file id -> latest analysis
+        self.last_seen = time.monotonic()
+
+
+class Request:
+    def __init__(self, method, target, version, headers, reader, writer):
+        parts = urlsplit(target)
+        self.method = method.upper()
+        self.path = parts.path
+        self.version = version
+        self.headers = headers
+        self.reader = reader
+        self.writer = writer
+        try:
+            self.remaining = int(headers.get('content-length') or 0)
+        except ValueError:
+            raise HTTPError(400, 'Invalid Content-Length')
+        self.content_length = self.remaining
+        self._continue_sent = False
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def cookie(self, name):
+        for part in self.headers.get('cookie', '').split(';'):
+            key, _, value = part.strip().partition('=')
+            if key == name:
+                return value
+        return None
+
+    async def read_chunk(self):
+        """
+        Next piece of the body (at most READ_SIZE bytes), or b'' once it has been read completely.
+        """
+        if self.remaining <= 0:
+            return b''
+        if not self._continue_sent and self.headers.get('expect', '').lower() == '100-continue':
+            self.writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+            self._continue_sent = True
+        try:
+            data = await asyncio.wait_for(self.reader.read(min(READ_SIZE, self.remaining)), BODY_READ_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPError(408, 'Timed out reading the request body')
+        if not data:
+            raise HTTPError(400, 'Truncated request body')
+        self.remaining -= len(data)
+        return data
+
+    async def json(self):
+        if self.content_length > MAX_JSON_BYTES:
+            raise HTTPError(413, 'Request body too large')
+        chunks = []
+        while True:
+            data = await self.read_chunk()
+            if not data:
+                break
+            chunks.append(data)
+        if not chunks:
+            return {}
+        try:
+            body = json.loads(b''.join(chunks))
+        except ValueError:
+            raise HTTPError(400, 'Request body is not valid JSON')
+        if not isinstance(body, dict):
+            raise HTTPError(400, 'Request body must be a JSON object')
+        return body
+
+
+class UploadSink:
+    """
+    Streams one uploaded file to a temp file in the upload store, hashing it on the way.
+    The format is sniffed from the first bytes (see ingestion), so an unsupported file is
+    rejected as soon as they arrive, whatever its name says.
+    """
+    def __init__(self, store, file_name, max_bytes):
+        self.store = store
+        self.file_name = safe_file_name(file_name)
+        self.max_bytes = max_bytes
+        self.digest = hashlib.sha256()
+        self.header = bytearray()
+        self.size = 0
+        self.finished = False
+        fd, self.temp_path = store.temp_file()
+        self.handle = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_bytes:
+            raise HTTPError(413, f'{self.file_name} exceeds the {self.max_bytes // (1024 * 1024)} MB upload limit')
+        if len(self.header) < SNIFF_BYTES:
+            self.header += data[:SNIFF_BYTES - len(self.header)]
+            if len(self.header) == SNIFF_BYTES and detect_format(self.header) is None:
+                raise HTTPError(415, f'{self.file_name} is not a supported resume format')
+        self.handle.write(data)
+        self.digest.update(data)
+
+    def finish(self):
+        """
+        Move the file into the store; the same resume uploaded twice (by anyone) is stored once.
+        Returns the upload info and whether the file was new to the store.
+        """
+        self.handle.close()
+        try:
+            fmt = require_format(self.header, self.temp_path, self.file_name)
+        except UnsupportedFormat as e:
+            raise HTTPError(415, str(e))
+        check_name(self.file_name, fmt)
+        stored, created = self.store.put_file(self.temp_path, self.file_name, self.digest.hexdigest(), self.size,
+                                              ext=fmt.extension)
+        self.finished = True
+        return {'id': stored.hash, 'name': self.file_name, 'size': self.size, 'type': fmt.mime}, created
+
+    def discard(self):
+        self.handle.close()
+        with suppress(OSError):
+            os.remove(self.temp_path)
+
+
+class MultipartReader:
+    """
+    Incremental multipart/form-data parser. File parts are handed to their sink as the
+    bytes arrive, so an upload is never held in memory as a whole.
+    """
+    def __init__(self, request, boundary):
+        self.request = request
+        self.delimiter = b'\r\n--' + boundary
+        # The body starts with the boundary line itself; a leading CRLF makes every delimiter look the same
+        self.buffer = b'\r\n'
+
+    async def _fill(self):
+        data = await self.request.read_chunk()
+        if not data:
+            raise HTTPError(400, 'Truncated multipart body')
+        self.buffer += data
+
+    async def _find(self, separator, limit):
+        while True:
+            index = self.buffer.find(separator)
+            if index >= 0:
+                return index
+            if len(self.buffer) > limit:
+                raise HTTPError(400, 'Malformed multipart body')
+            await self._fill()
+
+    async def _stream_part(self, write):
+        """
+        Pass the body of the current part to write() up to the next delimiter.
+        """
+        keep = len(self.delimiter) - 1
+        while True:
+            index = self.buffer.find(self.delimiter)
+            if index >= 0:
+                write(self.buffer[:index])
+                self.buffer = self.buffer[index + len(self.delimiter):]
+                return
+            # Hold back a tail that could be the start of a delimiter split across reads
+            if len(self.buffer) > keep:
+                write(self.buffer[:-keep])
+                self.buffer = self.buffer[-keep:]
+            await self._fill()
+
+    async def read_form(self, open_file):
+        """
+        Read the whole body. open_file(file_name, content_type) returns the sink for each
+        file part; other parts are returned as a dict of text fields.
+        """
+        fields = {}
+        await self._stream_part(lambda data: None)  # preamble
+        while True:
+            while len(self.buffer) < 2:
+                await self._fill()
+            if self.buffer.startswith(b'--'):
+                # Final delimiter; drain the epilogue so the connection can be reused
+                while await self.request.read_chunk():
+                    pass
+                return fields
+
+            end = await self._find(b'\r\n', MAX_HEADER_BYTES)
+            self.buffer = self.buffer[end + 2:]
+            end = await self._find(b'\r\n\r\n', MAX_HEADER_BYTES)
+            headers = _part_headers(self.buffer[:end])
+            self.buffer = self.buffer[end + 4:]
+
+            disposition = _disposition(headers.get('content-disposition', ''))
+            file_name = disposition.get('filename')
+            if file_name is not None:
+                sink = open_file(file_name.replace('\\', '/'), headers.get('content-type', 'application/octet-stream'))
+                await self._stream_part(sink.write)
+            else:
+                value = bytearray()
+
+                def collect(data, value=value):
+                    value.extend(data)
+                    if len(value) > MAX_FIELD_BYTES:
+                        raise HTTPError(413, 'Form field too large')
+
+                await self._stream_part(collect)
+                fields[disposition.get('name', '')] = value.decode('utf-8', 'replace')
+
+
+def _part_headers(block):
+    headers = {}
+    for line in block.decode('utf-8', 'replace').split('\r\n'):
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def _disposition(value):
+    params = {}
+    for match in DISPOSITION_PARAM_RE.finditer(value):
+        if match.group(1):
+            params[match.group(1).lower()] = match.group(2)
+        else:
+            params[match.group(3).lower()] = match.group(4)
+    return params
+
+
+class PyResumeServer:
+    """
+    asyncio HTTP front end: request parsing and sessions on the event loop,
+    extraction and scoring in a process pool of `workers` processes.
+    """
+    def __init__(self, uploads_dir=DEFAULT_UPLOADS_DIR, cache_dir=DEFAULT_CACHE_DIR, workers=None, max_queue=None,
+                 max_upload_bytes=DEFAULT_MAX_UPLOAD_BYTES, session_ttl=SESSION_TTL, results_path=DEFAULT_DB_PATH):
+        self.store = UploadStore(uploads_dir)
+        # Written only from the event loop, after a worker returns its analysis
+        self.results_store = ResultsStore(results_path)
+        self.duplicates = DuplicateIndex(loader=self.results_store.signatures, saver=self.results_store.add_signature)
+        self.cache_dir = cache_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_queue = self.workers * 4 if max_queue is None else max_queue
+        self.max_upload_bytes = max_upload_bytes
+        self.session_ttl = session_ttl
+        self.sessions = {}
+        self.references = Counter()  # file id -> number of sessions holding it
+        # Store objects first stored by this server's sessions; the only ones it deletes, since
+        # the store directory is shared (e.g. with the desktop app)
+        self.created = set()
+        self.pending = 0
+        self.pool = None
+        self.slots = None
+        self.server = None
+        self._sweeper = None
+        metrics.REGISTRY.gauge('pyresume_server_pending', "Analyses running or waiting for a worker",
+                               lambda: self.pending)
+        metrics.REGISTRY.gauge('pyresume_server_sessions', "Open sessions", lambda: len(self.sessions))
+        metrics.REGISTRY.gauge('pyresume_upload_store_bytes', "Size of the upload store", lambda: self.store.total_bytes)
+        metrics.REGISTRY.gauge('pyresume_upload_store_files', "Files in the upload store", lambda: len(self.store))
+        self.routes = [
+            ('GET', re.compile(r'/health$'), self.health),
+            ('GET', re.compile(r'/metrics$'), self.metrics),
+            ('POST', re.compile(r'/upload$'), self.upload),
+            ('POST', re.compile(r'/job-description$'), self.set_job_description),
+            ('POST', re.compile(r'/analyze$'), self.analyze),
+            ('GET', re.compile(r'/results$'), self.results),
+            ('GET', re.compile(r'/results/([0-9a-f]{64})$'), self.result),
+            ('POST', re.compile(r'/cleanup$'), self.cleanup),
+        ]
+
+    async def start(self, host='127.0.0.1', port=8080):
+        self.store.start_sweeper()
+        self.pool = self._new_pool()
+        self.slots = asyncio.Semaphore(self.workers)
+        self.server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        self._sweeper = asyncio.create_task(self._sweep_sessions())
+        return self.server.sockets[0].getsockname()[:2]
+
+    def _new_pool(self):
+        # Spawned, not forked: a forked worker would share the event loop's signal wakeup fd
+        return ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_worker, initargs=(self.cache_dir,))
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        host, port = await self.start(host, port)
+        logger.info("Listening on http://%s:%s (%d workers, queue %d)", host, port, self.workers, self.max_queue)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            with suppress(NotImplementedError):
+                loop.add_signal_handler(signum, stop.set)
+        try:
+            await stop.wait()
+        finally:
+            await self.close()
+
+    async def close(self):
+        if self._sweeper:
+            self._sweeper.cancel()
+        if self.server:
+            self.server.close()
+            await self.server.wait_closed()
+        if self.pool:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+        await asyncio.get_running_loop().run_in_executor(None, self.store.close)
+        self.results_store.close()
+        logger.info("Server stopped")
+
+    # Connections
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self._read_request(reader, writer), KEEP_ALIVE_TIMEOUT)
+                except HTTPError as e:
+                    self._write_response(writer, e.status, {'status': 'error', 'message': e.message}, {}, False)
+                    await writer.drain()
+                    break
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ValueError, ConnectionError):
+                    break
+                if request is None:
+                    break
+
+                status, payload, headers = await self._dispatch(request)
+                # A body the handler did not read would be parsed as the next request
+                keep_alive = request.keep_alive and request.remaining == 0
+                self._write_response(writer, status, payload, headers, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            # Connections still open at shutdown are cancelled while closing
+            with suppress(ConnectionError, asyncio.CancelledError):
+                await writer.wait_closed()
+
+    async def _read_request(self, reader, writer):
+        line = await reader.readline()
+        if not line:
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HTTPError(400, 'Malformed request line')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, sep, value = line.decode('latin-1').partition(':')
+            if not sep:
+                raise HTTPError(400, 'Malformed header line')
+            headers[name.strip().lower()] = value.strip()
+            if len(headers) > MAX_HEADERS:
+                raise HTTPError(431, 'Too many headers')
+
+        if 'transfer-encoding' in headers:
+            raise HTTPError(411, 'Chunked request bodies are not supported; send Content-Length')
+        return Request(method, target, version, headers, reader, writer)
+
+    async def _dispatch(self, request):
+        timing = RequestTiming('http', method=request.method, path=request.path)
+        session = None
+        headers = {}
+        try:
+            handler, params = self._route(request)
+            # Health checks and scrapes don't open sessions
+            if handler not in (self.health, self.metrics):
+                session, created = self._session(request)
+                headers['X-Session-Id'] = session.id
+                if created:
+                    headers['Set-Cookie'] = f'{SESSION_COOKIE}={session.id}; Path=/; HttpOnly; SameSite=Strict'
+            data = await handler(request, session, timing, *params)
+            status, payload = 200, data if isinstance(data, RawResponse) else {'status': 'success', 'data': data}
+        except HTTPError as e:
+            status, payload = e.status, {'status': 'error', 'message': e.message}
+            headers.update(e.headers)
+        except Exception as e:
+            logger.exception("Error handling %s %s", request.method, request.path)
+            status, payload = 500, {'status': 'error', 'message': f'Internal error: {str(e)}'}
+
+        if session is not None:
+            session.last_seen = time.monotonic()
+        timing.fields['statusCode'] = status
+        timing.finish('success' if isinstance(payload, RawResponse) else payload['status'])
+        return status, payload, headers
+
+    def _route(self, request):
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if match:
+                if method == request.method:
+                    return handler, match.groups()
+                allowed = True
+        if allowed:
+            raise HTTPError(405, f'{request.method} not allowed on {request.path}')
+        raise HTTPError(404, f'No such endpoint: {request.path}')
+
+    def _session(self, request):
+        session_id = request.headers.get(SESSION_HEADER) or request.cookie(SESSION_COOKIE)
+        session = self.sessions.get(session_id) if session_id else None
+        if session is not None:
+            return session, False
+        # Unknown (or expired) ids are never reused: ids are only issued by the server
+        session_id = uuid.uuid4().hex
+        session = self.sessions[session_id] = Session(session_id)
+        return session, True
+
+    def _release_uploads(self, session):
+        """
+        Drop a session's uploads and results, on the event loop. Returns the ids of the files
+        to remove from the store: those no other session holds that this server created.
+        """
+        unused = []
+        for file_id in session.uploads:
+            self.references[file_id] -= 1
+            if self.references[file_id] <= 0:
+                del self.references[file_id]
+                if file_id in self.created:
+                    self.created.discard(file_id)
+                    unused.append(file_id)
+        session.uploads.clear()
+        session.results.clear()
+        return unused
+
+    def _remove_files(self, file_ids):
+        """
+        Delete released files from the store; run in an executor. A file uploaded again
+        since it was released is kept.
+        """
+        return sum(self.store.remove(file_id) for file_id in file_ids if file_id not in self.references)
+
+    async def _sweep_sessions(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(SWEEP_INTERVAL)
+            cutoff = time.monotonic() - self.session_ttl
+            for session_id, session in list(self.sessions.items()):
+                if session.last_seen < cutoff:
+                    del self.sessions[session_id]
+                    await loop.run_in_executor(None, self._remove_files, self._release_uploads(session))
+                    logger.debug("Expired session %s", session_id)
+
+    def _write_response(self, writer, status, payload, headers, keep_alive):
+        if isinstance(payload, RawResponse):
+            body, content_type = payload.body, payload.content_type
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), 'application/json'
+        lines = [
+            f'HTTP/1.1 {status} {HTTPStatus(status).phrase}',
+            f'Content-Type: {content_type}',
+            f'Content-Length: {len(body)}',
+            f'Connection: {"keep-alive" if keep_alive else "close"}',
+        ]
+        lines.extend(f'{name}: {value}' for name, value in headers.items())
+        writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+
+    async def _run_in_pool(self, timing, fn, *args):
+        """
+        Run fn in the worker pool. At most `workers` calls are submitted at once and
+        at most max_queue more wait for a slot; anything beyond that is rejected.
+        """
+        if self.pending >= self.workers + self.max_queue:
+            raise HTTPError(503, 'Server busy, try again shortly', {'Retry-After': '1'})
+        self.pending += 1
+        try:
+            with timing.stage('queue'):
+                await self.slots.acquire()
+            pool = self.pool
+            try:
+                with timing.stage('analyze'):
+                    return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+            except BrokenProcessPool:
+                # A worker died (crash, OOM kill); every later call would fail on this pool too
+                if self.pool is pool:
+                    logger.error("A worker process died; starting a new worker pool")
+                    self.pool = self._new_pool()
+                    pool.shutdown(wait=False, cancel_futures=True)
+                raise HTTPError(503, 'An analysis worker stopped unexpectedly; try again', {'Retry-After': '1'})
+            finally:
+                self.slots.release()
+        finally:
+            self.pending -= 1
+
+    def _record(self, file_id, job_description, result):
+        """
+        Add an analysis to the results store. A store failure is logged rather than
+        failing the request that produced the result.
+        """
+        try:
+            self.results_store.add(file_id, compile_job(job_description), result)
+        except sqlite3.Error as e:
+            logger.warning("Could not record the analysis of %s: %s", result.get('fileName'), e)
+
+    def _duplicate_of(self, session, duplicate):
+        """
+        What a session is told about the earlier resume its upload duplicates: its id and
+        name only if the session uploaded it too, since other sessions are other users.
+        """
+        earlier = session.uploads.get(duplicate['fileHash'])
+        if earlier is None:
+            return {'similarity': duplicate['similarity']}
+        return {'fileId': earlier['id'], 'fileName': earlier['name'], 'similarity': duplicate['similarity']}
+
+    # Endpoints
+
+    async def health(self, request, session, timing):
+        return {
+            'sessions': len(self.sessions),
+            'workers': self.workers,
+            'pending': self.pending,
+            'maxQueue': self.max_queue,
+            'store': self.store.stats(),
+        }
+
+    async def metrics(self, request, session, timing):
+        return RawResponse(metrics.REGISTRY.render_prometheus().encode('utf-8'), metrics.PROMETHEUS_CONTENT_TYPE)
+
+    async def upload(self, request, session, timing):
+        content_type = request.headers.get('content-type', '')
+        match = BOUNDARY_RE.search(content_type)
+        if not content_type.lower().startswith('multipart/form-data') or not match:
+            raise HTTPError(415, 'Expected a multipart/form-data upload')
+        boundary = (match.group(1) or match.group(2)).encode('latin-1')
+
+        sinks = []
+
+        def open_file(file_name, file_type):
+            sink = UploadSink(self.store, file_name, self.max_upload_bytes)
+            sinks.append(sink)
+            return sink
+
+        files = []
+        try:
+            with timing.stage('receive'):
+                fields = await MultipartReader(request, boundary).read_form(open_file)
+            for sink in sinks:
+                if sink.size == 0:
+                    sink.discard()
+                    continue
+                upload, created = sink.finish()
+                if created:
+                    self.created.add(upload['id'])
+                if upload['id'] not in session.uploads:
+                    self.references[upload['id']] += 1
+                session.uploads[upload['id']] = upload
+                session.uploads.move_to_end(upload['id'])
+                files.append(upload)
+        except BaseException:
+            for sink in sinks:
+                if not sink.finished:
+                    sink.discard()
+            raise
+        if 'job_description' in fields:
+            session.job_description = fields['job_description'].strip()
+        if not files:
+            raise HTTPError(400, 'No non-empty file part in upload')
+
+        timing.fields['bytes'] = sum(f['size'] for f in files)
+        logger.debug("Session %s uploaded %d file(s)", session.id, len(files))
+        return {'files': files, 'jobDescriptionLength': len(session.job_description)}
+
+    async def set_job_description(self, request, session, timing):
+        body = await request.json()
+        session.job_description = str(body.get('job_description') or '').strip()
+        return {'length': len(session.job_description)}
+
+    async def analyze(self, request, session, timing):
+        body = await request.json()
+        if 'job_description' in body:
+            session.job_description = str(body['job_description'] or '').strip()
+        if not session.job_description:
+            raise HTTPError(400, 'Job description is empty')
+
+        file_id = body.get('file_id') or next(reversed(session.uploads), None)
+        upload = session.uploads.get(file_id) if file_id else None
+        if upload is None:
+            raise HTTPError(404, 'No uploaded file with that id' if file_id else 'Upload a resume first')
+        stored = self.store.get(upload['id'])
+        if stored is None:
+            raise HTTPError(410, f'{upload["name"]} has expired from the upload store; upload it again')
+
+        # The session's job description may change while the analysis waits for a worker
+        job_description = session.job_description
+        try:
+            result = await self._run_in_pool(timing, partial(analyze_file, with_signature=True), stored.path,
+                                             job_description)
+        except HTTPError:
+            raise
+        except Exception as e:
+            raise HTTPError(422, f'Could not analyze {upload["name"]}: {str(e)}')
+
+        # Server paths stay on the server; the file is identified by its id
+        result.pop('filePath', None)
+        result.pop('fileHash', None)
+        result.update({'fileId': upload['id'], 'fileName': upload['name'], 'fileType': upload['type']})
+        signature = result.pop('signature', None)
+        if signature is not None:
+            with timing.stage('dedupe'):
+                duplicate = self.duplicates.check(upload['id'], signature, upload['name'])
+            if duplicate:
+                result['duplicateOf'] = self._duplicate_of(session, duplicate)
+        with timing.stage('record'):
+            self._record(upload['id'], job_description, result)
+        session.results[upload['id']] = result
+        session.results.move_to_end(upload['id'])
+        while len(session.results) > MAX_RESULTS_PER_SESSION:
+            session.results.popitem(last=False)
+        return result
+
+    async def results(self, request, session, timing):
+        return list(reversed(session.results.values()))
+
+    async def result(self, request, session, timing, file_id):
+        if file_id not in session.results:
+            raise HTTPError(404, 'No analysis for that file in this session')
+        return session.results[file_id]
+
+    async def cleanup(self, request, session, timing):
+        released = len(session.uploads)
+        unused = self._release_uploads(session)
+        removed = await asyncio.get_running_loop().run_in_executor(None, self._remove_files, unused)
+        return {'released': released, 'removed': removed}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve PyResume analysis over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, help="worker processes for extraction and scoring (default: CPU count)")
+    parser.add_argument('--max-queue', type=int, help="analyses allowed to wait for a worker before 503 (default: 4 per worker)")
+    parser.add_argument('--max-upload-mb', type=float, default=DEFAULT_MAX_UPLOAD_BYTES / (1024 * 1024))
+    parser.add_argument('--data-dir', help="directory for uploads/, cache/ and results.db (default: next to server.py)")
+    parser.add_argument('--no-cache', action='store_true', help="don't reuse cached text and results")
+    parser.add_argument('--metrics', action='store_true', help="count requests and record their latencies for /metrics")
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    if args.metrics:
+        metrics.enable()
+    else:
+        metrics.enable_from_env()
+    if args.data_dir:
+        uploads_dir, cache_dir, results_path = (os.path.join(args.data_dir, name)
+                                                for name in ('uploads', 'cache', 'results.db'))
+    else:
+        uploads_dir, cache_dir, results_path = DEFAULT_UPLOADS_DIR, DEFAULT_CACHE_DIR, DEFAULT_DB_PATH
+    server = PyResumeServer(
+        uploads_dir=uploads_dir,
+        cache_dir=None if args.no_cache else cache_dir,
+        results_path=results_path,
+        workers=args.workers,
+        max_queue=args.max_queue,
+        max_upload_bytes=int(args.max_upload_mb * 1024 * 1024),
+    )
+    asyncio.run(server.serve(args.host, args.port))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+TF-IDF similarity between a job description and many resumes.
+
+Documents are weighted with the SMART "lnc.ltc" scheme: resume vectors use
+log term frequency and are cosine-normalised without IDF, the query carries the
+IDF. A resume's stored weights therefore never change when other resumes are
+added, so the index grows incrementally and never needs a rebuild; replaced or
+removed resumes only leave dead rows, which are compacted away once they pile up.
+
+The index is stored column-wise (term -> postings of resume ids and weights), so
+scoring every resume against a job description is a single sparse
+matrix-vector product: one pass over the postings of the query terms.
+"""
+import heapq
+import math
+import re
+import threading
+from array import array
+from collections import Counter
+
+# Replaced and removed resumes leave dead rows behind; once there are this many of them,
+# and they make up this share of the index, the rows and postings are rebuilt without them
+COMPACT_MIN_DELETED = 64
+COMPACT_RATIO = 0.25
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+
+STOP_WORDS = frozenset("""
+a about above after all also an and any are as at be been being but by can could did do does
+for from had has have having he her his i if in into is it its may me more most must my no not
+of on or our out over she should so such than that the their them then there these they this
+those through to too under up us very was we were what when where which while who will with
+would you your yours we're you'll etc e.g i.e per via
+""".split())
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or '').lower()) if t not in STOP_WORDS and len(t) > 1]
+
+
+def term_frequencies(text):
+    return Counter(tokenize(text))
+
+
+def _log_tf(count):
+    return 1.0 + math.log(count)
+
+
+class SimilarityIndex:
+    """
+    Incrementally updated sparse TF-IDF index over resumes.
+
+    Each resume is identified by a caller-chosen id (the file hash, for example) and can
+    carry the analysis fields used for ranking (overallScore, matchedSkills, ...).
+    """
+    def __init__(self):
+        self.doc_ids = []        # row -> doc id
+        self.rows = {}           # doc id -> row
+        self.meta = []           # row -> metadata dict
+        self.postings = {}       # term -> (array of rows, array of weights)
+        self.deleted = set()     # rows removed from the index
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_ids) - len(self.deleted)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.rows
+
+    def add(self, doc_id, text=None, terms=None, meta=None):
+        """
+        Add (or replace) a resume. Pass its text, or term counts computed elsewhere
+        (e.g. in a batch worker process) as terms.
+        """
+        if terms is None:
+            terms = term_frequencies(text)
+        weights = {term: _log_tf(count) for term, count in terms.items() if count > 0}
+        norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+
+        with self._lock:
+            if doc_id in self.rows:
+                self.deleted.add(self.rows[doc_id])
+                self._maybe_compact()
+            row = len(self.doc_ids)
+            self.doc_ids.append(doc_id)
+            self.rows[doc_id] = row
+            self.meta.append(dict(meta or {}))
+            for term, weight in weights.items():
+                posting = self.postings.get(term)
+                if posting is None:
+                    posting = self.postings[term] = (array('I'), array('f'))
+                posting[0].append(row)
+                posting[1].append(weight / norm)
+
+    def remove(self, doc_id):
+        with self._lock:
+            row = self.rows.pop(doc_id, None)
+            if row is not None:
+                self.deleted.add(row)
+                self._maybe_compact()
+
+    def _maybe_compact(self):
+        deleted = len(self.deleted)
+        if deleted >= COMPACT_MIN_DELETED and deleted >= COMPACT_RATIO * len(self.doc_ids):
+            self._compact()
+
+    def _compact(self):
+        """
+        Drop deleted rows and renumber the rest. Called with the lock held.
+        """
+        new_rows = {}
+        doc_ids, meta = [], []
+        for row, doc_id in enumerate(self.doc_ids):
+            if row not in self.deleted:
+                new_rows[row] = len(doc_ids)
+                doc_ids.append(doc_id)
+                meta.append(self.meta[row])
+        postings = {}
+        for term, (rows, weights) in self.postings.items():
+            kept_rows, kept_weights = array('I'), array('f')
+            for row, weight in zip(rows, weights):
+                new_row = new_rows.get(row)
+                if new_row is not None:
+                    kept_rows.append(new_row)
+                    kept_weights.append(weight)
+            if kept_rows:
+                postings[term] = (kept_rows, kept_weights)
+        self.doc_ids, self.meta, self.postings = doc_ids, meta, postings
+        self.rows = {doc_id: row for row, doc_id in enumerate(doc_ids)}
+        self.deleted = set()
+
+    def _document_frequency(self, rows):
+        if not self.deleted:
+            return len(rows)
+        return sum(1 for row in rows if row not in self.deleted)
+
+    def _query_vector(self, job_description):
+        total = len(self.doc_ids) - len(self.deleted)
+        # A job_profile.CompiledJob already carries its term counts
+        terms = getattr(job_description, 'terms', None)
+        if terms is None:
+            terms = term_frequencies(job_description)
+        vector = {}
+        for term, count in terms.items():
+            posting = self.postings.get(term)
+            if posting is None:
+                continue
+            idf = math.log((1 + total) / (1 + self._document_frequency(posting[0]))) + 1.0
+            vector[term] = _log_tf(count) * idf
+        norm = math.sqrt(sum(w * w for w in vector.values())) or 1.0
+        return {term: w / norm for term, w in vector.items()}
+
+    def scores(self, job_description):
+        """
+        Cosine similarity of every indexed row to the job description (text or CompiledJob),
+        as a list indexed by row.
+        """
+        with self._lock:
+            return self._scores(job_description)
+
+    def _scores(self, job_description):
+        query = self._query_vector(job_description)
+        scores = [0.0] * len(self.doc_ids)
+        for term, query_weight in query.items():
+            rows, weights = self.postings[term]
+            for row, weight in zip(rows, weights):
+                scores[row] += query_weight * weight
+        return scores
+
+    def top_k(self, job_description, k=10, skill_weight=0.5):
+        """
+        Best k resumes for a job description.
+
+        combinedScore blends text similarity with the skill-match overallScore of the
+        analysis (when it was stored as metadata); skill_weight=0 ranks by similarity alone.
+        """
+        with self._lock:
+            return self._top_k(job_description, k, skill_weight)
+
+    def _top_k(self, job_description, k, skill_weight):
+        scores = self._scores(job_description)
+
+        def ranked():
+            for row, similarity in enumerate(scores):
+                if row in self.deleted:
+                    continue
+                meta = self.meta[row]
+                skill_score = meta.get('overallScore')
+                combined = similarity * 100
+                if skill_score is not None:
+                    combined = (1 - skill_weight) * combined + skill_weight * skill_score
+                yield combined, similarity, row
+
+        best = heapq.nlargest(k, ranked(), key=lambda item: (item[0], item[1]))
+        return [
+            dict(self.meta[row], id=self.doc_ids[row],
+                 similarity=round(similarity, 4), combinedScore=round(combined, 2))
+            for combined, similarity, row in best
+        ]
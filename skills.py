@@ -0,0 +1,99 @@
+import json
+import os
+import re
+from functools import lru_cache
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "skills.json")
+
+# A keyword only matches as a whole token: "py" must not match inside "happy",
+# and "java" must not match the start of "javascript" or "c" the start of "c++"
+_WORD_CHARS = r'\w+#'
+_LEFT_BOUNDARY = rf'(?<![{_WORD_CHARS}])'
+_RIGHT_BOUNDARY = rf'(?![{_WORD_CHARS}])'
+
+
+def normalize_alias(alias):
+    return ' '.join(alias.lower().split())
+
+
+def load_taxonomy(path=DEFAULT_TAXONOMY_PATH):
+    """
+    Load a skill taxonomy: a JSON object mapping each skill name to its list of aliases.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        taxonomy = json.load(f)
+    if not isinstance(taxonomy, dict):
+        raise ValueError(f"Skill taxonomy must be a JSON object: {path}")
+    return taxonomy
+
+
+def _trie_pattern(words):
+    """
+    Build a regex from a character trie of words, so shared prefixes are tested once
+    instead of once per alternative. Spaces match any run of whitespace.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = True
+
+    def build(node):
+        ends_here = '' in node
+        branches = []
+        for char in sorted(c for c in node if c):
+            atom = r'\s+' if char == ' ' else re.escape(char)
+            branches.append(atom + build(node[char]))
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            # Greedy optional group: the longest alias wins, shorter ones are the fallback
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class SkillMatcher:
+    """
+    Finds skills in text with a single precompiled regex built from every alias in the taxonomy.
+    """
+    def __init__(self, taxonomy):
+        self.skills = list(taxonomy)
+        self.alias_to_skill = {}
+        for skill, aliases in taxonomy.items():
+            for alias in [skill] + list(aliases):
+                alias = normalize_alias(alias)
+                if alias:
+                    self.alias_to_skill.setdefault(alias, skill)
+
+        pattern = _trie_pattern(self.alias_to_skill)
+        self.regex = re.compile(_LEFT_BOUNDARY + '(?:' + pattern + ')' + _RIGHT_BOUNDARY, re.IGNORECASE)
+
+    def find(self, text):
+        """
+        Return (skill, start, end) for every alias occurrence in text, in order.
+        """
+        matches = []
+        for match in self.regex.finditer(text or ''):
+            skill = self.alias_to_skill.get(normalize_alias(match.group()))
+            if skill:
+                matches.append((skill, match.start(), match.end()))
+        return matches
+
+    def skills_in(self, text):
+        """
+        Return the skills mentioned in text, in taxonomy order.
+        """
+        found = {skill for skill, _, _ in self.find(text)}
+        return [skill for skill in self.skills if skill in found]
+
+
+@lru_cache(maxsize=None)
+def get_matcher(path=DEFAULT_TAXONOMY_PATH):
+    """
+    Shared matcher for a taxonomy file, compiled on first use.
+    """
+    return SkillMatcher(load_taxonomy(path))
@@ -1,6 +1,362 @@
-import google.generativeai as Genai 
-Api_key="" 
-Genai.configure(api_key=Api_key) 
-model = Genai.GenerativeModel("gemini-2.0-flash") 
+"""
+Resume improvement suggestions from an LLM.
 
-chat = model.start_chat()
\ No newline at end of file
+    service = get_service()
+    text = service.suggest(result)                  # blocking, from any thread
+    texts = await service.suggest_many(results)     # on the service's event loop
+
+result is an analysis result (see analyzer.perform_analysis). Nothing is imported,
+configured or connected until the first suggestion is asked for. The backend is
+picked by PYRESUME_LLM_BACKEND:
+
+    gemini   Google Gemini via google-generativeai; the key comes from
+             PYRESUME_GEMINI_API_KEY or GOOGLE_API_KEY (default when a key is set)
+    http     POST {"prompts": [...]} to PYRESUME_LLM_URL, expecting {"responses": [...]};
+             benchmarks/llm_stub.py serves this locally
+    echo     canned text built from the prompt, no network (default otherwise)
+
+Prompts for several resumes are sent together in batches of batch_size. At most
+max_concurrency requests are in flight, and requests_per_minute of them start per
+minute. Responses are cached by prompt hash for cache_ttl seconds, and concurrent
+requests for the same prompt share one call.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+
+from pyresume_log import get_logger
+from resume_cache import hash_text
+
+logger = get_logger('suggestions')
+
+GEMINI_MODEL = os.environ.get('PYRESUME_GEMINI_MODEL', 'gemini-2.0-flash')
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_MINUTE = 60
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_CACHE_TTL = 24 * 3600
+DEFAULT_CACHE_SIZE = 1024
+REQUEST_TIMEOUT = 60.0
+
+PROMPT_TEMPLATE = """You are reviewing a resume against a job description.
+Resume: {fileName}
+Skill match score: {overallScore}%
+Skills the job requires that the resume shows: {matched}
+Skills the job requires that the resume lacks: {missing}
+Experience: {experience}
+Education: {education}
+
+Give three to five short, concrete suggestions for improving this resume for the job.
+One suggestion per line, no preamble."""
+
+
+def build_prompt(result):
+    """
+    Improvement prompt for one analysis result.
+    """
+    return PROMPT_TEMPLATE.format(
+        fileName=result.get('fileName', 'resume'),
+        overallScore=result.get('overallScore', 0),
+        matched=', '.join(result.get('matchedSkills') or []) or 'none',
+        missing=', '.join(result.get('missingSkills') or []) or 'none',
+        experience=result.get('experience', 'Not specified'),
+        education=result.get('education', 'Not specified'),
+    )
+
+
+class TTLCache:
+    """
+    LRU cache whose entries also expire ttl seconds after they were stored.
+    """
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (expires at, value)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
+
+
+class RateLimiter:
+    """
+    Token bucket for an event loop: at most rate acquisitions per period seconds, in bursts of up to rate.
+    """
+    def __init__(self, rate, period=60.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.period)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+
+class EchoBackend:
+    """
+    Offline backend: answers every prompt with canned suggestions built from it.
+    """
+    name = 'echo'
+
+    async def generate(self, prompts):
+        responses = []
+        for prompt in prompts:
+            missing = next((line.split(':', 1)[1].strip() for line in prompt.splitlines()
+                            if line.startswith('Skills the job requires that the resume lacks')), 'none')
+            lines = ["Quantify the impact of your recent roles with numbers.",
+                     "Move the skills that match the job description to the top."]
+            if missing != 'none':
+                lines.append(f"Add evidence of {missing} if you have it, e.g. a project or course.")
+            responses.append('\n'.join(lines))
+        return responses
+
+
+class HttpBackend:
+    """
+    Backend for a JSON endpoint taking {"prompts": [...]} and answering {"responses": [...]}.
+    """
+    name = 'http'
+
+    def __init__(self, url, timeout=REQUEST_TIMEOUT):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, prompts):
+        request = urllib.request.Request(self.url, data=json.dumps({'prompts': prompts}).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'}, method='POST')
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            responses = json.loads(response.read())['responses']
+        if len(responses) != len(prompts):
+            raise ValueError(f"expected {len(prompts)} responses, got {len(responses)}")
+        return responses
+
+    async def generate(self, prompts):
+        return await asyncio.get_running_loop().run_in_executor(None, self._post, prompts)
+
+
+class GeminiBackend:
+    """
+    Google Gemini. A batch of prompts goes out as one request that asks for a JSON array
+    of answers; if the reply can't be split that way, the prompts are sent one by one.
+    """
+    name = 'gemini'
+
+    def __init__(self, api_key, model_name=GEMINI_MODEL):
+        import google.generativeai as genai  # Only imported when Gemini is actually used
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    async def _ask(self, prompt, **config):
+        response = await self.model.generate_content_async(prompt, generation_config=config or None)
+        return response.text
+
+    async def generate(self, prompts):
+        if len(prompts) == 1:
+            return [await self._ask(prompts[0])]
+        combined = (f"Answer each of the following {len(prompts)} requests independently. Reply with a JSON "
+                    f"array of {len(prompts)} strings, one answer per request, in order.\n\n"
+                    + '\n\n'.join(f"Request {i}:\n{prompt}" for i, prompt in enumerate(prompts, 1)))
+        try:
+            answers = json.loads(await self._ask(combined, response_mime_type='application/json'))
+            if isinstance(answers, list) and len(answers) == len(prompts):
+                return [str(answer) for answer in answers]
+        except ValueError:
+            pass
+        logger.debug("Batched Gemini reply was not a %d item array; asking one by one", len(prompts))
+        return list(await asyncio.gather(*(self._ask(prompt) for prompt in prompts)))
+
+
+def backend_from_env():
+    name = os.environ.get('PYRESUME_LLM_BACKEND', '').lower()
+    api_key = os.environ.get('PYRESUME_GEMINI_API_KEY') or os.environ.get('GOOGLE_API_KEY')
+    if name == 'http' or (not name and os.environ.get('PYRESUME_LLM_URL')):
+        return HttpBackend(os.environ.get('PYRESUME_LLM_URL', 'http://127.0.0.1:8765/generate'))
+    if name == 'gemini' or (not name and api_key):
+        if not api_key:
+            raise RuntimeError("PYRESUME_LLM_BACKEND=gemini needs PYRESUME_GEMINI_API_KEY or GOOGLE_API_KEY")
+        return GeminiBackend(api_key)
+    return EchoBackend()
+
+
+class SuggestionService:
+    """
+    Batching, rate-limited, caching front end for a backend. Runs its own event loop on a
+    daemon thread, so the limits hold across every caller in the process.
+    """
+    def __init__(self, backend=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                 requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE, batch_size=DEFAULT_BATCH_SIZE,
+                 cache_ttl=DEFAULT_CACHE_TTL, cache_size=DEFAULT_CACHE_SIZE):
+        self._backend = backend
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.batch_size = batch_size
+        self.cache = TTLCache(cache_size, cache_ttl)
+        self.requests = 0
+        self._inflight = {}  # prompt hash -> future shared by concurrent callers
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._limiter = None
+        self._start_lock = threading.Lock()
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = backend_from_env()
+            logger.info("Suggestion backend: %s", self._backend.name)
+        return self._backend
+
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name='suggestions', daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def _limits(self):
+        # Created on first use, inside the service loop they belong to
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._limiter = RateLimiter(self.requests_per_minute)
+        return self._semaphore, self._limiter
+
+    async def _send(self, batch):
+        """
+        One backend request for a batch of (prompt hash, prompt); settles their shared futures.
+        A backend that answers with the wrong number of responses fails the whole batch, since
+        its answers can't be matched to their prompts.
+        """
+        semaphore, limiter = self._limits()
+        try:
+            async with semaphore:
+                await limiter.acquire()
+                self.requests += 1
+                responses = await self.backend.generate([prompt for _, prompt in batch])
+            if len(responses) != len(batch):
+                raise ValueError(f"expected {len(batch)} responses, got {len(responses)}")
+        except Exception as e:
+            for key, _ in batch:
+                future = self._inflight.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (key, _), response in zip(batch, responses):
+            self.cache.put(key, response)
+            self._inflight.pop(key).set_result(response)
+
+    async def suggest_many(self, results):
+        """
+        Suggestions for many analysis results (or prompt strings), in order. Must run on the
+        service loop; use suggest_batch from other threads.
+        """
+        prompts = [item if isinstance(item, str) else build_prompt(item) for item in results]
+        keys = [hash_text(prompt) for prompt in prompts]
+        loop = asyncio.get_running_loop()
+        answers, waiting, batch = {}, {}, []
+        for key, prompt in zip(keys, prompts):
+            if key in answers or key in waiting:
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                answers[key] = cached
+            elif key in self._inflight:
+                waiting[key] = self._inflight[key]
+            else:
+                waiting[key] = self._inflight[key] = loop.create_future()
+                batch.append((key, prompt))
+
+        sends = [self._send(batch[i:i + self.batch_size]) for i in range(0, len(batch), self.batch_size)]
+        await asyncio.gather(*sends)
+        # Gathered so every failed future is retrieved, not just the first one raised
+        settled = await asyncio.gather(*waiting.values(), return_exceptions=True)
+        for key, answer in zip(waiting, settled):
+            if isinstance(answer, BaseException):
+                raise answer
+            answers[key] = answer
+        return [answers[key] for key in keys]
+
+    def suggest_batch(self, results, timeout=REQUEST_TIMEOUT * 2):
+        """
+        Blocking suggest_many for callers outside the service loop.
+        """
+        future = asyncio.run_coroutine_threadsafe(self.suggest_many(list(results)), self._ensure_loop())
+        return future.result(timeout)
+
+    def suggest(self, result, timeout=REQUEST_TIMEOUT * 2):
+        return self.suggest_batch([result], timeout)[0]
+
+    def stats(self):
+        return dict(self.cache.stats(), requests=self.requests,
+                    backend=self._backend.name if self._backend else None)
+
+    def close(self):
+        with self._start_lock:
+            loop, self._loop = self._loop, None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join(timeout=5)
+            loop.close()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_service():
+    """
+    The process-wide SuggestionService, created on first use.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SuggestionService()
+        return _service
+
+
+def set_backend(backend):
+    """
+    Swap the backend of the shared service (e.g. for a local stub); clears cached responses.
+    """
+    service = get_service()
+    service._backend = backend
+    service.cache = TTLCache(service.cache.max_entries, service.cache.ttl)
+    return service
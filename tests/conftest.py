@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pymupdf
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def make_pdf(tmp_path):
+    """
+    Write a PDF with one page per string and return its path.
+    """
+    def make(pages, name='resume.pdf'):
+        path = str(tmp_path / name)
+        document = pymupdf.open()
+        for text in pages:
+            document.new_page().insert_text((72, 72), text)
+        document.save(path)
+        document.close()
+        return path
+    return make
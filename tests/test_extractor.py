@@ -0,0 +1,49 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import extractor
+from extractor import PAGE_BREAK, PARALLEL_MIN_PAGES, SIGNAL_MIN_PAGES
+
+
+def _resume_pages(count):
+    pages = ["Experience\nDeveloper at Example Corp 2015-2020\nEducation\nBSc Computer Science\n"
+             "Skills\nPython, Docker, AWS"]
+    pages.extend(f"Appendix page {number} with publications and references" for number in range(1, count))
+    return pages
+
+
+class _RecordingPool(ProcessPoolExecutor):
+    created = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        _RecordingPool.created.append(self)
+
+
+def _record_pools(monkeypatch):
+    _RecordingPool.created = []
+    monkeypatch.setattr(extractor, 'ProcessPoolExecutor', _RecordingPool)
+    # Enough CPUs for the pages to be split, whatever machine runs the test
+    monkeypatch.setattr(extractor.os, 'cpu_count', lambda: 4)
+
+
+def test_long_pdf_is_extracted_in_parallel_and_still_stops_early(make_pdf, monkeypatch):
+    path = make_pdf(_resume_pages(PARALLEL_MIN_PAGES))
+    _record_pools(monkeypatch)
+
+    text = extractor.extract_text(path)
+
+    assert len(_RecordingPool.created) == 1
+    assert text.count(PAGE_BREAK) + 1 == SIGNAL_MIN_PAGES
+    sequential = extractor.extract_text_from_pdf(path, parallel=False,
+                                                 stop_when=extractor.stop_when_sections_found())
+    assert text == sequential
+
+
+def test_short_pdf_is_read_in_process(make_pdf, monkeypatch):
+    path = make_pdf(_resume_pages(PARALLEL_MIN_PAGES - 1))
+    _record_pools(monkeypatch)
+
+    text = extractor.extract_text(path)
+
+    assert not _RecordingPool.created
+    assert text.count(PAGE_BREAK) + 1 == SIGNAL_MIN_PAGES
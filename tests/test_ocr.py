@@ -0,0 +1,59 @@
+import ocr
+from batch import analyze_file
+from resume_cache import ResumeCache, hash_file
+
+RESUME_PAGE = ("Experience\nDeveloper at Example Corp 2015-2020\nEducation\nBSc Computer Science\n"
+               "Skills\nPython, Docker")
+SCANNED_TEXT = "Certifications\nAWS Solutions Architect"
+
+
+def _ocr_times_out_once(monkeypatch):
+    """
+    Make OCR available, time out on its first page and read every later one; returns the
+    page numbers it was asked for.
+    """
+    calls = []
+
+    def ocr_one(pdf_path, number, timeout):
+        calls.append(number)
+        return ('timeout', '') if len(calls) == 1 else ('ok', SCANNED_TEXT)
+
+    monkeypatch.setattr(ocr, 'available', lambda: True)
+    monkeypatch.setattr(ocr, '_ocr_one', ocr_one)
+    return calls
+
+
+def test_timed_out_page_is_ocrd_again_on_the_next_call(make_pdf, tmp_path, monkeypatch):
+    path = make_pdf([RESUME_PAGE, ''])
+    calls = _ocr_times_out_once(monkeypatch)
+    cache = ResumeCache(str(tmp_path / 'cache'))
+    file_hash = hash_file(path)
+
+    text, complete = cache.get_or_extract(file_hash, path)
+    assert not complete
+    assert SCANNED_TEXT not in text
+    assert cache.get(file_hash, 'text') is None
+    assert cache.get(file_hash, 'ocr') is None
+
+    text = cache.get_or_extract_text(file_hash, path)
+    assert SCANNED_TEXT in text
+    assert calls == [1, 1]
+
+    # Complete now, so it is cached like any other text
+    assert cache.get_or_extract_text(file_hash, path) == text
+    assert calls == [1, 1]
+
+
+def test_analysis_of_incomplete_text_is_not_cached(make_pdf, tmp_path, monkeypatch):
+    path = make_pdf([RESUME_PAGE, ''])
+    _ocr_times_out_once(monkeypatch)
+    cache = ResumeCache(str(tmp_path / 'cache'))
+    job = "Python developer with Docker and AWS"
+
+    first = analyze_file(path, job, cache=cache)
+    assert 'AWS' not in first['matchedSkills']
+
+    second = analyze_file(path, job, cache=cache)
+    assert 'cached' not in second
+    assert 'AWS' in second['matchedSkills']
+    assert analyze_file(path, job, cache=cache)['cached']
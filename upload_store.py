@@ -0,0 +1,299 @@
+"""
+Content-addressed storage for uploaded resumes.
+
+Every distinct file is stored once, under the SHA-256 of its bytes:
+
+    uploads/objects/<hash[:2]>/<hash><ext>     the file itself
+    uploads/objects/<hash[:2]>/<hash>.json     original names it was uploaded under
+    uploads/tmp/                               partial uploads, moved into place when complete
+
+Uploading the same resume again (under any name) is a dictionary lookup instead of a
+new copy. A background sweeper deletes files unused for longer than max_age and
+evicts the least recently used ones when the store grows past max_bytes.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+from pyresume_log import get_logger
+
+logger = get_logger('store')
+
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+DEFAULT_MAX_AGE = 30 * 24 * 3600
+DEFAULT_SWEEP_INTERVAL = 600
+# Files used this recently are never evicted for size, so an analysis can't lose its input
+EVICT_GRACE_SECONDS = 600
+# After a size eviction the store is trimmed down to this fraction of the budget
+EVICT_TO_RATIO = 0.9
+# Partial uploads older than this were abandoned
+STALE_TEMP_SECONDS = 24 * 3600
+MAX_NAMES = 20
+
+_HASH_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+def safe_file_name(file_name):
+    """
+    Client supplied filename with path separators and characters Windows rejects replaced.
+    """
+    return re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', os.path.basename(file_name or '')) or 'upload'
+
+
+class StoredFile:
+    __slots__ = ('hash', 'path', 'size', 'last_used')
+
+    def __init__(self, file_hash, path, size, last_used):
+        self.hash = file_hash
+        self.path = path
+        self.size = size
+        self.last_used = last_used
+
+
+class UploadStore:
+    """
+    Sharded, content-addressed upload directory with age and size quotas.
+    The in-memory index (hash -> StoredFile, least recently used first) is rebuilt
+    from the directory on start; lookups never touch the file system.
+    """
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, max_age=DEFAULT_MAX_AGE,
+                 sweep_interval=DEFAULT_SWEEP_INTERVAL):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.tmp_dir = os.path.join(root, 'tmp')
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.sweep_interval = sweep_interval
+        self.total_bytes = 0
+        self._files = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper = None
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.tmp_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for shard in os.scandir(self.objects_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                file_hash, ext = os.path.splitext(entry.name)
+                if ext != '.json' and _HASH_RE.match(file_hash):
+                    stat = entry.stat()
+                    found.append(StoredFile(file_hash, entry.path, stat.st_size, stat.st_mtime))
+        for stored in sorted(found, key=lambda s: s.last_used):
+            self._files[stored.hash] = stored
+            self.total_bytes += stored.size
+
+    def _object_path(self, file_hash, file_name, ext=None):
+        ext = ext or os.path.splitext(file_name)[1].lower()
+        return os.path.join(self.objects_dir, file_hash[:2], file_hash + ext)
+
+    def _names_path(self, file_hash):
+        return os.path.join(self.objects_dir, file_hash[:2], file_hash + '.json')
+
+    def __len__(self):
+        return len(self._files)
+
+    def __contains__(self, file_hash):
+        return file_hash in self._files
+
+    def get(self, file_hash):
+        """
+        The stored file for a hash, or None. Marks it as recently used.
+        """
+        with self._lock:
+            stored = self._files.get(file_hash)
+            if stored is None:
+                return None
+            stored.last_used = time.time()
+            self._files.move_to_end(file_hash)
+        try:
+            os.utime(stored.path)
+        except FileNotFoundError:
+            # Deleted behind our back
+            self._forget(file_hash)
+            return None
+        except OSError:
+            pass
+        return stored
+
+    def lookup(self, file_hash, file_name):
+        """
+        get, also recording file_name as a name the file was uploaded under.
+        """
+        stored = self.get(file_hash)
+        if stored is not None:
+            self._add_name(file_hash, file_name)
+        return stored
+
+    def names(self, file_hash):
+        try:
+            with open(self._names_path(file_hash), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def temp_file(self):
+        """
+        (fd, path) of a new temp file for a partial upload, on the same file system as the store.
+        """
+        return tempfile.mkstemp(prefix='upload-', suffix='.part', dir=self.tmp_dir)
+
+    def put_bytes(self, data, file_name, file_hash, ext=None):
+        """
+        Store data uploaded as file_name. Returns (stored file, created); created is False
+        when identical content was already stored.
+        """
+        stored = self.lookup(file_hash, file_name)
+        if stored is None:
+            fd, temp_path = self.temp_file()
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+            return self.put_file(temp_path, file_name, file_hash, len(data), ext)
+        return stored, False
+
+    def put_file(self, temp_path, file_name, file_hash, size, ext=None):
+        """
+        Move a completed temp file into the store, or drop it if the content is already there.
+        The stored file gets extension ext (e.g. the sniffed format's), else file_name's.
+        """
+        stored = self.get(file_hash)
+        if stored is not None:
+            os.remove(temp_path)
+            self._add_name(file_hash, file_name)
+            return stored, False
+
+        path = self._object_path(file_hash, file_name, ext)
+        if os.path.exists(path):
+            # Stored by another process sharing the directory (e.g. the server and the desktop app)
+            os.remove(temp_path)
+            created = False
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+            created = True
+        stored = StoredFile(file_hash, path, size, time.time())
+        with self._lock:
+            previous = self._files.pop(file_hash, None)
+            self.total_bytes += size - (previous.size if previous else 0)
+            self._files[file_hash] = stored
+        self._add_name(file_hash, file_name)
+        return stored, created
+
+    def _add_name(self, file_hash, file_name):
+        name = safe_file_name(file_name)
+        names = self.names(file_hash)
+        if name in names:
+            return
+        names = (names + [name])[-MAX_NAMES:]
+        path = self._names_path(file_hash)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(names, f)
+        os.replace(temp_path, path)
+
+    def remove(self, file_hash):
+        stored = self._forget(file_hash)
+        if stored is None:
+            return False
+        for path in (stored.path, self._names_path(file_hash)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return True
+
+    def _forget(self, file_hash):
+        with self._lock:
+            stored = self._files.pop(file_hash, None)
+            if stored is not None:
+                self.total_bytes -= stored.size
+            return stored
+
+    def sweep(self, now=None):
+        """
+        Apply the quotas: drop files unused for max_age, then evict least recently
+        used files until the store is back under max_bytes, and remove abandoned
+        partial uploads. Returns what was removed.
+        """
+        now = now or time.time()
+        expired = []
+        with self._lock:
+            for stored in self._files.values():
+                if stored.last_used >= now - self.max_age:
+                    break
+                expired.append(stored.hash)
+            evict_to = int(self.max_bytes * EVICT_TO_RATIO)
+            remaining = self.total_bytes - sum(self._files[h].size for h in expired)
+            if remaining > self.max_bytes:
+                for stored in list(self._files.values())[len(expired):]:
+                    if remaining <= evict_to or stored.last_used >= now - EVICT_GRACE_SECONDS:
+                        break
+                    expired.append(stored.hash)
+                    remaining -= stored.size
+
+        freed = 0
+        for file_hash in expired:
+            stored = self._files.get(file_hash)
+            if stored and self.remove(file_hash):
+                freed += stored.size
+
+        stale = 0
+        for entry in os.scandir(self.tmp_dir):
+            try:
+                if entry.stat().st_mtime < now - STALE_TEMP_SECONDS:
+                    os.remove(entry.path)
+                    stale += 1
+            except OSError:
+                pass
+
+        if expired or stale:
+            logger.info("Upload sweep removed %d file(s) (%d bytes) and %d partial upload(s)",
+                        len(expired), freed, stale)
+        return {'removed': len(expired), 'bytes': freed, 'partials': stale}
+
+    def start_sweeper(self):
+        """
+        Sweep every sweep_interval seconds on a daemon thread until close().
+        """
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, name='upload-sweeper', daemon=True)
+            self._sweeper.start()
+        return self
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Upload sweep failed")
+
+    def close(self):
+        """
+        Stop the sweeper and enforce the quotas one last time.
+        """
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+        return self.sweep()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': self.total_bytes,
+                'maxBytes': self.max_bytes,
+                'maxAgeSeconds': self.max_age,
+            }